@@ -0,0 +1,115 @@
+# benchmarks/import_time.py
+"""
+Import-time report for the app's cold start, from `python -X importtime` in fresh processes.
+
+Each scenario imports what index.py needs at one point: the login screen, the logged-in shell
+(main and its page registry), then each page on its own as main.load_page() imports it on first
+visit. For each the report gives the import time on top of the scenario before it (the sum of
+the self times of modules that one did not load): the login screen and the shell on top of
+`import streamlit`, each page on top of the shell. Then how many modules that is, the heaviest
+of them by cumulative time, and whether pandas, plotly.express or the calendar component are
+loaded at that point.
+
+    python benchmarks/import_time.py [--repeat 3] [--top 5]
+
+Exit status is 1 if the login screen imports any of LOGIN_FORBIDDEN.
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = ROOT / "streamlit_app"
+sys.path.insert(0, str(ROOT))
+
+from streamlit_app.main import PAGE_REGISTRY  # noqa: E402
+
+# Heavy dependencies the login screen must not load
+LOGIN_FORBIDDEN = ("pandas", "plotly.express", "streamlit_calendar")
+# Modules whose presence is reported per scenario
+WATCHED = ("pandas", "numpy", "plotly.express", "streamlit_calendar", "fpdf", "openpyxl")
+
+# index.py runs with streamlit_app/ as the script directory and the project root on sys.path
+_PRELUDE = f"import sys; sys.path[:0] = [{str(APP_DIR)!r}, {str(ROOT)!r}]; "
+_LOGIN = _PRELUDE + "import streamlit; from streamlit_app._common import apply_global_css; import login; "
+_SHELL = _LOGIN + "import main; "
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def scenarios() -> list[tuple[str, str, str]]:
+    """(label, code, label of the scenario it is measured on top of)"""
+    out = [
+        ("streamlit", _PRELUDE + "import streamlit", ""),
+        ("login screen", _LOGIN, "streamlit"),
+        ("logged in (main + registry)", _SHELL, "streamlit"),
+    ]
+    out += [(f"page: {page}", _SHELL + f"main.load_page({page!r})", "logged in (main + registry)")
+            for page in PAGE_REGISTRY]
+    out.append(("all pages", _SHELL + "[main.load_page(p) for p in main.PAGE_REGISTRY]",
+                "logged in (main + registry)"))
+    return out
+
+
+def importtime(code: str) -> dict[str, tuple[int, int, int]]:
+    """{module: (self us, cumulative us, nesting depth)} for running code in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import failed:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return modules
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--repeat", type=int, default=3, help="fresh processes per scenario (median is reported)")
+    ap.add_argument("--top", type=int, default=5, help="heaviest new modules listed per scenario")
+    args = ap.parse_args(argv)
+
+    loaded = {}  # label -> modules the scenario loads
+    failed = False
+    print(f"{'scenario':34s} {'+ms':>8s} {'+modules':>8s}  loads")
+    for label, code, base in scenarios():
+        runs = [importtime(code) for _ in range(args.repeat)]
+        modules = runs[0]
+        loaded[label] = set(modules)
+        if not base:
+            total = statistics.median(sum(s for s, _, _ in r.values()) for r in runs)
+            print(f"{label:34s} {total / 1000:8.1f} {len(modules):8d}  (baseline)")
+            continue
+        new = [m for m in modules if m not in loaded[base]]
+        total = statistics.median(sum(r[m][0] for m in new if m in r) for r in runs)
+        loads = [w for w in WATCHED if w in modules]
+        print(f"{label:34s} {total / 1000:8.1f} {len(new):8d}  {', '.join(loads) or '-'}")
+        # heaviest new modules that are not inside another new module
+        heads = sorted((m for m in new if modules[m][2] == 0 or not _parent_new(m, new)),
+                       key=lambda m: modules[m][1], reverse=True)[:args.top]
+        print("    " + ", ".join(f"{m} {modules[m][1] / 1000:.0f}ms" for m in heads))
+        if label == "login screen":
+            bad = [m for m in LOGIN_FORBIDDEN if m in modules]
+            if bad:
+                failed = True
+                print(f"    FAIL: login screen imports {', '.join(bad)}")
+
+    print("\nFAIL: the login screen loads heavy page dependencies" if failed
+          else "\nOK: the login screen loads none of " + ", ".join(LOGIN_FORBIDDEN))
+    return 1 if failed else 0
+
+
+def _parent_new(module: str, new: list[str]) -> bool:
+    """Whether a parent package of module is itself newly imported (then module is counted in it)."""
+    parts = module.split(".")
+    return any(".".join(parts[:i]) in new for i in range(1, len(parts)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# benchmarks/page_data.py
+"""
+Time the data path behind each page at several clinic sizes: p50/p95 latency and peak memory.
+
+For every scale a synthetic clinic is generated (see synthetic_data.py), then the repository
+calls each page makes on a rerun are run --repeat times against it. Only the data work is
+measured: no Streamlit, no rendering.
+
+    python benchmarks/page_data.py [--scales small medium large] [--repeat 20]
+                                   [--workdir DIR] [--json results.json]
+
+A scale is a preset name (see SCALES) or CLIENTSxPROGRAMSxGROUPS, e.g. 20000x400000x2000.
+With --workdir the clinics are kept in DIR/<scale> and reused by later runs, which matters for
+the large scales: generating 200,000 program files takes a minute or so.
+
+Peak memory is the Python allocation high-water mark (tracemalloc) of one run of the path, on
+top of what was already allocated; SQLite's page cache is not included.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+sys.path.insert(0, str(ROOT))
+
+from streamlit_app import repository  # noqa: E402
+from streamlit_app.db import connect  # noqa: E402
+from synthetic_data import Clinic, Scale, generate  # noqa: E402
+
+SCALES = {
+    "small": Scale(clients=1_000, programs=10_000, groups=100),
+    "medium": Scale(clients=5_000, programs=50_000, groups=400),
+    "large": Scale(clients=10_000, programs=200_000, groups=1_000),
+}
+
+
+def parse_scale(text: str) -> tuple[str, Scale]:
+    if text in SCALES:
+        return text, SCALES[text]
+    try:
+        clients, programs, groups = (int(n) for n in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"unknown scale {text!r}: use {', '.join(SCALES)} or CxPxG")
+    return text, Scale(clients, programs, groups)
+
+
+def busiest_coach(conn) -> str:
+    """The coach assigned to the most groups: the heaviest coach dashboard."""
+    return conn.execute("""
+        SELECT uga.user_id FROM user_group_assignments uga
+          JOIN clients c ON c.id = uga.user_id
+         WHERE c.account_type = 'Coach'
+         GROUP BY uga.user_id ORDER BY COUNT(*) DESC, uga.user_id LIMIT 1
+    """).fetchone()[0]
+
+
+def page_paths(conn, clinic: Clinic) -> list[tuple]:
+    """(label, fn) for the data path of each page, mirroring the calls the page makes."""
+    today = date.today()
+    coach = busiest_coach(conn)
+
+    def dashboard():
+        repository.count_active_clients(conn)
+        repository.count_programs(conn)
+        return repository.fetch_program_calendar(conn)
+
+    def client_history():
+        repository.fetch_program_files_by_client(conn)
+        return repository.fetch_programs(conn, start_date=today - timedelta(days=180), end_date=today)
+
+    def client_status():
+        repository.get_group_directory(conn)
+        clients = repository.fetch_roster(conn)
+        return repository.fetch_status_board(conn, [cid for cid, _, _ in clients])
+
+    def injury_audit():
+        return repository.fetch_program_body_parts(conn).groupby(["body_part", "rehab_type"]).size()
+
+    def coach_dashboard():  # first load: the coach's group tree, filter on "All"
+        repository.build_group_tree(repository.fetch_visible_groups(conn, coach))
+        clients = repository.fetch_roster(conn)
+        return repository.fetch_status_board(conn, [cid for cid, _, _ in clients])
+
+    def settings_group_table():
+        repository.invalidate_membership()  # the cold build, as after any roster change
+        return repository.get_group_directory(conn)
+
+    return [
+        ("dashboard", dashboard),
+        ("client history", client_history),
+        ("client status", client_status),
+        ("injury audit", injury_audit),
+        ("coach dashboard", coach_dashboard),
+        ("settings group table", settings_group_table),
+        ("program index reconcile", lambda: repository.reconcile_program_index(conn, clinic.pdf_dir)),
+    ]
+
+
+def measure(fn, repeat: int) -> dict:
+    """p50/p95 wall time in ms over repeat runs, and peak traced memory (MiB) of one more run."""
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t) * 1000)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": statistics.quantiles(timings, n=20, method="inclusive")[18] if repeat > 1 else timings[0],
+        "peak_mib": peak / 2**20,
+    }
+
+
+def run_scale(name: str, scale: Scale, workdir: Path, repeat: int) -> list[dict]:
+    clinic = Clinic(root=workdir / name, scale=scale)
+    if clinic.db_path.exists():
+        print(f"\n== {name}: {scale} (reusing {clinic.root})")
+    else:
+        clinic = generate(clinic.root, scale)
+        built = ", ".join(f"{phase} {s:.1f}s" for phase, s in clinic.seconds.items())
+        print(f"\n== {name}: {scale} (generated: {built})")
+
+    repository.invalidate_membership()  # start each scale from cold caches
+    conn = connect(clinic.db_path)
+    results = []
+    try:
+        print(f"{'page':26s} {'p50 ms':>9s} {'p95 ms':>9s} {'peak MiB':>9s}")
+        for label, fn in page_paths(conn, clinic):
+            fn()  # warm the page cache and any per-process caches, as a second rerun would find them
+            r = {"scale": name, "clients": scale.clients, "programs": scale.programs,
+                 "groups": scale.groups, "page": label, **measure(fn, repeat)}
+            print(f"{label:26s} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['peak_mib']:9.2f}")
+            results.append(r)
+    finally:
+        conn.close()
+        repository.invalidate_membership()
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--scales", nargs="+", type=parse_scale, default=[parse_scale("small"), parse_scale("medium")],
+                    metavar="SCALE", help="preset names or CxPxG (default: small medium)")
+    ap.add_argument("--repeat", type=int, default=20, help="timed runs per page (default 20)")
+    ap.add_argument("--workdir", type=Path, help="keep generated clinics here and reuse them")
+    ap.add_argument("--json", type=Path, help="also write the results here, one object per page and scale")
+    args = ap.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or Path(tmp)
+        for name, scale in args.scales:
+            results += run_scale(name, scale, workdir, args.repeat)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+        print(f"\nresults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
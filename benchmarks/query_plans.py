@@ -0,0 +1,157 @@
+# benchmarks/query_plans.py
+"""
+Check that every hot client-database query is served by an index, at club-sized scale.
+
+Builds a throwaway database with the real migrations, fills it with synthetic clients
+(50,000 by default), groups, assignments and status events, then runs the actual repository
+functions the pages call. Every SQL statement they issue is captured, run through
+EXPLAIN QUERY PLAN and timed. A plan step that scans a whole table without an index fails
+the check; a temporary B-tree for ORDER BY is reported but allowed.
+
+    python benchmarks/query_plans.py [--clients 50000] [--keep path/to/bench.db]
+
+Exit status is 1 if any hot query does a full table scan.
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit_app import repository  # noqa: E402
+from streamlit_app.migrations import apply_migrations  # noqa: E402
+
+STATUSES = ["Full Training", "Modified Training", "Rehab", "No Training"]
+
+
+def populate(conn: sqlite3.Connection, n_clients: int, n_groups: int, seed: int = 7):
+    """Synthetic club: ~4% coaches, ~85% active, 1-2 groups per athlete, 1-5 per coach."""
+    rng = random.Random(seed)
+    clients, assignments, events = [], [], []
+    groups = [(g, "Gymsport", f"Club {g % 10}", f"Squad {g}", rng.choice(["Senior", "Junior", None]))
+              for g in range(1, n_groups + 1)]
+    for i in range(n_clients):
+        cid = str(10_000_000 + i)
+        coach = i % 25 == 0
+        clients.append((cid, "Coach" if coach else "Athlete", f"First{rng.randrange(5000)}",
+                        f"Last{rng.randrange(20000)}", f"user{i}", "", None, f"u{i}@example.com",
+                        "pw", "active" if rng.random() < 0.85 else "deactivated"))
+        for gid in rng.sample(range(1, n_groups + 1), rng.randint(1, 5) if coach else rng.randint(1, 2)):
+            assignments.append((cid, gid))
+        for d in range(rng.randint(0, 3)):
+            events.append((cid, rng.choice(STATUSES), f"2026-0{d + 1}-15", ""))
+    conn.executemany("INSERT INTO group_hierarchy(id, group_parent, club, group_name, group_sub) "
+                     "VALUES (?, ?, ?, ?, ?)", groups)
+    conn.executemany("INSERT INTO clients(id, account_type, first_name, last_name, username, gender, "
+                     "mobile, email, password, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", clients)
+    conn.executemany("INSERT INTO user_group_assignments(user_id, group_id) VALUES (?, ?)", assignments)
+    conn.executemany("INSERT INTO status_events(client_id, status, date, comment) VALUES (?, ?, ?, ?)", events)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def hot_paths(conn: sqlite3.Connection):
+    """(label, callable) for each page data path that must stay indexed."""
+    gid = conn.execute("SELECT group_id FROM user_group_assignments "
+                       "GROUP BY group_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    coach = conn.execute("SELECT id FROM clients WHERE account_type='Coach' LIMIT 1").fetchone()[0]
+    squad = [cid for cid, _, _ in repository.fetch_roster(conn, gid)]
+    club = repository.group_path("Gymsport", "Club 3")
+
+    def membership():
+        repository.invalidate_membership()
+        return repository.get_membership(conn)
+
+    def group_directory():
+        repository.invalidate_membership()
+        return repository.get_group_directory(conn)
+
+    return [
+        ("dashboard: active client count", lambda: repository.count_active_clients(conn)),
+        ("roster: all active athletes", lambda: repository.fetch_roster(conn)),
+        ("roster: one group", lambda: repository.fetch_roster(conn, gid)),
+        ("roster: club subtree", lambda: repository.fetch_roster(conn, subtree=club)),
+        ("groups: club subtree ids", lambda: repository.fetch_subtree_group_ids(conn, club)),
+        ("membership map load", membership),
+        ("coach: visible groups", lambda: repository.fetch_visible_groups(conn, coach)),
+        ("coach list", lambda: repository.fetch_coaches_basic(conn)),
+        ("settings: group directory", group_directory),
+        ("groups: all, ordered", lambda: repository.fetch_all_groups(conn)),
+        ("status board: one squad", lambda: repository.fetch_status_board(conn, squad)),
+    ]
+
+
+def capture_sql(conn: sqlite3.Connection, fn) -> list[str]:
+    """The SELECT statements fn issues, with parameters expanded."""
+    seen = []
+    conn.set_trace_callback(seen.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in seen if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+
+def plan_problems(conn: sqlite3.Connection, sql: str) -> tuple[list[str], list[str]]:
+    """(full table scans, notes) from EXPLAIN QUERY PLAN of sql."""
+    scans, notes = [], []
+    for _, _, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        if detail.startswith("SCAN ") and "INDEX" not in detail and "VIRTUAL TABLE" not in detail \
+                and "CONSTANT ROW" not in detail:
+            scans.append(detail)
+        elif "TEMP B-TREE" in detail:
+            notes.append(detail)
+    return scans, notes
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--clients", type=int, default=50_000)
+    ap.add_argument("--groups", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per path (median is reported)")
+    ap.add_argument("--keep", type=Path, help="write the database here instead of a temp file")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = args.keep or Path(tmp) / "bench.db"
+        db.unlink(missing_ok=True)
+        conn = sqlite3.connect(str(db))
+        conn.execute("PRAGMA foreign_keys = ON")
+        apply_migrations(conn)
+        t0 = time.perf_counter()
+        populate(conn, args.clients, args.groups)
+        print(f"{args.clients:,} clients, {args.groups} groups populated in {time.perf_counter() - t0:.1f}s "
+              f"(SQLite {sqlite3.sqlite_version})\n")
+
+        failed = False
+        print(f"{'path':34s} {'median ms':>10s}  plan")
+        for label, fn in hot_paths(conn):
+            timings = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - t) * 1000)
+            verdicts = []
+            for sql in capture_sql(conn, fn):
+                scans, notes = plan_problems(conn, sql)
+                if scans:
+                    failed = True
+                    verdicts += [f"FULL SCAN: {s}" for s in scans]
+                verdicts += [f"note: {n}" for n in notes]
+            print(f"{label:34s} {statistics.median(timings):10.2f}  {'; '.join(verdicts) or 'indexed'}")
+        conn.close()
+
+    print("\nFAIL: hot queries doing full table scans" if failed else "\nOK: every hot query uses an index")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# benchmarks/synthetic_data.py
+"""
+Build a synthetic clinic at a chosen scale: client_database.db, patient_pdfs and patient_status
+laid out exactly as the app keeps them, so the pages (or the benchmarks) can be pointed at it.
+
+    python benchmarks/synthetic_data.py OUT_DIR [--clients 10000] [--programs 200000] [--groups 1000]
+
+Writes OUT_DIR/client_database.db (real migrations), OUT_DIR/patient_pdfs/<Last_First_id>/*.json
+program files whose exercises are drawn from exercise_database.csv, and
+OUT_DIR/patient_status/<Last_First_id>/status.json. The programs index is then built from the
+files with the app's own reconcile pass, so it is also a measurement of a cold index build.
+
+The club is shaped like the real one: a few sports, clubs under each, squads under each club,
+some split into Senior/Junior/Development; ~4% coaches in 1-5 squads, athletes in 1-2, ~85%
+active. Program counts per athlete are skewed (a few rehab-heavy athletes have many), status
+histories have 1-4 changes. Everything is drawn from one seed, so a scale is reproducible.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit_app.catalog import read_catalog_csv  # noqa: E402
+from streamlit_app.db import connect  # noqa: E402
+from streamlit_app.migrations import apply_migrations  # noqa: E402
+from streamlit_app.repository import EXERCISE_DB_PATH, reconcile_program_index  # noqa: E402
+
+SPORTS = ("Gymsport", "Swimming", "Athletics", "Rowing", "Netball")
+SUBS = (None, None, "Senior", "Junior", "Development")
+STATUSES = ("Full Training", "Modified Training", "Rehab", "No Training")
+STATUS_WEIGHTS = (70, 15, 10, 5)
+SESSION_TYPES = ("Rehab", "Prehab", "Recovery")
+SESSION_NAMES = ("Week 1", "Week 2", "Week 3", "Return to Train", "Strength Block", "Deload",
+                 "Landing Prep", "Pre-season", "Taper", "Home Program")
+RESTRICTIONS = ("", "", "", "No impact", "Upper body only", "Avoid end-range flexion",
+                "Limit volume to 50%", "No tumbling")
+FIRST_NAMES = ("Ava", "Mia", "Zoe", "Ella", "Ruby", "Lily", "Isla", "Chloe", "Grace", "Sophie",
+               "Liam", "Noah", "Jack", "Owen", "Sam", "Max", "Leo", "Tom", "Zane", "Carlos")
+LAST_NAMES = ("Smith", "Jones", "Brown", "Wilson", "Taylor", "Nguyen", "Lee", "Martin", "White",
+              "Walker", "Hall", "Young", "King", "Wright", "Scott", "Green", "Baker", "Adams",
+              "McLean", "Grant", "Blue", "Vagg", "Lai", "Arapoglou")
+# Exercise row fields stored in a program file (new_program.render_exercise_fields)
+EXERCISE_FIELDS = ("body_part", "movement_type", "sub_movement_type", "position", "exercise",
+                   "volume", "notes", "progressions")
+
+
+@dataclass(frozen=True)
+class Scale:
+    clients: int
+    programs: int
+    groups: int
+
+    def __str__(self):
+        return f"{self.clients:,} clients / {self.programs:,} programs / {self.groups:,} groups"
+
+
+@dataclass
+class Clinic:
+    """Where a generated clinic lives, and what went into it."""
+    root: Path
+    scale: Scale
+    seconds: dict = field(default_factory=dict)  # phase -> seconds generate() took for it
+
+    @property
+    def db_path(self) -> Path:
+        return self.root / "client_database.db"
+
+    @property
+    def pdf_dir(self) -> Path:
+        return self.root / "patient_pdfs"
+
+    @property
+    def status_dir(self) -> Path:
+        return self.root / "patient_status"
+
+
+def _group_rows(rng: random.Random, n_groups: int) -> list[tuple]:
+    """n_groups distinct (id, group_parent, club, group_name, group_sub) rows."""
+    rows, seen = [], set()
+    clubs_per_sport = max(1, n_groups // (len(SPORTS) * 12))
+    while len(rows) < n_groups:
+        key = (rng.choice(SPORTS), f"Club {rng.randrange(clubs_per_sport) + 1}",
+               f"Squad {rng.randrange(12) + 1}", rng.choice(SUBS))
+        if key not in seen:
+            seen.add(key)
+            rows.append((len(rows) + 1,) + key)
+    return rows
+
+
+def _history(rng: random.Random, today: date) -> list[dict]:
+    """1-4 status changes over the last year, oldest first, no two in a row the same."""
+    day = today - timedelta(days=rng.randrange(30, 365))
+    history, status = [], None
+    for _ in range(rng.randint(1, 4)):
+        status = rng.choices([s for s in STATUSES if s != status],
+                             [w for s, w in zip(STATUSES, STATUS_WEIGHTS) if s != status])[0]
+        history.append({"status": status, "date": day.isoformat(),
+                        "comment": rng.choice(RESTRICTIONS) if status != "Full Training" else ""})
+        day = min(today, day + timedelta(days=rng.randrange(7, 90)))
+    return history
+
+
+def _program_counts(rng: random.Random, n_athletes: int, n_programs: int) -> list[int]:
+    """Programs per athlete summing to n_programs, Pareto-skewed (most have a few, some many)."""
+    weights = [rng.paretovariate(1.5) for _ in range(n_athletes)]
+    total = sum(weights)
+    counts = [int(n_programs * w / total) for w in weights]
+    for i in rng.choices(range(n_athletes), weights, k=n_programs - sum(counts)):
+        counts[i] += 1
+    return counts
+
+
+def generate(root: Path, scale: Scale, seed: int = 7) -> Clinic:
+    """Build a clinic of the given scale under root (which must not already hold one)."""
+    rng = random.Random(seed)
+    today = date.today()
+    root = Path(root)
+    clinic = Clinic(root=root, scale=scale)
+    if clinic.db_path.exists():
+        raise FileExistsError(f"{clinic.db_path} already exists")
+    root.mkdir(parents=True, exist_ok=True)
+
+    # ── database: groups, clients, assignments, status history ────────────────
+    t0 = time.perf_counter()
+    conn = connect(clinic.db_path)
+    apply_migrations(conn)
+    groups = _group_rows(rng, scale.groups)
+    clients, assignments, events, athletes = [], [], [], []
+    for i in range(scale.clients):
+        cid = str(10_000_000 + i)
+        coach = i % 25 == 0
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        clients.append((cid, "Coach" if coach else "Athlete", first, last, f"{first}{last[:2]}{i}".lower(),
+                        rng.choice(("Male", "Female")), None, f"u{i}@example.com", "pw",
+                        "active" if rng.random() < 0.85 else "deactivated"))
+        k = rng.randint(1, 5) if coach else rng.randint(1, 2)
+        assignments += [(cid, gid) for gid in rng.sample(range(1, scale.groups + 1), min(k, scale.groups))]
+        if not coach:
+            athletes.append((cid, first, last))
+            events.append((cid, _history(rng, today)))
+    conn.executemany("INSERT INTO group_hierarchy(id, group_parent, club, group_name, group_sub) "
+                     "VALUES (?, ?, ?, ?, ?)", groups)
+    conn.executemany("INSERT INTO clients(id, account_type, first_name, last_name, username, gender, "
+                     "mobile, email, password, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", clients)
+    conn.executemany("INSERT INTO user_group_assignments(user_id, group_id) VALUES (?, ?)", assignments)
+    conn.executemany("INSERT INTO status_events(client_id, status, date, comment) VALUES (?, ?, ?, ?)",
+                     [(cid, h["status"], h["date"], h["comment"]) for cid, history in events for h in history])
+    conn.commit()
+    clinic.seconds["database"] = time.perf_counter() - t0
+
+    # ── patient_status: status.json as the app kept it before status_events ────
+    t0 = time.perf_counter()
+    names = {cid: (first, last) for cid, first, last in athletes}
+    for cid, history in events:
+        first, last = names[cid]
+        folder = clinic.status_dir / f"{last}_{first}_{cid}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / "status.json").write_text(json.dumps({
+            "firstname": first, "lastname": last, "client_id": cid,
+            "current_status": history[-1]["status"], "restrictions": history[-1]["comment"],
+            "last_updated": history[-1]["date"], "history": history,
+        }, indent=2), encoding="utf-8")
+    clinic.seconds["patient_status"] = time.perf_counter() - t0
+
+    # ── patient_pdfs: program files, exercises drawn from the catalog ─────────
+    t0 = time.perf_counter()
+    df, _ = read_catalog_csv(EXERCISE_DB_PATH)
+    exercises = df[list(EXERCISE_FIELDS)].to_dict("records")
+    for (cid, first, last), n in zip(athletes, _program_counts(rng, len(athletes), scale.programs)):
+        folder = clinic.pdf_dir / f"{last}_{first}_{cid}"
+        folder.mkdir(parents=True, exist_ok=True)
+        written = set()
+        while len(written) < n:
+            name = rng.choice(SESSION_NAMES)
+            when = (today - timedelta(days=rng.randrange(730))).isoformat()
+            fname = f"{last}_{first}_{name}_{when}.json"
+            if fname in written:
+                continue
+            written.add(fname)
+            # Picked rows keep catalog order, so the program reads top-down like the editor builds it
+            picks = sorted(rng.sample(range(len(exercises)), rng.randint(3, 10)))
+            (folder / fname).write_text(json.dumps({
+                "firstname": first, "lastname": last,
+                "session_type": rng.choice(SESSION_TYPES), "rehab_type": name,
+                "prescription_date": when,
+                "exercises": [exercises[p] for p in picks],
+                "extra_comments": "",
+            }, ensure_ascii=False, indent=4), encoding="utf-8")
+    clinic.seconds["patient_pdfs"] = time.perf_counter() - t0
+
+    # ── programs index, built the way the app builds it on first start ────────
+    t0 = time.perf_counter()
+    reconcile_program_index(conn, clinic.pdf_dir)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    clinic.seconds["program index"] = time.perf_counter() - t0
+    return clinic
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("out", type=Path, help="directory to create the clinic in")
+    ap.add_argument("--clients", type=int, default=10_000)
+    ap.add_argument("--programs", type=int, default=200_000)
+    ap.add_argument("--groups", type=int, default=1_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    scale = Scale(args.clients, args.programs, args.groups)
+    clinic = generate(args.out, scale, args.seed)
+    print(f"{scale} written to {clinic.root}")
+    for phase, seconds in clinic.seconds.items():
+        print(f"  {phase:16s} {seconds:7.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
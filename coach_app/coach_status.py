@@ -2,20 +2,15 @@
 
 import streamlit as st
 from pathlib import Path
-import json
 from datetime import date
-import sys, os
 
-# ─── Allow imports from your main streamlit_app ───────────────────────────
-ROOT = Path(__file__).parent.parent
-STREAMLIT_APP = ROOT / "streamlit_app"
-sys.path.insert(0, str(STREAMLIT_APP))
+from fpdf import FPDF
 
-from utils               import get_client_db, fetch_all_groups, fetch_user_groups
-from _common             import apply_global_css, page_header
-from pages.client_status import PATIENT_STATUS_DIR
+from streamlit_app.utils      import get_client_db
+from streamlit_app.repository import fetch_visible_groups, fetch_roster, fetch_status_board, build_group_tree
+from streamlit_app._common    import apply_global_css, page_header, group_tree_select
 
-from fpdf import FPDF
+STREAMLIT_APP = Path(__file__).parent.parent / "streamlit_app"
 
 def build_pdf_by_status(logo_path: Path, heading: str, subheading: str,
                         grouped: dict[str, list[dict]], status_order: list[str]) -> bytes:
@@ -75,42 +70,22 @@ def render_coach_status(coach_id: int):
         st.error("Cannot open client database.")
         return
 
-    # build coach's group filter
-    df = fetch_all_groups(conn)
-    group_map = {"All": None}
-    for _, r in df.iterrows():
-        gid = r["id"]
-        if gid in fetch_user_groups(conn, coach_id):
-            parts = [p for p in (r["group_parent"], r["club"], r["group_name"], r["group_sub"]) if p]
-            label = " / ".join(parts)
-            group_map[f"{label} (ID:{gid})"] = gid
+    # build coach's group filter: a tree of the groups they are assigned to
+    tree = build_group_tree(fetch_visible_groups(conn, coach_id))
 
     col1, col2 = st.columns([3,1])
-    sel_label = col1.selectbox("Filter by Group", list(group_map.keys()))
-    sel_gid    = group_map[sel_label]
-
-    # fetch clients
-    cur = conn.cursor()
-    cur.execute("""
-      SELECT id, first_name, last_name
-        FROM clients
-       WHERE account_type='Athlete' AND status='active'
-       ORDER BY last_name, first_name
-    """)
-    athletes = cur.fetchall()
-
-    clients = []
-    for cid, fn, ln in athletes:
-        if sel_gid and sel_gid not in fetch_user_groups(conn, cid):
-            continue
-        clients.append((cid, fn, ln))
+    node = group_tree_select("Filter by Group", tree, key="coach_group_node", container=col1)
+    sel_label = node.name if node else "All"
+
+    # fetch clients (active athletes, limited to the selected subtree of the coach's groups;
+    # group_ids rather than the path range, so groups the coach is not in never show up)
+    clients = fetch_roster(conn, node.group_ids if node else None)
 
     if not clients:
         st.info("No clients in your assigned groups.")
         return
 
     # prepare summary & history
-    today_str = date.today().strftime("%Y-%m-%d")
     order_map = {"Modified Training":0, "Full Training":1, "Rehab":2, "No Training":3}
     colour_map = {
         "Modified Training":"orange",
@@ -122,26 +97,16 @@ def render_coach_status(coach_id: int):
     grouped      = {}
     history_map  = {}
 
+    # one query for the whole squad
+    board = fetch_status_board(conn, [cid for cid, _, _ in clients])
     for cid, fn, ln in clients:
-        fld = PATIENT_STATUS_DIR / f"{ln}_{fn}_{cid}" / "status.json"
-        data = {}
-        if fld.exists():
-            try: data = json.loads(fld.read_text("utf-8"))
-            except: data = {}
-
-        curr = data.get("current_status", "Full Training")
-        comm = data.get("restrictions", "")
-        last = data.get("last_updated", today_str)
-
-        grouped.setdefault(curr, []).append({
+        data = board[cid]
+        grouped.setdefault(data.current_status, []).append({
             "name": f"{fn} {ln}",
-            "comms": comm,
-            "last": last
+            "comms": data.restrictions,
+            "last": data.last_updated
         })
-
-        hist = data.get("history", []) or [{"status":curr,"date":today_str,"comment":comm}]
-        for e in hist: e.setdefault("comment","")
-        history_map[cid] = hist
+        history_map[cid] = data.history
 
     # build PDF
     status_order = sorted(order_map.keys(), key=lambda s: order_map[s])
@@ -206,18 +171,11 @@ def render_coach_status(coach_id: int):
     # per‐client expanders: timeline + **static** history table
     for cid, fn, ln in clients:
         hist    = history_map[cid]
-        fld     = PATIENT_STATUS_DIR / f"{ln}_{fn}_{cid}" / "status.json"
-        data    = {}
-        if fld.exists():
-            try: data = json.loads(fld.read_text("utf-8"))
-            except: data = {}
-
-        current = data.get("current_status", "Full Training")
         name    = f"{fn} {ln}"
 
         with st.expander(name):
             # date markers above bar
-            dates    = [date.fromisoformat(h["date"]) for h in hist]
+            dates    = [date.fromisoformat(h.date) for h in hist]
             start_lbl = dates[0].strftime("%Y-%m-%d")
             end_lbl   = date.today().strftime("%Y-%m-%d")
             st.markdown(
@@ -240,7 +198,7 @@ def render_coach_status(coach_id: int):
                 start = dates[i]
                 end   = dates[i+1] if i+1 < len(dates) else date.today()
                 span  = max((end - start).days,1)
-                col   = colour_map.get(h["status"], "gray")
+                col   = colour_map.get(h.status, "gray")
                 segments.append(f"<div style='flex:{span};background:{col};'></div>")
 
             st.markdown(
@@ -266,9 +224,9 @@ def render_coach_status(coach_id: int):
               </tr>
             """
             for entry in hist:
-                d = entry["date"]
-                s = entry["status"]
-                c = entry.get("comment","")
+                d = entry.date
+                s = entry.status
+                c = entry.comment
                 color = colour_map.get(s,"gray")
                 tbl += (
                   "<tr>"
@@ -4,7 +4,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import streamlit as st
 from login_coach    import login_page
-from coach_status   import render_coach_status
 
 st.set_page_config(
     page_title="Coach Portal",
@@ -19,5 +18,6 @@ if not st.session_state["authenticated_coach"]:
     login_page()
     st.stop()
 
-# once logged in, hand off the coach_id
+# once logged in, hand off the coach_id (the dashboard and its PDF export load only now)
+from coach_status   import render_coach_status
 render_coach_status(st.session_state["coach_id"])
@@ -2,16 +2,12 @@
 
 import sys, os
 from pathlib import Path
-import base64
 import streamlit as st
 
 # allow import of your main app's utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from streamlit_app.utils import get_client_db
-
-def _img_to_base64(path: Path) -> str:
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+from streamlit_app.assets import img_tag
 
 def login_page():
     # ----------------------------
@@ -47,14 +43,12 @@ def login_page():
     # 2) LOGO
     # ----------------------------
     logo_path = Path(__file__).parent.parent / "streamlit_app" / "images" / "company_logo4.png"
-    if logo_path.exists():
-        b64 = _img_to_base64(logo_path)
+    logo_html = img_tag(logo_path, alt="CK Sports Physio Logo", style="width:75%; max-width:250px;")
+    if logo_html:
         st.markdown(
             f"""
             <div style="text-align:center; margin-bottom:2rem;">
-              <img src="data:image/png;base64,{b64}"
-                   alt="CK Sports Physio Logo"
-                   style="width:75%; max-width:250px;" />
+              {logo_html}
             </div>
             """,
             unsafe_allow_html=True,
@@ -1,5 +1,6 @@
 import streamlit as st
-from streamlit_app.utils   import get_client_db, fetch_all_groups, fetch_user_groups
+from streamlit_app.utils      import get_client_db
+from streamlit_app.repository import write, update_client_step
 from streamlit_app._common import apply_global_css, page_header
 
 def coach_settings():
@@ -34,10 +35,7 @@ def coach_settings():
     new_email = st.text_input("Email", email, key="chg_email")
 
     if st.button("Save Changes"):
-        cur.execute("""
-            UPDATE clients
-               SET first_name=?, last_name=?, email=?
-             WHERE id=?
-        """, (new_fn, new_ln, new_email, coach_id))
-        conn.commit()
+        write(conn, update_client_step(
+            coach_id, {"first_name": new_fn, "last_name": new_ln, "email": new_email}
+        )).result()
         st.success("Profile updated.")
@@ -2,8 +2,14 @@
 
 import streamlit as st
 import base64 # <--- KEPT THIS IMPORT
+import contextlib
+import functools
+import os
+import re
 from pathlib import Path
 
+from streamlit_app.assets import img_tag
+
 # NOTE: No import for get_base64_image from utils, as it's defined in this file.
 
 def apply_global_css():
@@ -119,23 +125,19 @@ def page_header(title: str, icon_path: Path = None):
     """
     root = Path(__file__).parent  # streamlit_app/
     logo_file = root / "images" / "company_logo4.png"
-    logo_b64 = get_base64_image(logo_file) # Calls the get_base64_image from THIS file
-    
+    # Images go out as URLs (see assets.py), not as base64 in every rerun's markdown
+    logo_html = img_tag(logo_file, style="width:150px;")
+
     # Handle missing logo gracefully
-    if not logo_file.exists():
-        st.warning(f"Company logo not found at: {logo_file}. Using placeholder.")
+    if not logo_html:
+        st.warning(f"Company logo not found at: {logo_file}.")
 
 
     icon_html = ""
     if icon_path:
         ip = Path(icon_path)
-        if ip.exists():
-            icon_b64 = get_base64_image(ip) # Calls the get_base64_image from THIS file
-            icon_html = (
-                f'<img src="data:image/png;base64,{icon_b64}" '
-                f'style="width:50px; margin-right:10px;" />'
-            )
-        else:
+        icon_html = img_tag(ip, style="width:50px; margin-right:10px;")
+        if not icon_html:
             st.warning(f"Header icon not found at: {ip}")
 
 
@@ -146,7 +148,7 @@ def page_header(title: str, icon_path: Path = None):
             {icon_html}<h1 style="margin:0;">{title}</h1>
           </div>
           <div>
-            <img src="data:image/png;base64,{logo_b64}" style="width:150px;" />
+            {logo_html}
           </div>
         </div>
         <hr style="margin-top:10px;" />
@@ -165,4 +167,180 @@ def get_status_color(status: str) -> str:
         "Rehab":             "#17a2b8",   # teal
         "No Training":       "#dc3545",   # red
     }
-    return mapping.get(status, "#777777")   # default grey
\ No newline at end of file
+    return mapping.get(status, "#777777")   # default grey
+
+def group_tree_select(label: str, nodes, key: str = None, container=st, all_label: str = "All"):
+    """
+    Selectbox over a group tree (repository.build_group_tree nodes), indented by level, with an
+    "All" entry first. Returns the chosen node, or None for "All".
+    Picking a club, group or parent selects every group underneath it.
+    """
+    by_path = {node.path: node for node in nodes}
+
+    def fmt(path):
+        if path is None:
+            return all_label
+        node = by_path[path]
+        count = f"  · {len(node.group_ids)} groups" if len(node.group_ids) > 1 else ""
+        return "\u2003" * node.depth + ("└ " if node.depth else "") + node.name + count
+
+    choice = container.selectbox(label, [None] + list(by_path), format_func=fmt, key=key)
+    return by_path.get(choice)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Instrumentation (see instrumentation.py): opt-in per rerun, admin-only panel
+# instrumentation and profiling are imported where used: they pull in the repository (and so
+# pandas), which the login screen, also built from this module, must not load.
+# ──────────────────────────────────────────────────────────────────────────────
+# Login usernames allowed the admin tools, comma-separated, e.g. CK_ADMIN_USERS="BenG,SandraS"
+ADMIN_USERS_ENV = "CK_ADMIN_USERS"
+# Set to 1 to record every session's reruns; admins can also switch it on for their own session
+INSTRUMENT_ENV = "CK_INSTRUMENT"
+# Recorded reruns kept in a session for the panel
+PERF_PANEL_HISTORY = 20
+# Query parameter asking an admin's next rerun to be profiled: ?profile=1 (any page) or ?profile=client_status
+PROFILE_QUERY_PARAM = "profile"
+
+
+def is_admin() -> bool:
+    """Whether the logged-in user is listed in CK_ADMIN_USERS."""
+    admins = {u.strip() for u in os.environ.get(ADMIN_USERS_ENV, "").split(",") if u.strip()}
+    return st.session_state.get("username", "") in admins
+
+
+def instrumentation_enabled() -> bool:
+    return os.environ.get(INSTRUMENT_ENV, "") not in ("", "0") or st.session_state.get("instrument_session", False)
+
+
+_markdown_probe_installed = False
+
+
+def install_markdown_probe():
+    """
+    Route st.markdown (and container.markdown) through instrumentation.count_markdown.
+    Installed on first use; the probe costs one ContextVar lookup when nothing is recorded.
+    """
+    global _markdown_probe_installed
+    if _markdown_probe_installed:
+        return
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit_app import instrumentation
+    original = DeltaGenerator.markdown
+
+    @functools.wraps(original)
+    def markdown(self, body, *args, **kwargs):
+        instrumentation.count_markdown(body)
+        return original(self, body, *args, **kwargs)
+
+    DeltaGenerator.markdown = markdown
+    st.markdown = markdown.__get__(st._main)  # st.markdown was bound to the main container at import
+    _markdown_probe_installed = True
+
+
+@contextlib.contextmanager
+def instrument_rerun(page: str):
+    """
+    Record the block as one rerun of page when instrumentation is on (yields the trace, or None).
+    The trace is logged, and kept in the session for render_perf_panel().
+    """
+    if not instrumentation_enabled():
+        yield None
+        return
+    from streamlit_app import instrumentation
+
+    install_markdown_probe()
+    trace = None
+    try:
+        with instrumentation.record(page, user=st.session_state.get("username", "")) as trace:
+            yield trace
+    finally:
+        if trace is not None:
+            recent = st.session_state.setdefault("_perf_traces", [])
+            recent.append(trace)
+            del recent[:-PERF_PANEL_HISTORY]
+
+
+def _page_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def profile_requested(page: str) -> bool:
+    """
+    Whether this rerun of page should be profiled: for admins only (is_admin()), ?profile=...
+    matches it or the panel's toggle is on.
+    """
+    if not is_admin():
+        return False
+    wanted = st.query_params.get(PROFILE_QUERY_PARAM)
+    if wanted is not None and (wanted.lower() in ("", "1", "true", "yes") or _page_key(wanted) == _page_key(page)):
+        return True
+    return bool(st.session_state.get("profile_next"))
+
+
+@contextlib.contextmanager
+def profile_rerun(page: str):
+    """
+    Capture a cProfile trace and tracemalloc diff of the block when profile_requested(page)
+    (see profiling.py). One capture per request: the query parameter and toggle are cleared.
+    """
+    if not profile_requested(page):
+        yield None
+        return
+    from streamlit_app import profiling
+
+    summary = None
+    try:
+        with profiling.capture(page, user=st.session_state.get("username", "")) as summary:
+            yield summary
+    finally:
+        if summary is not None:
+            st.query_params.pop(PROFILE_QUERY_PARAM, None)
+            st.session_state["profile_next"] = False
+            st.session_state["_last_profile"] = summary.name
+    if summary is not None:
+        st.toast(f"Profile of this {page} rerun saved ({summary.wall_ms:,.0f} ms).")
+
+
+def render_perf_panel(container=None):
+    """Admin-only sidebar panel: switch recording on for this session, and the recorded reruns."""
+    if not is_admin():
+        return
+    from streamlit_app import instrumentation
+
+    container = container or st.sidebar
+    with container.expander("Performance", expanded=False):
+        if os.environ.get(INSTRUMENT_ENV, "") not in ("", "0"):
+            st.caption(f"Recording every session ({INSTRUMENT_ENV} is set).")
+        else:
+            st.toggle("Record my reruns", key="instrument_session")
+        st.toggle("Profile next rerun", key="profile_next",
+                  help=f"cProfile + tracemalloc of the next rerun, listed in Settings. "
+                       f"Or add ?{PROFILE_QUERY_PARAM}=<page> to the URL (admins only).")
+        if st.session_state.get("_last_profile"):
+            st.caption(f"Last profile: {st.session_state['_last_profile']}")
+        recent = st.session_state.get("_perf_traces", [])
+        if not recent:
+            st.caption("No reruns recorded yet.")
+            return
+        last = recent[-1]
+        st.markdown(f"**{last.page}** · {last.started}")
+        c1, c2 = st.columns(2)
+        c1.metric("Rerun", f"{last.total_ms:,.0f} ms")
+        c2.metric("SQL", f"{last.query_ms:,.0f} ms", f"{last.queries} statements", delta_color="off")
+        c1.metric("Files opened", last.files_opened, f"{last.dirs_listed} dirs listed", delta_color="off")
+        c2.metric("Markdown", f"{last.markdown_bytes / 1024:,.1f} KB", f"{last.markdown_calls} calls",
+                  delta_color="off")
+        st.dataframe(
+            [{"section": "\u2003" * s.depth + s.name, "ms": round(s.ms, 1)} for s in last.sections],
+            hide_index=True, use_container_width=True,
+        )
+        if last.files:
+            st.caption("Files opened: " + ", ".join(Path(f).name for f in last.files))
+        st.caption("Recent reruns")
+        st.dataframe(
+            [{"page": t.page, "ms": round(t.total_ms), "sql": t.queries, "files": t.files_opened,
+              "md KB": round(t.markdown_bytes / 1024, 1)} for t in reversed(recent)],
+            hide_index=True, use_container_width=True,
+        )
+        st.caption(f"Logged to {instrumentation.PERF_LOG}")
@@ -0,0 +1,129 @@
+# streamlit_app/assets.py
+"""
+Logos, icons and exercise images referenced by URL instead of inlined as base64.
+
+With Streamlit static serving on (server.enableStaticServing, see .streamlit/config.toml) a file
+is published once into the running app's static/ folder under a content-hashed name
+(company_logo4.3f2a9c81d0e4.png) and referenced as app/static/<name>: the browser fetches it
+once and revalidates it, instead of every rerun resending it inside the websocket delta.
+Because the name changes with the content, a replaced image can never be served stale.
+
+Streamlit reads .streamlit/config.toml from the directory it is started in, so the setting is in
+both the project root's and streamlit_app/'s config. Without static serving (an app started from
+any other folder) the fallback is a data URI, encoded once per file version and kept in memory, so
+at least the read + encode is not repeated on every rerun; a warning is logged once when that
+happens.
+"""
+
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+from html import escape
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+STATIC_FOLDER = "static"
+STATIC_URL_PREFIX = "app/static"
+
+_lock = threading.Lock()
+_urls: dict[tuple, str] = {}       # (path, mtime_ns, static dir) -> app/static URL
+_data_uris: dict[tuple, str] = {}  # (path, mtime_ns) -> data URI
+_warned_fallback = False
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _static_dir() -> Optional[Path]:
+    """static/ next to the running app's main script, if Streamlit is serving it."""
+    if not st.get_option("server.enableStaticServing"):
+        _warn_fallback()
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None
+    return Path(ctx.main_script_path).parent / STATIC_FOLDER
+
+
+def _warn_fallback():
+    global _warned_fallback
+    if not _warned_fallback:
+        _warned_fallback = True
+        logging.getLogger(__name__).warning(
+            "server.enableStaticServing is off, so images are inlined as data URIs. Start Streamlit "
+            "from the project root (or streamlit_app/), where .streamlit/config.toml turns it on."
+        )
+
+
+def data_uri(path: Path) -> Optional[str]:
+    """base64 data URI of path (cached per file version), or None if it does not exist."""
+    path = Path(path)
+    mtime = _mtime_ns(path)
+    if mtime is None:
+        return None
+    key = (str(path), mtime)
+    uri = _data_uris.get(key)
+    if uri is None:
+        mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        uri = f"data:{mime};base64,{base64.b64encode(path.read_bytes()).decode()}"
+        with _lock:
+            for old in [k for k in _data_uris if k[0] == key[0]]:
+                del _data_uris[old]
+            _data_uris[key] = uri
+    return uri
+
+
+def _publish(path: Path, static_dir: Path) -> str:
+    data = path.read_bytes()
+    name = f"{path.stem}.{hashlib.sha1(data).hexdigest()[:12]}{path.suffix.lower()}"
+    target = static_dir / name
+    if not target.exists():
+        static_dir.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{name}.{os.getpid()}.tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    return f"{STATIC_URL_PREFIX}/{quote(name)}"
+
+
+def asset_url(path: Path) -> Optional[str]:
+    """
+    URL to use as an <img src> for path: a hashed app/static URL when static serving is on,
+    a cached data URI otherwise. None if the file does not exist. Costs one stat when cached.
+    """
+    path = Path(path)
+    static_dir = _static_dir()
+    if static_dir is None:
+        return data_uri(path)
+    mtime = _mtime_ns(path)
+    if mtime is None:
+        return None
+    key = (str(path), mtime, str(static_dir))
+    url = _urls.get(key)
+    if url is None:
+        try:
+            url = _publish(path, static_dir)
+        except OSError:
+            return data_uri(path)  # static folder not writable: inline instead
+        with _lock:
+            _urls[key] = url
+    return url
+
+
+def img_tag(path: Path, style: str = "", alt: str = "") -> str:
+    """<img> tag for path via asset_url, or '' if the file does not exist."""
+    url = asset_url(path)
+    if url is None:
+        return ""
+    return f'<img src="{url}" alt="{escape(alt)}" style="{style}" />'
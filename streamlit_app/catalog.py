@@ -0,0 +1,444 @@
+# streamlit_app/catalog.py
+
+import hashlib
+import io
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+
+# Cascading levels of the exercise catalog, top to bottom
+HIERARCHY_LEVELS = ("body_part", "movement_type", "sub_movement_type", "position", "exercise")
+# Low-cardinality columns stored as pandas categoricals
+CATEGORY_COLUMNS = ("body_part", "movement_type", "sub_movement_type", "position")
+# Columns the Exercise Database filters and the program editors facet on
+FACETS = CATEGORY_COLUMNS
+# Cached value_counts results kept per FacetIndex before its cache is emptied
+FACET_COUNTS_CACHE_SIZE = 4096
+# Text fields covered by the exercise search, with their weight in the ranking
+SEARCH_FIELDS = (("exercise", 1.0), ("notes", 0.6), ("progressions", 0.6))
+# Encodings tried in order when decoding the CSV; latin-1 never fails
+CSV_ENCODINGS = ("utf-8", "windows-1252", "latin-1")
+
+
+@dataclass(frozen=True)
+class CatalogNode:
+    """
+    One node of the exercise catalog tree:
+    root -> body_part -> movement_type -> sub_movement_type -> position -> exercise.
+
+    options  -- sorted child keys, ready to use as selectbox options
+    children -- child nodes by key (read-only)
+    volume   -- default volume: the volume of the first catalog row under this node
+    """
+    options: tuple[str, ...]
+    children: Mapping[str, "CatalogNode"]
+    volume: str = ""
+
+    def child(self, key: str) -> "CatalogNode":
+        """Child node for key, or EMPTY_NODE if key is blank or unknown."""
+        if not key:
+            return EMPTY_NODE
+        return self.children.get(key, EMPTY_NODE)
+
+    def path(self, *keys: str) -> "CatalogNode":
+        """Follow keys down the tree; stops at EMPTY_NODE as soon as one is blank or unknown."""
+        node = self
+        for key in keys:
+            node = node.child(key)
+        return node
+
+
+EMPTY_NODE = CatalogNode(options=(), children=MappingProxyType({}), volume="")
+
+
+def _cell(value) -> str:
+    """Catalog cell as text; missing values become ''."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return str(value)
+
+
+def _freeze(raw: dict) -> CatalogNode:
+    children = {key: _freeze(sub) for key, sub in raw["children"].items()}
+    return CatalogNode(
+        options=tuple(sorted(children)),
+        children=MappingProxyType(children),
+        volume=raw["volume"],
+    )
+
+
+def build_catalog_tree(df: pd.DataFrame) -> CatalogNode:
+    """
+    Build the immutable catalog tree in a single pass over the catalog rows.
+    Rows with a blank value at any level are left out, since a blank selectbox
+    value means "nothing selected" in the program editors.
+    """
+    root = {"children": {}, "volume": None}
+    columns = list(HIERARCHY_LEVELS) + ["volume"]
+    for values in df[columns].itertuples(index=False, name=None):
+        keys = [_cell(v) for v in values[:-1]]
+        if not all(keys):
+            continue
+        volume = _cell(values[-1])
+        node = root
+        if node["volume"] is None:
+            node["volume"] = volume
+        for key in keys:
+            node = node["children"].setdefault(key, {"children": {}, "volume": volume})
+    if root["volume"] is None:
+        root["volume"] = ""
+    return _freeze(root)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Loading: CSV -> normalized DataFrame, with a Parquet sidecar keyed on mtime/hash
+# ──────────────────────────────────────────────────────────────────────────────
+def decode_catalog_bytes(raw: bytes) -> tuple[str, str]:
+    """
+    Decode the raw CSV bytes, returning (text, encoding used).
+    """
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            return raw.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    return raw.decode(CSV_ENCODINGS[-1]), CSV_ENCODINGS[-1]
+
+
+def parse_catalog_csv(raw: bytes) -> tuple[pd.DataFrame, str]:
+    """
+    Parse the catalog CSV bytes into a plain DataFrame of strings (blanks are '', never NaN).
+    Returns (DataFrame, encoding); write back with the same encoding to keep the file stable.
+    """
+    text, encoding = decode_catalog_bytes(raw)
+    df = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+    if 'body_part' not in df.columns:
+        raise ValueError("The 'body_part' column is missing from exercise_database.csv")
+    return df, encoding
+
+
+def read_catalog_csv(csv_path: Path) -> tuple[pd.DataFrame, str]:
+    """
+    Read exercise_database.csv for editing: plain string columns plus the detected encoding.
+    """
+    return parse_catalog_csv(Path(csv_path).read_bytes())
+
+
+def normalize_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Catalog as served to the pages: strings everywhere, categoricals for the hierarchy columns.
+    """
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _sidecar_paths(csv_path: Path, cache_dir: Path) -> tuple[Path, Path]:
+    stem = Path(csv_path).stem
+    return cache_dir / f"{stem}.parquet", cache_dir / f"{stem}.stamp.json"
+
+
+def _write_sidecar(df: pd.DataFrame, sidecar: Path, stamp_path: Path, stamp: dict):
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    tmp = sidecar.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, sidecar)
+    _write_stamp(stamp_path, stamp)
+
+
+def _write_stamp(stamp_path: Path, stamp: dict):
+    tmp = stamp_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(stamp), encoding="utf-8")
+    os.replace(tmp, stamp_path)
+
+
+def _read_stamp(stamp_path: Path) -> dict:
+    try:
+        return json.loads(stamp_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def load_catalog(csv_path: Path, cache_dir: Path) -> pd.DataFrame:
+    """
+    Load the normalized catalog, using a Parquet sidecar in cache_dir when it is still current.
+
+    The sidecar is trusted while the CSV's mtime and size match the stamp; if they changed,
+    the CSV is hashed and the sidecar is still reused when the content is identical.
+    Only a real content change pays for a CSV parse (and rewrites the sidecar).
+    If the sidecar cannot be read or written (e.g. no pyarrow), the CSV is parsed directly.
+    """
+    csv_path, cache_dir = Path(csv_path), Path(cache_dir)
+    sidecar, stamp_path = _sidecar_paths(csv_path, cache_dir)
+    stat = csv_path.stat()
+    stamp = _read_stamp(stamp_path)
+
+    if sidecar.exists() and stamp.get("mtime_ns") == stat.st_mtime_ns and stamp.get("size") == stat.st_size:
+        try:
+            return pd.read_parquet(sidecar)
+        except Exception:
+            pass
+
+    raw = csv_path.read_bytes()
+    digest = hashlib.sha1(raw).hexdigest()
+    new_stamp = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": digest}
+    if sidecar.exists() and stamp.get("sha1") == digest:
+        try:
+            df = pd.read_parquet(sidecar)
+            new_stamp["encoding"] = stamp.get("encoding")
+            _write_stamp(stamp_path, new_stamp)
+            return df
+        except Exception:
+            pass
+
+    df, encoding = parse_catalog_csv(raw)
+    df = normalize_catalog(df)
+    new_stamp["encoding"] = encoding
+    try:
+        _write_sidecar(df, sidecar, stamp_path, new_stamp)
+    except Exception:
+        # Sidecar is only an optimization; serve the parsed frame regardless
+        pass
+    return df
+
+
+def write_catalog_csv(df: pd.DataFrame, csv_path: Path, encoding: str):
+    """
+    Write the catalog back in its original encoding. The next load_catalog call
+    sees the new mtime/hash and refreshes the sidecar.
+    """
+    df.to_csv(csv_path, index=False, encoding=encoding)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Shared catalog: one read-only copy per process, handed to every session
+# ──────────────────────────────────────────────────────────────────────────────
+def _readonly(values: np.ndarray) -> np.ndarray:
+    values = np.array(values, copy=True)
+    values.flags.writeable = False
+    return values
+
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuild df on top of read-only NumPy arrays (categorical codes included),
+    so any in-place value write raises instead of leaking into other sessions.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical.from_codes(_readonly(series.cat.codes.to_numpy()), dtype=series.dtype)
+        else:
+            columns[col] = pd.Series(_readonly(series.to_numpy(dtype=object)), dtype=object, copy=False)
+    return pd.DataFrame(columns, copy=False)
+
+
+@dataclass(frozen=True, eq=False)
+class FacetIndex:
+    """
+    Per-facet-value bitmaps over the catalog rows: bitmaps[facet][value] is a read-only
+    boolean array that is True for rows having that value. Combining filters is a bitwise AND.
+    Blank values are not indexed (blank means "no filter" in the dropdowns).
+    """
+    row_count: int
+    bitmaps: Mapping[str, Mapping[str, np.ndarray]]
+
+    def __post_init__(self):
+        # (facet, other selections) -> value_counts result. Per instance, so a superseded catalog
+        # version is freed with its bitmaps.
+        object.__setattr__(self, "_counts", {})
+
+    def mask(self, selection: Mapping[str, str], skip: str = None) -> np.ndarray:
+        """Rows matching every non-blank facet value in selection (ignoring facet `skip`)."""
+        result = np.ones(self.row_count, dtype=bool)
+        for facet, value in selection.items():
+            if not value or facet == skip:
+                continue
+            bitmap = self.bitmaps.get(facet, {}).get(value)
+            if bitmap is None:
+                return np.zeros(self.row_count, dtype=bool)
+            result &= bitmap
+        return result
+
+    def value_counts(self, facet: str, selection: Mapping[str, str] = None) -> dict[str, int]:
+        """
+        Values of `facet` still reachable under the other facets' selections, with live row counts,
+        sorted by value. The facet's own selection is ignored so its alternatives stay visible.
+        """
+        key = (facet, tuple(sorted((f, v) for f, v in (selection or {}).items() if v and f != facet)))
+        counts = self._counts.get(key)
+        if counts is None:
+            if len(self._counts) >= FACET_COUNTS_CACHE_SIZE:
+                self._counts.clear()
+            counts = self._counts[key] = self._value_counts(facet, dict(key[1]))
+        return dict(counts)
+
+    def _value_counts(self, facet: str, selection: Mapping[str, str]) -> tuple[tuple[str, int], ...]:
+        base = self.mask(selection)
+        counts = []
+        for value, bitmap in self.bitmaps.get(facet, {}).items():
+            n = int(np.count_nonzero(bitmap & base))
+            if n:
+                counts.append((value, n))
+        return tuple(counts)
+
+
+def build_facet_index(df: pd.DataFrame, facets=FACETS) -> FacetIndex:
+    """
+    Precompute one boolean array per (facet, value) from the categorical codes.
+    """
+    bitmaps = {}
+    for facet in facets:
+        series = df[facet]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        codes = series.cat.codes.to_numpy()
+        per_value = {}
+        for code, value in sorted(enumerate(series.cat.categories), key=lambda cv: cv[1]):
+            if not value:
+                continue
+            bitmap = codes == code
+            bitmap.flags.writeable = False
+            per_value[value] = bitmap
+        bitmaps[facet] = MappingProxyType(per_value)
+    return FacetIndex(row_count=len(df), bitmaps=MappingProxyType(bitmaps))
+
+
+_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+
+def _trigrams(text: str) -> set[str]:
+    """Trigrams of each lower-cased word, padded so short words and word starts still count."""
+    grams = set()
+    for word in _WORD_RE.split(text.lower()):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True, eq=False)
+class SearchIndex:
+    """
+    In-memory trigram index over the catalog's exercise name, notes and progressions.
+    postings[field][trigram] is a read-only array of the row numbers containing that trigram.
+    Matching on trigrams rather than whole words is what makes the search typo tolerant.
+    """
+    row_count: int
+    postings: Mapping[str, Mapping[str, np.ndarray]]
+    names: tuple[str, ...]
+
+    def search(self, query: str, limit: int = 20, min_score: float = 0.5) -> list[tuple[int, float]]:
+        """
+        Rank catalog rows against query; returns up to `limit` (row number, score) pairs, best first.
+        A field's score is the share of the query's trigrams found in it; the row score is the best
+        weighted field score, plus a small bonus when the name contains the query verbatim.
+        """
+        grams = _trigrams(query)
+        if not grams:
+            return []
+        scores = np.zeros(self.row_count, dtype=np.float32)
+        for field, weight in SEARCH_FIELDS:
+            hits = np.zeros(self.row_count, dtype=np.float32)
+            postings = self.postings.get(field, {})
+            for gram in grams:
+                rows = postings.get(gram)
+                if rows is not None:
+                    hits[rows] += 1.0
+            np.maximum(scores, hits * (weight / len(grams)), out=scores)
+
+        candidates = np.flatnonzero(scores >= min_score)
+        needle = query.strip().lower()
+        ranked = []
+        for row in candidates:
+            score = float(scores[row])
+            if needle and needle in self.names[row].lower():
+                score += 0.2
+            ranked.append((int(row), score))
+        ranked.sort(key=lambda rs: (-rs[1], self.names[rs[0]]))
+        return ranked[:limit]
+
+
+def build_search_index(df: pd.DataFrame) -> SearchIndex:
+    """
+    Build the trigram postings. Identical texts (notes are often shared by many rows)
+    are only tokenised once.
+    """
+    postings = {}
+    for field, _ in SEARCH_FIELDS:
+        rows_by_gram = {}
+        gram_cache = {}
+        for row, text in enumerate(df[field].tolist() if field in df.columns else []):
+            text = _cell(text)
+            grams = gram_cache.get(text)
+            if grams is None:
+                grams = gram_cache[text] = _trigrams(text)
+            for gram in grams:
+                rows_by_gram.setdefault(gram, []).append(row)
+        frozen = {}
+        for gram, rows in rows_by_gram.items():
+            arr = np.asarray(rows, dtype=np.int32)
+            arr.flags.writeable = False
+            frozen[gram] = arr
+        postings[field] = MappingProxyType(frozen)
+    names = tuple(_cell(v) for v in df["exercise"].tolist())
+    return SearchIndex(row_count=len(df), postings=MappingProxyType(postings), names=names)
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """
+    The exercise catalog as shared by all sessions.
+
+    frame     -- read-only DataFrame; call view() to get a private handle to it
+    tree      -- cascading selectbox tree (see build_catalog_tree)
+    facets    -- bitmap index for faceted filtering (see FacetIndex)
+    search    -- fuzzy trigram search over name, notes and progressions (see SearchIndex)
+    row_count -- number of catalog rows
+    version   -- change marker of the CSV this was built from
+    """
+    frame: pd.DataFrame
+    tree: CatalogNode
+    facets: FacetIndex
+    search: SearchIndex
+    row_count: int
+    version: int
+
+    def view(self) -> pd.DataFrame:
+        """Shallow copy: no data is copied, but adding or renaming columns stays local."""
+        return self.frame.copy(deep=False)
+
+    def row_path(self, row: int) -> tuple[str, ...]:
+        """(body_part, movement_type, sub_movement_type, position, exercise) of catalog row `row`."""
+        return tuple(_cell(self.frame[level].iat[row]) for level in HIERARCHY_LEVELS)
+
+    def find(self, query: str, limit: int = 20) -> list[tuple[str, ...]]:
+        """Hierarchy paths of the best search hits for query, duplicates removed, best first."""
+        paths = []
+        for row, _ in self.search.search(query, limit=limit * 2):
+            path = self.row_path(row)
+            if path not in paths:
+                paths.append(path)
+        return paths[:limit]
+
+
+def build_catalog(df: pd.DataFrame, version: int) -> Catalog:
+    frame = freeze_frame(df)
+    return Catalog(
+        frame=frame,
+        tree=build_catalog_tree(frame),
+        facets=build_facet_index(frame),
+        search=build_search_index(frame),
+        row_count=len(frame),
+        version=version,
+    )
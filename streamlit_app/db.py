@@ -0,0 +1,125 @@
+# streamlit_app/db.py
+"""
+SQLite connection manager: one connection per thread, drawn from a bounded pool, in WAL mode.
+
+Streamlit runs every script run (and its widget callbacks) in a thread of its own, so handing
+each thread its own connection keeps sessions from interleaving statements on a shared cursor.
+WAL lets readers keep reading while a writer commits, busy_timeout makes a second writer wait
+instead of failing with "database is locked", and synchronous=NORMAL is durable enough in WAL
+mode (a power cut can lose the last commits, never corrupt the file) at a fraction of the fsyncs.
+
+A script run has no "finished" hook, so connections are not returned explicitly: when the pool
+is exhausted, connections whose owning thread has ended are reclaimed for the caller.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+
+def connect(path: Path, busy_timeout: int = 5000) -> sqlite3.Connection:
+    """A connection to path with the settings above (WAL, busy_timeout, synchronous=NORMAL, foreign keys)."""
+    # check_same_thread=False only because a pooled connection moves to another thread once its
+    # owner has ended (or is opened by one thread for another); one thread uses it at a time
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=busy_timeout / 1000)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+class PoolExhausted(RuntimeError):
+    """Every pooled connection is held by a live thread and none came free in time."""
+
+
+class ConnectionManager:
+    """
+    Hands out per-thread connections to one SQLite database.
+
+    pool_size     -- most connections open at once
+    busy_timeout  -- ms a connection waits on a locked database before raising
+    wait_timeout  -- s connection() waits for a free pooled connection before PoolExhausted
+    init          -- called once with the first connection (e.g. to apply migrations)
+    """
+
+    def __init__(self, path: Path, pool_size: int = 8, busy_timeout: int = 5000,
+                 wait_timeout: float = 10.0, init: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._owners: dict[int, tuple[threading.Thread, sqlite3.Connection]] = {}  # thread id -> owner, conn
+        self._idle: list[sqlite3.Connection] = []
+        self._open = 0
+        if init is not None:
+            conn = self._connect()
+            try:
+                init(conn)
+            finally:
+                self._idle.append(conn)
+
+    def dedicated(self) -> sqlite3.Connection:
+        """A new connection with the same settings, outside the pool (e.g. for the writer thread)."""
+        return connect(self.path, self.busy_timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = self.dedicated()
+        self._open += 1
+        return conn
+
+    def _reclaim(self) -> int:
+        """Move connections of ended threads back to the idle list; returns how many."""
+        dead = [tid for tid, (thread, _) in self._owners.items() if not thread.is_alive()]
+        for tid in dead:
+            _, conn = self._owners.pop(tid)
+            if conn.in_transaction:
+                conn.rollback()  # the thread ended mid-transaction; don't leak its locks
+            self._idle.append(conn)
+        return len(dead)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, taking one from the pool the first time it asks."""
+        me = threading.current_thread()
+        owned = self._owners.get(me.ident)
+        if owned is not None and owned[0] is me:
+            return owned[1]
+        deadline = time.monotonic() + self.wait_timeout
+        with self._cond:
+            if owned is not None:
+                self._reclaim()  # same ident, different thread: the old owner has ended
+            while True:
+                if not self._idle:
+                    self._reclaim()
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.pool_size:
+                    conn = self._connect()
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f"all {self.pool_size} connections to {self.path.name} are in use")
+                self._cond.wait(min(remaining, 0.05))  # owners end without notifying, so poll
+            self._owners[me.ident] = (me, conn)
+            return conn
+
+    def release(self):
+        """Give this thread's connection back early (for long-lived worker threads)."""
+        me = threading.current_thread()
+        with self._cond:
+            owned = self._owners.get(me.ident)
+            if owned is not None and owned[0] is me:
+                del self._owners[me.ident]
+                if owned[1].in_transaction:
+                    owned[1].rollback()
+                self._idle.append(owned[1])
+                self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"open": self._open, "in_use": len(self._owners), "idle": len(self._idle),
+                    "pool_size": self.pool_size}
@@ -0,0 +1,297 @@
+# streamlit_app/images.py
+"""
+Exercise image manifest: exercise name -> image file, size and content hash,
+plus pre-sized thumbnails of each image keyed by that hash.
+
+Headless (no Streamlit): built once by scanning the image folder, kept fresh by a single
+directory-mtime check per refresh(), and updated in place by store()/remove() so uploads never
+need a rescan. Hashes are persisted in a small JSON file so a restart only re-hashes files
+whose size or mtime changed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+# Image file types, in lookup order when an exercise has more than one
+IMAGE_EXTENSIONS = ("jpg", "png")
+# Thumbnail widths in px; callers get the smallest one at least as wide as they display
+THUMBNAIL_WIDTHS = (100, 200, 600)
+# Thumbnail formats: WebP for the browser, JPEG for consumers without WebP support (e.g. fpdf)
+THUMBNAIL_FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}),
+                     "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True})}
+
+
+@dataclass(frozen=True)
+class ImageEntry:
+    """One exercise image on disk."""
+    name: str        # exercise name (file stem)
+    path: Path
+    ext: str         # 'jpg' or 'png'
+    size: int
+    mtime_ns: int
+    sha1: str        # content hash; stable key for derived files
+
+    @property
+    def mime(self) -> str:
+        return "image/png" if self.ext == "png" else "image/jpeg"
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_path(thumb_dir: Path, sha1: str, width: int, fmt: str) -> Path:
+    """Where the `width` px `fmt` thumbnail of the image with content hash sha1 is cached."""
+    return thumb_dir / sha1[:2] / f"{sha1}_{width}.{fmt}"
+
+
+def pick_width(width: int) -> int:
+    """Smallest thumbnail width that is at least `width`, or the largest there is."""
+    for w in THUMBNAIL_WIDTHS:
+        if w >= width:
+            return w
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def make_thumbnails(entry: ImageEntry, thumb_dir: Path) -> list[Path]:
+    """
+    Write every THUMBNAIL_WIDTHS x THUMBNAIL_FORMATS variant of entry (never upscaled) and
+    return their paths. The source is decoded once and each width is resized from the previous.
+    """
+    from PIL import Image, ImageOps  # Pillow is only needed when thumbnails are generated
+
+    written = []
+    with Image.open(entry.path) as src:
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "P") else "RGB")
+        for width in sorted(THUMBNAIL_WIDTHS, reverse=True):
+            if img.width > width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            for fmt, (pil_format, options) in THUMBNAIL_FORMATS.items():
+                out = img
+                if pil_format == "JPEG" and out.mode == "RGBA":
+                    out = Image.new("RGB", img.size, "white")
+                    out.paste(img, mask=img.getchannel("A"))
+                path = thumbnail_path(thumb_dir, entry.sha1, width, fmt)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + ".tmp")
+                out.save(tmp, pil_format, **options)
+                os.replace(tmp, path)
+                written.append(path)
+    return written
+
+
+class ImageManifest:
+    """
+    Thread-safe map of exercise name -> ImageEntry for one image folder.
+
+    Call refresh() once per render (one stat of the folder), then look images up with get()
+    as often as needed; lookups never touch the filesystem.
+    With a thumb_dir, thumbnail() serves pre-sized variants (made on store() or on first use).
+    """
+
+    def __init__(self, image_dir: Path, manifest_path: Optional[Path] = None,
+                 thumb_dir: Optional[Path] = None):
+        self.image_dir = Path(image_dir)
+        self.manifest_path = Path(manifest_path) if manifest_path else None
+        self.thumb_dir = Path(thumb_dir) if thumb_dir else None
+        self._thumbs_ok: dict[str, bool] = {}     # sha1 -> thumbnails exist (False: source unreadable)
+        self._lock = threading.Lock()
+        self._files: dict[str, ImageEntry] = {}    # by file name
+        self._by_name: dict[str, ImageEntry] = {}  # by exercise name
+        self._dir_mtime_ns: Optional[int] = None
+
+    # ── lookups ──────────────────────────────────────────────────────────────
+    def get(self, name: str) -> Optional[ImageEntry]:
+        """The image for exercise `name`, or None."""
+        return self._by_name.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def entries(self) -> list[ImageEntry]:
+        return list(self._by_name.values())
+
+    # ── thumbnails ───────────────────────────────────────────────────────────
+    def _ensure_thumbnails(self, entry: ImageEntry) -> bool:
+        ok = self._thumbs_ok.get(entry.sha1)
+        if ok is not None:
+            return ok
+        paths = [thumbnail_path(self.thumb_dir, entry.sha1, w, f) for w in THUMBNAIL_WIDTHS for f in THUMBNAIL_FORMATS]
+        ok = True
+        if not all(p.exists() for p in paths):
+            try:
+                make_thumbnails(entry, self.thumb_dir)
+            except Exception:
+                ok = False  # unreadable image or no Pillow: callers fall back to the original
+        self._thumbs_ok[entry.sha1] = ok
+        return ok
+
+    def thumbnail(self, name: str, width: int, fmt: str = "webp") -> Optional[Path]:
+        """
+        Smallest cached variant of exercise `name`'s image that is at least `width` px wide
+        (the original file if thumbnails are unavailable), or None if it has no image.
+        """
+        entry = self.get(name)
+        if entry is None:
+            return None
+        if self.thumb_dir is None or not self._ensure_thumbnails(entry):
+            return entry.path
+        return thumbnail_path(self.thumb_dir, entry.sha1, pick_width(width), fmt)
+
+    def backfill_thumbnails(self, workers: Optional[int] = None) -> int:
+        """
+        Make any missing thumbnails for every image, and delete cached thumbnails of images
+        that no longer exist. Returns the number of images that were (re)processed.
+        """
+        if self.thumb_dir is None:
+            return 0
+        self.refresh()
+        entries = self.entries()
+        todo = [e for e in entries if not self._thumbs_ok.get(e.sha1)]
+        for e in todo:
+            self._thumbs_ok.pop(e.sha1, None)  # retry images that failed before
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = sum(pool.map(self._ensure_thumbnails, todo))
+        live = {e.sha1 for e in entries}
+        if self.thumb_dir.exists():
+            for path in self.thumb_dir.glob("*/*"):
+                if path.name.split("_", 1)[0] not in live:
+                    path.unlink(missing_ok=True)
+        return done
+
+    # ── freshness ────────────────────────────────────────────────────────────
+    def _stat_dir(self) -> int:
+        try:
+            return self.image_dir.stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    def refresh(self) -> bool:
+        """Rescan the folder if its mtime changed since the last scan; True if it rescanned."""
+        mtime = self._stat_dir()
+        if mtime == self._dir_mtime_ns:
+            return False
+        with self._lock:
+            if mtime == self._dir_mtime_ns:
+                return False
+            self._scan(mtime)
+            return True
+
+    def _scan(self, dir_mtime_ns: int):
+        known = self._files or self._load_saved()
+        files = {}
+        if dir_mtime_ns:
+            with os.scandir(self.image_dir) as it:
+                for de in it:
+                    stem, dot, ext = de.name.rpartition(".")
+                    if not dot or ext.lower() not in IMAGE_EXTENSIONS or not de.is_file():
+                        continue
+                    st_ = de.stat()
+                    old = known.get(de.name)
+                    if old and old.size == st_.st_size and old.mtime_ns == st_.st_mtime_ns:
+                        files[de.name] = old
+                    else:
+                        files[de.name] = ImageEntry(stem, Path(de.path), ext.lower(),
+                                                    st_.st_size, st_.st_mtime_ns, _hash_file(Path(de.path)))
+        self._files = files
+        self._reindex()
+        self._dir_mtime_ns = dir_mtime_ns
+        self._save()
+
+    def _reindex(self):
+        by_name = {}
+        for entry in sorted(self._files.values(), key=lambda e: IMAGE_EXTENSIONS.index(e.ext), reverse=True):
+            by_name[entry.name] = entry  # preferred extension is written last and wins
+        self._by_name = by_name
+
+    # ── writes ───────────────────────────────────────────────────────────────
+    def store(self, name: str, data: bytes, ext: str, replaces: Optional[str] = None) -> ImageEntry:
+        """
+        Save `data` as the image of exercise `name`, removing any other image of `name`
+        (and of `replaces`, when an exercise is being renamed), and update the manifest.
+        """
+        ext = ext.lower()
+        if ext not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {ext}")
+        with self._lock:
+            self.image_dir.mkdir(parents=True, exist_ok=True)
+            path = self.image_dir / f"{name}.{ext}"
+            for old in {name, replaces or name}:
+                for old_ext in IMAGE_EXTENSIONS:
+                    old_path = self.image_dir / f"{old}.{old_ext}"
+                    if old_path != path and old_path.exists():
+                        os.remove(old_path)
+                        self._files.pop(old_path.name, None)
+            path.write_bytes(data)
+            st_ = path.stat()
+            entry = ImageEntry(name, path, ext, st_.st_size, st_.st_mtime_ns, hashlib.sha1(data).hexdigest())
+            self._files[path.name] = entry
+            self._reindex()
+            self._dir_mtime_ns = self._stat_dir()
+            self._save()
+        if self.thumb_dir is not None:
+            self._ensure_thumbnails(entry)
+        return entry
+
+    def remove(self, name: str):
+        """Delete every image of exercise `name`."""
+        with self._lock:
+            for ext in IMAGE_EXTENSIONS:
+                path = self.image_dir / f"{name}.{ext}"
+                if path.exists():
+                    os.remove(path)
+                self._files.pop(path.name, None)
+            self._reindex()
+            self._dir_mtime_ns = self._stat_dir()
+            self._save()
+
+    # ── persistence ──────────────────────────────────────────────────────────
+    def _load_saved(self) -> dict[str, ImageEntry]:
+        if not self.manifest_path:
+            return {}
+        try:
+            saved = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        files = {}
+        for fname, e in saved.get("files", {}).items():
+            stem, _, ext = fname.rpartition(".")
+            files[fname] = ImageEntry(stem, self.image_dir / fname, ext, e["size"], e["mtime_ns"], e["sha1"])
+        return files
+
+    def _save(self):
+        if not self.manifest_path:
+            return
+        payload = {"files": {fname: {"size": e.size, "mtime_ns": e.mtime_ns, "sha1": e.sha1}
+                             for fname, e in self._files.items()}}
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.manifest_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp, self.manifest_path)
+        except OSError:
+            pass  # the manifest file is only a cache; the in-memory map stays authoritative
+
+
+if __name__ == "__main__":
+    # Bulk thumbnail backfill: python -m streamlit_app.images
+    app_dir = Path(__file__).parent
+    cache_dir = app_dir.parent / ".catalog_cache"
+    manifest = ImageManifest(app_dir / "exercise_images", cache_dir / "images.json", cache_dir / "thumbnails")
+    count = manifest.backfill_thumbnails()
+    print(f"Thumbnails ready for {len(manifest)} images ({count} processed).")
@@ -7,9 +7,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import streamlit as st
 from pathlib import Path
 
-from _common import apply_global_css
+from streamlit_app._common import apply_global_css, instrument_rerun, profile_rerun, render_perf_panel
+from streamlit_app.assets import img_tag
 from login import login_page
-from main import main_app
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 1) AUTH GUARD: collapse sidebar on the login screen
@@ -28,6 +28,9 @@ if not st.session_state["authenticated"]:
     login_page()
     st.stop()
 
+# Imported only once logged in: the login screen needs none of the pages (see main.PAGE_REGISTRY)
+from main import main_app, PAGE_REGISTRY
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 2) NOW that you're authenticated, show your full sidebar
 # ──────────────────────────────────────────────────────────────────────────────
@@ -56,21 +59,13 @@ st.markdown(
 # ──────────────────────────────────────────────────────────────────────────────
 sidebar = st.sidebar
 logo_path = Path(__file__).parent / "images" / "company_logo4.png"
-if logo_path.exists():
-    sidebar.image(str(logo_path), use_container_width=True)
+logo_html = img_tag(logo_path, alt="CK Sports Physio")
+if logo_html:
+    sidebar.markdown(logo_html, unsafe_allow_html=True)
 else:
     sidebar.error("Logo not found!")
 
-PAGES = [
-    "Home",
-    "New Program",
-    "Modify Program",
-    "Client Status",
-    "Client History",
-    "Exercise Database",
-    "Injury Audit",
-    "Settings",
-]
+PAGES = list(PAGE_REGISTRY)
 
 # Initialize "page" and "_page_changed" flag
 if "page" not in st.session_state:
@@ -98,4 +93,8 @@ if "page" in st.session_state and st.session_state["page"] == current_page_from_
 # ──────────────────────────────────────────────────────────────────────────────
 # 5) DISPATCH INTO YOUR MAIN APP
 # ──────────────────────────────────────────────────────────────────────────────
-main_app(st.session_state["page"])
\ No newline at end of file
+with profile_rerun(st.session_state["page"]), instrument_rerun(st.session_state["page"]):
+    main_app(st.session_state["page"])
+
+# Admin-only timings of the rerun above (see instrumentation.py)
+render_perf_panel()
\ No newline at end of file
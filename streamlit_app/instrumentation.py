@@ -0,0 +1,494 @@
+# streamlit_app/instrumentation.py
+"""
+Opt-in per-rerun instrumentation: where a slow rerun spends its time.
+
+A RerunTrace is started around one script run (see _common.instrument_rerun) and collects:
+
+    sections  -- wall time of every @timed function (main_app, the render_* functions), nested
+    queries   -- SQLite statements and the time spent executing and fetching them, counted by
+                 the TracedConnection that utils.get_client_db hands out while a trace is active
+    files     -- files opened and directories listed, seen through a sys.addaudithook hook
+    markdown  -- calls to st.markdown and the bytes of markup they sent to the browser
+
+Every traced statement also feeds a per-statement latency histogram kept in memory, and one
+slower than the threshold (CK_SLOW_QUERY_MS) is written to the slow-query log with its
+parameter shape, calling code and EXPLAIN QUERY PLAN. Setting CK_SLOW_QUERY_MS traces queries
+in every rerun, recorded or not.
+
+The active trace lives in a ContextVar, and Streamlit runs every script run in a thread of its
+own, so concurrent sessions never see each other's traces. With no active trace every hook
+here costs one ContextVar lookup. Finished traces are appended to a JSON lines log (PERF_LOG)
+so reruns can be compared over time.
+
+Headless (no Streamlit): the Streamlit side (enabling, the admin panel, the st.markdown probe)
+is in _common.py.
+"""
+
+import bisect
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from streamlit_app.repository.paths import PERF_DIR
+
+# Where finished traces are appended, one JSON object per line
+PERF_LOG = Path(os.environ.get("CK_PERF_LOG") or PERF_DIR / "reruns.jsonl")
+# Most distinct file paths kept per trace (the count keeps going)
+MAX_FILES_LISTED = 50
+
+_current: ContextVar[Optional["RerunTrace"]] = ContextVar("rerun_trace", default=None)
+_log_lock = threading.Lock()
+_install_lock = threading.Lock()
+
+
+@dataclass
+class Section:
+    name: str
+    depth: int
+    ms: float = 0.0
+
+
+@dataclass
+class RerunTrace:
+    """What one script run did; built by record(), read once it has finished."""
+    page: str
+    user: str = ""
+    started: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    total_ms: float = 0.0
+    sections: list[Section] = field(default_factory=list)
+    queries: int = 0
+    query_ms: float = 0.0
+    files_opened: int = 0
+    files: list[str] = field(default_factory=list)
+    dirs_listed: int = 0
+    markdown_calls: int = 0
+    markdown_bytes: int = 0
+    _depth: int = field(default=0, repr=False)
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        del d["_depth"]
+        return d
+
+
+def current() -> Optional[RerunTrace]:
+    """The trace of the script run executing on this thread, if it is being recorded."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def record(page: str, user: str = "", log: Optional[Path] = PERF_LOG):
+    """
+    Trace everything run inside the block as one rerun of page; yields the RerunTrace.
+    The finished trace is appended to log (None: not logged) even if the block raises, which
+    includes Streamlit's st.stop() / st.rerun() exceptions.
+    """
+    install_audit_hook()
+    trace = RerunTrace(page=page, user=user)
+    token = _current.set(trace)
+    t0 = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.total_ms = (time.perf_counter() - t0) * 1000
+        _current.reset(token)
+        if log is not None:
+            append_log(trace, log)
+
+
+@contextlib.contextmanager
+def section(name: str):
+    """Time the block as a section of the current trace (a no-op when nothing is recorded)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    entry = Section(name, trace._depth)
+    trace.sections.append(entry)  # appended on entry, so sections stay in call order
+    trace._depth += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry.ms = (time.perf_counter() - t0) * 1000
+        trace._depth -= 1
+
+
+def timed(fn):
+    """Decorator: each call of fn is a section (named after fn) of the current trace."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return fn(*args, **kwargs)
+        with section(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def count_markdown(body) -> None:
+    """Account one st.markdown call sending body (see _common.install_markdown_probe)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.markdown_calls += 1
+        trace.markdown_bytes += len(str(body).encode("utf-8"))
+
+
+def append_log(trace: RerunTrace, log: Path = PERF_LOG):
+    """Append trace to the JSON lines log."""
+    line = json.dumps(trace.to_dict(), separators=(",", ":"))
+    with _log_lock:
+        log.parent.mkdir(parents=True, exist_ok=True)
+        with open(log, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def read_log(log: Path = PERF_LOG, limit: int = 1000) -> list[dict]:
+    """The last limit traces in the log, oldest first."""
+    if not log.exists():
+        return []
+    with open(log, encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+    out = []
+    for line in lines:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue
+    return out
+
+
+# ── files: audit hook ────────────────────────────────────────────────────────
+_audit_installed = False
+
+
+def _audit(event: str, args: tuple):
+    if event == "open":
+        trace = _current.get()
+        if trace is not None:
+            trace.files_opened += 1
+            if len(trace.files) < MAX_FILES_LISTED:
+                trace.files.append(str(args[0]))
+    elif event in ("os.scandir", "os.listdir"):
+        trace = _current.get()
+        if trace is not None:
+            trace.dirs_listed += 1
+
+
+def install_audit_hook():
+    """Install the file audit hook (once per process; audit hooks cannot be removed)."""
+    global _audit_installed
+    if not _audit_installed:
+        with _install_lock:
+            if not _audit_installed:
+                sys.addaudithook(_audit)
+                _audit_installed = True
+
+
+# ── SQLite: statement statistics and the slow-query log ─────────────────────
+# Upper bounds (ms) of the per-statement latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = (0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000, 3000)
+# Statements slower than this (ms) go to the slow-query log. Setting CK_SLOW_QUERY_MS also traces
+# queries outside recorded reruns; while a rerun is recorded DEFAULT_SLOW_QUERY_MS applies otherwise.
+SLOW_QUERY_MS = float(os.environ["CK_SLOW_QUERY_MS"]) if os.environ.get("CK_SLOW_QUERY_MS") else None
+DEFAULT_SLOW_QUERY_MS = 50.0
+SLOW_QUERY_LOG = Path(os.environ.get("CK_SLOW_QUERY_LOG") or PERF_DIR / "slow_queries.jsonl")
+# Slow statements kept in memory for the Settings page
+RECENT_SLOW_QUERIES = 100
+# Modules whose frames are skipped when looking for the code that issued a statement
+_CALL_SITE_SKIP = (__file__, sqlite3.__file__)
+# Where page code lives; the nearest such frame is reported as the calling page
+_PAGE_DIRS = (os.sep + "pages" + os.sep, os.sep + "coach_app" + os.sep, os.sep + "main.py")
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+@dataclass
+class StatementStats:
+    """Latency histogram of one SQL statement (whitespace-normalised text) in this process."""
+    sql: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS_MS) + 1))
+
+    def add(self, ms: float):
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max_ms for the open bucket)."""
+        rank, seen = q * self.calls, 0
+        for bound, n in zip(HISTOGRAM_BOUNDS_MS + (self.max_ms,), self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+_stats_lock = threading.Lock()
+_statement_stats: dict[str, StatementStats] = {}
+_slow_queries: "deque[dict]" = deque(maxlen=RECENT_SLOW_QUERIES)
+
+
+def statement_stats() -> list[StatementStats]:
+    """Copies of every statement's histogram, slowest total first."""
+    with _stats_lock:
+        stats = [replace(s, buckets=list(s.buckets)) for s in _statement_stats.values()]
+    return sorted(stats, key=lambda s: s.total_ms, reverse=True)
+
+
+def recent_slow_queries() -> list[dict]:
+    """The latest slow-query log entries of this process, newest first."""
+    with _stats_lock:
+        return list(reversed(_slow_queries))
+
+
+def reset_statement_stats():
+    with _stats_lock:
+        _statement_stats.clear()
+        _slow_queries.clear()
+
+
+def params_shape(params, many: bool = False) -> str:
+    """
+    Parameters described without their values: types, and sizes of long strings and lists,
+    e.g. "(str, int)", "(str[48213])" for a json_each id list, or "250 x (str, int)".
+    """
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else list(params)
+        return f"{len(rows)} x {params_shape(rows[0]) if rows else '()'}"
+
+    def one(v):
+        name = type(v).__name__
+        if isinstance(v, (str, bytes)) and len(v) > 32:
+            return f"{name}[{len(v)}]"
+        return name
+
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {one(v)}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(one(v) for v in params) + ")"
+
+
+def _call_site() -> tuple[str, str]:
+    """(function that issued the statement, nearest page-code frame), as module:function:line."""
+    function = caller = ""
+    frame = sys._getframe(2)
+    while frame is not None and not caller:
+        path = frame.f_code.co_filename
+        if path not in _CALL_SITE_SKIP and "contextlib" not in path:
+            where = f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}:{frame.f_lineno}"
+            function = function or where
+            if any(d in path for d in _PAGE_DIRS):
+                caller = where
+        frame = frame.f_back
+    return function, caller
+
+
+def explain(conn: sqlite3.Connection, sql: str, params=()) -> list[str]:
+    """EXPLAIN QUERY PLAN of sql as indented lines (empty if the statement cannot be explained)."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+class _Statement:
+    __slots__ = ("sql", "params", "many", "ms")
+
+    def __init__(self, sql, params, many):
+        self.sql, self.params, self.many, self.ms = sql, params, many, 0.0
+
+
+def _statement_done(conn: sqlite3.Connection, stmt: _Statement, trace: Optional[RerunTrace]):
+    """Account a finished statement: its histogram, and the slow-query log if over the threshold."""
+    sql = " ".join(stmt.sql.split())
+    with _stats_lock:
+        stats = _statement_stats.get(sql)
+        if stats is None:
+            stats = _statement_stats[sql] = StatementStats(sql)
+        stats.add(stmt.ms)
+    threshold = SLOW_QUERY_MS if SLOW_QUERY_MS is not None else DEFAULT_SLOW_QUERY_MS
+    if stmt.ms < threshold:
+        return
+    function, caller = _call_site()
+    params = stmt.params
+    if stmt.many:
+        params = next(iter(params), ()) if isinstance(params, (list, tuple)) else ()
+    entry = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "ms": round(stmt.ms, 2),
+        "sql": sql,
+        "params": params_shape(stmt.params, stmt.many),
+        "page": trace.page if trace is not None else "",
+        "caller": caller,
+        "function": function,
+        "plan": explain(conn, stmt.sql, params),
+    }
+    with _stats_lock:
+        _slow_queries.append(entry)
+    line = json.dumps(entry, separators=(",", ":"))
+    with _log_lock:
+        SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+        with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+# ── SQLite: traced connection ────────────────────────────────────────────────
+class TracedCursor:
+    """
+    sqlite3.Cursor stand-in that times each statement, execute plus fetches, until its rows are
+    exhausted, the cursor runs another statement, or the cursor goes away. The time goes to the
+    trace's query totals (if a rerun is recorded), the statement's histogram and, if it was
+    slow, the slow-query log.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, trace: Optional[RerunTrace]):
+        self._cursor = cursor
+        self._trace = trace
+        self._stmt: Optional[_Statement] = None
+
+    def _begin(self, sql, params, many=False):
+        self._finish()
+        self._stmt = _Statement(sql, params, many)
+        if self._trace is not None:
+            self._trace.queries += 1
+
+    def _finish(self):
+        stmt, self._stmt = self._stmt, None
+        if stmt is not None:
+            _statement_done(self._cursor.connection, stmt, self._trace)
+
+    def _timed(self, method, *args):
+        t0 = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            if self._trace is not None:
+                self._trace.query_ms += ms
+            if self._stmt is not None:
+                self._stmt.ms += ms
+
+    def execute(self, sql, params=()):
+        self._begin(sql, params)
+        self._timed(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq):
+        seq = seq if isinstance(seq, (list, tuple)) else list(seq)  # kept for params_shape
+        self._begin(sql, seq, many=True)
+        self._timed(self._cursor.executemany, sql, seq)
+        self._finish()
+        return self
+
+    def executescript(self, script):
+        self._begin(script, ())
+        self._timed(self._cursor.executescript, script)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = size or self._cursor.arraysize
+        rows = self._timed(self._cursor.fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self._timed(self._cursor.__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):  # lastrowid, rowcount, description, ...
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    """
+    sqlite3.Connection stand-in whose statements are timed (see TracedCursor).
+    Everything other than cursor()/execute*() is passed straight to the real connection.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, trace: Optional[RerunTrace]):
+        self._conn = conn
+        self._trace = trace
+
+    def cursor(self) -> TracedCursor:
+        return TracedCursor(self._conn.cursor(), self._trace)
+
+    def execute(self, sql, params=()) -> TracedCursor:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq) -> TracedCursor:
+        return self.cursor().executemany(sql, seq)
+
+    def executescript(self, script) -> TracedCursor:
+        return self.cursor().executescript(script)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):  # commit, rollback, backup, in_transaction, ...
+        return getattr(self._conn, name)
+
+
+def traced(conn: sqlite3.Connection):
+    """
+    conn wrapped for query tracing when a rerun is being recorded or the slow-query log is on
+    (CK_SLOW_QUERY_MS); otherwise conn itself.
+    """
+    trace = _current.get()
+    if conn is None or (trace is None and SLOW_QUERY_MS is None):
+        return conn
+    return TracedConnection(conn, trace)
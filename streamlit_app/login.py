@@ -1,12 +1,9 @@
 # streamlit_app/login.py
 
 import streamlit as st
-import base64
 from pathlib import Path
 
-def image_to_base64(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
+from streamlit_app.assets import img_tag
 
 # Path to your local banner image
 banner_path = Path(__file__).parent / "images" / "company_logo4.png"
@@ -51,13 +48,11 @@ def login_page():
     )
 
     # banner wrapped in its own CSS class
-    b64 = image_to_base64(banner_path)
+    banner_html = img_tag(banner_path, alt="CK Sports Physio", style="max-width:200px; width:80%;")
     st.markdown(
         f"""
         <div class="login-banner" style="text-align:left;">
-          <img src="data:image/png;base64,{b64}"
-               alt="CK Sports Physio"
-               style="max-width:200px; width:80%;" />
+          {banner_html}
         </div>
         """,
         unsafe_allow_html=True,
@@ -80,6 +75,7 @@ def login_page():
                 ("Leahc", "iheartMelb1"),
             ]:
                 st.session_state["authorized"] = True
+                st.session_state["username"] = username  # admin tools check it (see _common.is_admin)
                 st.success("Authenticated! Click Login to proceed.")
                 st.rerun() # Rerun to hide auth fields and show login button
             else:
@@ -0,0 +1,264 @@
+# streamlit_app/migrations.py
+"""
+Numbered schema migrations for client_database.db.
+
+The schema version lives in PRAGMA user_version. apply_migrations() runs every migration newer
+than it, each in its own transaction that also bumps user_version, so each one runs exactly
+once per database; on an up-to-date database it costs a single PRAGMA read.
+
+Databases created before versioning existed start at user_version 0 but may already have some
+of these tables, which is why the early migrations use IF NOT EXISTS. New migrations go at the
+end of MIGRATIONS with the next number; never edit or renumber one that has shipped.
+"""
+
+import sqlite3
+from typing import Callable
+
+
+def _m001_core_tables(cur: sqlite3.Cursor):
+    """clients, group_hierarchy, user_group_assignments."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS clients (
+            id TEXT PRIMARY KEY,
+            account_type TEXT NOT NULL,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            username TEXT UNIQUE,
+            gender TEXT DEFAULT '',
+            mobile TEXT,
+            email TEXT UNIQUE,
+            password TEXT,
+            status TEXT NOT NULL DEFAULT 'active'
+        )
+    """)
+    # Databases from before username/gender existed: add them (ADD COLUMN cannot be UNIQUE,
+    # so uniqueness of username comes from an index instead)
+    cur.execute("PRAGMA table_info(clients)")
+    cols = {row[1] for row in cur.fetchall()}
+    if "username" not in cols:
+        cur.execute("ALTER TABLE clients ADD COLUMN username TEXT")
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_username ON clients(username)")
+    if "gender" not in cols:
+        cur.execute("ALTER TABLE clients ADD COLUMN gender TEXT DEFAULT ''")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS group_hierarchy (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_parent TEXT,
+            club TEXT,
+            group_name TEXT NOT NULL,
+            group_sub TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_group_assignments (
+            user_id TEXT,
+            group_id INTEGER,
+            PRIMARY KEY (user_id, group_id),
+            FOREIGN KEY (user_id) REFERENCES clients(id) ON DELETE CASCADE,
+            FOREIGN KEY (group_id) REFERENCES group_hierarchy(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def _m002_program_index(cur: sqlite3.Cursor):
+    """programs: one row per program JSON file under patient_pdfs (file_path relative to it)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS programs (
+            file_path TEXT PRIMARY KEY,
+            client_folder TEXT NOT NULL,
+            client_id TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            session_type TEXT,
+            session_name TEXT,
+            prescription_date TEXT,
+            first_body_part TEXT,
+            exercise_summary TEXT,
+            exercise_count INTEGER NOT NULL DEFAULT 0,
+            mtime INTEGER NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_programs_client_date ON programs(client_folder, prescription_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_programs_date ON programs(prescription_date)")
+
+
+def _m003_status_events(cur: sqlite3.Cursor):
+    """
+    Status history: one row per status change, plus current_status kept up to date by triggers.
+    History order is insertion order (id), matching the old status.json "history" list.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS status_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            date TEXT NOT NULL,
+            comment TEXT NOT NULL DEFAULT '',
+            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_status_events_client_date ON status_events(client_id, date)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS current_status (
+            client_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            restrictions TEXT NOT NULL DEFAULT '',
+            last_updated TEXT NOT NULL,
+            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+        )
+    """)
+    # A new event becomes the current status
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_status_events_insert
+        AFTER INSERT ON status_events
+        BEGIN
+            INSERT OR REPLACE INTO current_status(client_id, status, restrictions, last_updated)
+            VALUES (NEW.client_id, NEW.status, NEW.comment, NEW.date);
+        END
+    """)
+    # Removing an event falls back to the latest remaining one (or no row = default status).
+    # The EXISTS guard keeps cascaded deletes of a client from re-inserting a row for it.
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_status_events_delete
+        AFTER DELETE ON status_events
+        BEGIN
+            DELETE FROM current_status WHERE client_id = OLD.client_id;
+            INSERT INTO current_status(client_id, status, restrictions, last_updated)
+            SELECT client_id, status, comment, date
+              FROM status_events
+             WHERE client_id = OLD.client_id
+               AND EXISTS (SELECT 1 FROM clients WHERE id = OLD.client_id)
+             ORDER BY id DESC
+             LIMIT 1;
+        END
+    """)
+
+
+def _m004_roster_version(cur: sqlite3.Cursor):
+    """
+    Change counter for group membership, bumped by triggers on every write to group_hierarchy /
+    user_group_assignments (including cascades and other processes) and on member renames,
+    so in-memory rosters can tell with one tiny read whether they are stale.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS roster_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO roster_version(id, version) VALUES (1, 0)")
+    for table in ("group_hierarchy", "user_group_assignments"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_roster
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE roster_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_clients_update_roster
+        AFTER UPDATE OF first_name, last_name, account_type ON clients
+        BEGIN
+            UPDATE roster_version SET version = version + 1 WHERE id = 1;
+        END
+    """)
+
+
+# The managed secondary indexes, by name. Each one serves a hot query:
+INDEXES = {
+    # active-athlete roster (Client Status, New Program, coach dashboard) and the coach list:
+    # WHERE account_type=? AND status=? ORDER BY last_name, first_name, answered from the index alone
+    "idx_clients_roster":
+        "ON clients(account_type, status, last_name, first_name, id)",
+    # dashboard KPI: SELECT COUNT(*) FROM clients WHERE status='active'
+    "idx_clients_status":
+        "ON clients(status)",
+    # members of a group (group directory join, roster); the primary key is (user_id, group_id)
+    "idx_uga_group_user":
+        "ON user_group_assignments(group_id, user_id)",
+    # group lists are always shown in this order
+    "idx_group_hierarchy_order":
+        "ON group_hierarchy(group_parent, club, group_name, group_sub)",
+}
+
+
+def _m005_indexes(cur: sqlite3.Cursor):
+    """Secondary indexes for the hot queries (INDEXES)."""
+    for name, definition in INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} {definition}")
+
+
+# Separator of materialized group paths; sorts before every printable character, so a path
+# sorts right before its descendants and a subtree is one index range (see _m006_group_paths)
+GROUP_PATH_SEP = "\x1f"
+_PATH_SQL = ("char(31) || COALESCE(NULLIF({t}.group_parent, '') || char(31), '')"
+             " || COALESCE(NULLIF({t}.club, '') || char(31), '')"
+             " || COALESCE(NULLIF({t}.group_name, '') || char(31), '')"
+             " || COALESCE(NULLIF({t}.group_sub, '') || char(31), '')")
+
+
+def _m006_group_paths(cur: sqlite3.Cursor):
+    """
+    group_hierarchy.path: the row's non-blank levels (parent, club, name, sub), each followed by
+    GROUP_PATH_SEP and with one in front, e.g. SEP Gymsport SEP Club A SEP Squad 1 SEP.
+    Triggers keep it in step with the four columns; the index makes "every group under this
+    node" a range scan: path >= node AND path < node with its last SEP bumped by one.
+    """
+    cur.execute("ALTER TABLE group_hierarchy ADD COLUMN path TEXT")
+    cur.execute(f"UPDATE group_hierarchy SET path = {_PATH_SQL.format(t='group_hierarchy')}")
+    for event, when in (("insert", "AFTER INSERT ON group_hierarchy"),
+                        ("update", "AFTER UPDATE OF group_parent, club, group_name, group_sub ON group_hierarchy")):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_group_hierarchy_{event}_path
+            {when}
+            BEGIN
+                UPDATE group_hierarchy SET path = {_PATH_SQL.format(t='NEW')} WHERE id = NEW.id;
+            END
+        """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_group_hierarchy_path ON group_hierarchy(path, id)")
+
+
+# (version, description, migration) in the order they must run
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "core tables", _m001_core_tables),
+    (2, "program index", _m002_program_index),
+    (3, "status events", _m003_status_events),
+    (4, "roster version", _m004_roster_version),
+    (5, "hot query indexes", _m005_indexes),
+    (6, "group paths", _m006_group_paths),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Migration that creates status_events; the legacy status.json import runs right after it
+STATUS_EVENTS_MIGRATION = 3
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> list[int]:
+    """
+    Run every pending migration, each in its own BEGIN IMMEDIATE transaction so two processes
+    starting at once cannot both apply it. Returns the versions applied (empty if up to date).
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    applied = []
+    cur = conn.cursor()
+    for version, _, migrate in MIGRATIONS:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:  # another process got here first
+                conn.rollback()
+                continue
+            migrate(cur)
+            cur.execute(f"PRAGMA user_version = {version:d}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -1,16 +1,20 @@
 # streamlit_app/pages/client_status.py
 
 import streamlit as st
-from pathlib import Path
-import json
-from datetime import datetime, date
-
-from streamlit_app._common import apply_global_css, page_header
-from streamlit_app.utils   import get_client_db, fetch_all_groups, fetch_user_groups
-
-# path for status JSON files
-PATIENT_STATUS_DIR = Path(__file__).parent.parent / "patient_status"
-
+from datetime import date
+
+from streamlit_app._common import apply_global_css, page_header, group_tree_select
+from streamlit_app.utils   import get_client_db
+from streamlit_app.instrumentation import timed
+from streamlit_app.repository import (
+    get_group_directory,
+    fetch_roster,
+    fetch_status_board,
+    save_client_status,
+    delete_status_event,
+)
+
+@timed
 def render_client_status():
     apply_global_css()
     page_header("Client Status")
@@ -20,37 +24,11 @@ def render_client_status():
         st.error("Cannot access client database.")
         return
 
-    # --- Group filter ---
-    df_groups = fetch_all_groups(conn)
-    group_map = {"All": None}
-    for _, row in df_groups.iterrows():
-        gid = row["id"]
-        parts = [p for p in (row["group_parent"], row["club"], row["group_name"], row["group_sub"]) if p]
-        label = " / ".join(parts)
-        group_map[f"{label} (ID:{gid})"] = gid
-    sel_group = st.selectbox("Filter by Group", list(group_map.keys()), index=0)
+    # --- Group filter: any level of the tree selects everything under it ---
+    node = group_tree_select("Filter by Group", get_group_directory(conn).tree, key="status_group_node")
 
-    # --- Fetch clients ---
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT id, first_name, last_name
-          FROM clients
-         WHERE account_type='Athlete' AND status='active'
-         ORDER BY last_name, first_name
-        """
-    )
-    all_clients = cur.fetchall()
-
-    # --- Apply group filter ---
-    clients = []
-    if sel_group != "All":
-        gid = group_map[sel_group]
-        for cid, fn, ln in all_clients:
-            if gid in fetch_user_groups(conn, cid):
-                clients.append((cid, fn, ln))
-    else:
-        clients = all_clients
+    # --- Fetch active athletes, limited to the selected subtree in the same query ---
+    clients = fetch_roster(conn, subtree=node.path if node else None)
 
     if not clients:
         st.info("No clients to display.")
@@ -65,30 +43,17 @@ def render_client_status():
         "No Training": "purple",
     }
 
-    # --- Aggregate and history ---
+    # --- Aggregate and history (one query for the whole squad) ---
+    board = fetch_status_board(conn, [cid for cid, _, _ in clients])
     grouped = {}
     history_map = {}
-    today_str = datetime.today().strftime("%Y-%m-%d")
     for cid, fn, ln in clients:
         name = f"{fn} {ln}"
-        folder = f"{ln}_{fn}_{cid}"
-        sf = PATIENT_STATUS_DIR / folder / "status.json"
-        data = {}
-        if sf.exists():
-            try:
-                data = json.loads(sf.read_text(encoding="utf-8"))
-            except:
-                data = {}
-        current = data.get("current_status", "Full Training")
-        last_upd = data.get("last_updated", today_str)
-        comments = data.get("restrictions", "")
-        grouped.setdefault(current, []).append({"cid": cid, "name": name, "last_upd": last_upd, "comments": comments})
-        hist = data.get("history", [])
-        if not hist:
-            hist = [{"status": current, "date": today_str, "comment": comments}]
-        for entry in hist:
-            entry.setdefault("comment", "")
-        history_map[cid] = hist
+        data = board[cid]
+        grouped.setdefault(data.current_status, []).append({
+            "cid": cid, "name": name, "last_upd": data.last_updated, "comments": data.restrictions
+        })
+        history_map[cid] = data.history
 
     sorted_groups = sorted(grouped.items(), key=lambda x: order_map.get(x[0], 99))
 
@@ -137,65 +102,45 @@ def render_client_status():
     for cid, fn, ln in clients:
         name = f"{fn} {ln}"
         hist = history_map[cid]
-        folder = f"{ln}_{fn}_{cid}"
-        sf = PATIENT_STATUS_DIR / folder / "status.json"
-        data = {}
-        if sf.exists():
-            try:
-                data = json.loads(sf.read_text(encoding="utf-8"))
-            except:
-                data = {}
-        current = data.get("current_status", "Full Training")
+        data = board[cid]
+        current = data.current_status
 
         with st.expander(name):
             st.write("**Edit Status Change History:**")
             cols = st.columns([2,2,6,1])
             cols[0].write("Status"); cols[1].write("Date"); cols[2].write("Restrictions & Comments"); cols[3].write("")
-            for i, entry in enumerate(hist.copy()):
+            history_edits = []
+            cleared = None
+            for i, entry in enumerate(hist):
                 row = st.columns([2,2,6,1])
                 # status row
                 row[0].markdown(
-                    f"<span style='color:{colour_map.get(entry['status'],'gray')};font-size:24px;'>●</span> {entry['status']}",
+                    f"<span style='color:{colour_map.get(entry.status,'gray')};font-size:24px;'>●</span> {entry.status}",
                     unsafe_allow_html=True
                 )
                 # date input
-                dval = date.fromisoformat(entry['date'])
-                newd = row[1].date_input("", value=dval, key=f"hist_date_{cid}_{i}")
-                entry['date'] = newd.strftime("%Y-%m-%d")
+                dval = date.fromisoformat(entry.date)
+                newd = row[1].date_input("", value=dval, key=f"hist_date_{cid}_{i}").strftime("%Y-%m-%d")
                 # comment input
-                newc = row[2].text_input("", value=entry['comment'], key=f"hist_comment_{cid}_{i}")
-                entry['comment'] = newc
-                # clear button: remove and persist
+                newc = row[2].text_input("", value=entry.comment, key=f"hist_comment_{cid}_{i}")
+                if entry.id is not None and (newd != entry.date or newc != entry.comment):
+                    history_edits.append((entry.id, newd, newc))
+                entry.date, entry.comment = newd, newc
+                # clear button: remove the event; current status falls back to the previous one
                 if row[3].button("Clear", key=f"remove_{cid}_{i}"):
-                    hist.pop(i)
-                    # determine new current status
-                    if hist:
-                        last = hist[-1]
-                        new_status = last['status']
-                        new_last = last['date']
-                        new_rest = last.get('comment','')
-                    else:
-                        new_status = 'Full Training'
-                        new_last = today_str
-                        new_rest = ''
-                    # save updated JSON
-                    payload = {
-                        'firstname': fn,
-                        'lastname': ln,
-                        'client_id': cid,
-                        'current_status': new_status,
-                        'restrictions': new_rest,
-                        'last_updated': new_last,
-                        'history': hist
-                    }
-                    odir = PATIENT_STATUS_DIR / folder
-                    odir.mkdir(parents=True, exist_ok=True)
-                    with open(odir / 'status.json','w',encoding='utf-8') as f:
-                        json.dump(payload, f, ensure_ascii=False, indent=2)
-                    st.rerun()
+                    cleared = entry
+            # applied after the loop so the in-place edits of every row are saved along with it
+            if cleared is not None:
+                if cleared.id is not None:
+                    delete_status_event(conn, cleared.id, history_edits)
+                # the rows shift up: drop their widget state so each shows its own saved values
+                for i in range(len(hist)):
+                    st.session_state.pop(f"hist_date_{cid}_{i}", None)
+                    st.session_state.pop(f"hist_comment_{cid}_{i}", None)
+                st.rerun()
 
             # continuous timeline bar
-            dates = [date.fromisoformat(h['date']) for h in hist]
+            dates = [date.fromisoformat(h.date) for h in hist]
             total_days = sum(
                 max((dates[j+1]-dates[j]).days,1) if j+1<len(dates) else max((date.today()-dates[j]).days,1)
                 for j in range(len(dates))
@@ -207,7 +152,7 @@ def render_client_status():
                 start = dates[idx]
                 end = dates[idx+1] if idx+1<len(dates) else date.today()
                 span = max((end-start).days,1)
-                col = colour_map.get(h['status'],'gray')
+                col = colour_map.get(h.status,'gray')
                 segments.append(f"<div style='flex:{span};background-color:{col};'></div>")
                 if idx>0:
                     left_pct = cum/total_days*100
@@ -229,26 +174,10 @@ def render_client_status():
             cs_cols = st.columns([3,3,6])
             sel_idx = list(order_map.keys()).index(current)
             new_s = cs_cols[0].selectbox("", list(order_map.keys()), index=sel_idx, key=f"status_{cid}")
-            lval = data.get('last_updated', today_str)
-            new_l = cs_cols[1].date_input("", value=date.fromisoformat(lval), key=f"lastupd_{cid}")
-            new_r = cs_cols[2].text_input("", value=data.get('restrictions',''), key=f"restrict_{cid}")
+            new_l = cs_cols[1].date_input("", value=date.fromisoformat(data.last_updated), key=f"lastupd_{cid}")
+            new_r = cs_cols[2].text_input("", value=data.restrictions, key=f"restrict_{cid}")
             if st.button("Save Changes", key=f"save_{cid}"):
-                odir = PATIENT_STATUS_DIR / folder
-                odir.mkdir(parents=True, exist_ok=True)
-                ls = new_l.strftime('%Y-%m-%d')
-                if not hist or hist[-1]['status'] != new_s:
-                    hist.append({'status':new_s,'date':ls,'comment':new_r})
-                payload = {
-                    'firstname': fn,
-                    'lastname': ln,
-                    'client_id': cid,
-                    'current_status': new_s,
-                    'restrictions': new_r,
-                    'last_updated': ls,
-                    'history': hist
-                }
-                with open(odir / 'status.json','w',encoding='utf-8') as f:
-                    json.dump(payload, f, ensure_ascii=False, indent=2)
+                save_client_status(conn, cid, new_s, new_l.strftime('%Y-%m-%d'), new_r, history_edits)
                 st.success(f"{name}: status updated!")
                 st.rerun()
 
@@ -0,0 +1,63 @@
+# streamlit_app/pages/dashboard.py
+
+import streamlit as st
+from pathlib import Path
+from streamlit_calendar import calendar
+
+from streamlit_app.assets import img_tag
+from streamlit_app.utils import get_client_db, get_catalog
+from streamlit_app.instrumentation import timed
+from streamlit_app.repository import sync_program_index, count_programs, fetch_program_calendar, count_active_clients
+
+
+@timed
+def render_dashboard():
+    st.title("Prescription Calendar")
+
+    conn = get_client_db()
+    total_clients   = count_active_clients(conn)
+    sync_program_index(conn)
+    total_programs  = count_programs(conn)
+    total_exercises = get_catalog().row_count
+
+    images_dir      = Path(__file__).parent.parent / "images"
+    icons = {
+        "clients":   images_dir / "group.png",
+        "programs":  images_dir / "plus-circle.png",
+        "exercises": images_dir / "database.png",
+    }
+
+    # build three columns
+    c1, c2, c3 = st.columns(3)
+
+    # helper to render icon + metric in one row
+    def render_kpi(col, icon_path, label, value):
+        # two sub‐columns: icon (small) | metric (big)
+        i_col, m_col = col.columns([1, 4])
+        icon_html = img_tag(icon_path, style="width:60px;")
+        if icon_html:
+            i_col.markdown(icon_html, unsafe_allow_html=True)
+        m_col.metric(label=label, value=value)
+
+    render_kpi(c1, icons["clients"],   "Total Clients",   total_clients)
+    render_kpi(c2, icons["programs"],  "Total Programs",  total_programs)
+    render_kpi(c3, icons["exercises"], "Total Exercises", total_exercises)
+
+    # now the calendar...
+    events = []
+    colour_map = {"Rehab":"#FF9999", "Prehab":"#99FF99", "Recovery":"#9999FF"}
+
+    for p in fetch_program_calendar(conn):
+        dt    = p.prescription_date
+        typ   = p.session_name
+        title = f"{p.first_name} {p.last_name} – {typ}"
+        events.append({
+            "title":           title,
+            "start":           dt,
+            "end":             dt,
+            "Color": colour_map.get(typ, "#CCCCCC"),
+            "textColor":       "#FFFFFF",
+        })
+
+    calendar(events=events, key="prog_cal")
+
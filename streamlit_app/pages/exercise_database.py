@@ -1,11 +1,12 @@
 # streamlit_app/pages/05_Exercise_Database.py
 
 import streamlit as st
-from streamlit_app._common import apply_global_css, page_header, get_base64_image
-from streamlit_app.utils import get_client_db
+from streamlit_app._common import apply_global_css, page_header
+from streamlit_app.assets import img_tag
+from streamlit_app.utils import get_catalog, get_image_manifest
+from streamlit_app.instrumentation import timed
+from streamlit_app.catalog import FACETS, read_catalog_csv, write_catalog_csv
 from pathlib import Path
-import pandas as pd
-import os
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Paths & Icons
@@ -15,7 +16,6 @@ STREAMLIT_APP_DIR = PROJECT_ROOT_OF_PAGE.parent
 PROJECT_ROOT = STREAMLIT_APP_DIR.parent
 
 CONTENT_DIR = STREAMLIT_APP_DIR / 'images'
-EXERCISE_IMG_DIR = STREAMLIT_APP_DIR / 'exercise_images'
 
 EXERCISE_CSV = PROJECT_ROOT / 'exercise_database.csv'
 ICON = CONTENT_DIR / 'database.png'
@@ -23,23 +23,39 @@ ICON = CONTENT_DIR / 'database.png'
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
-def get_image_link(exercise: str) -> str:
-    """Return an HTML link to the exercise image if it exists."""
-    if not EXERCISE_IMG_DIR.exists():
-        return "No Image Dir"
+def get_image_link(exercise: str, images) -> str:
+    """Return an HTML link to the exercise image if the manifest has one."""
+    img = images.get(exercise)
+    if img is None:
+        return "No Image"
+    return f"<a href='file:///{img.path.resolve()}' target='_blank'>View {img.ext.upper()}</a>"
+
+def facet_selectbox(col, label: str, facet: str, facets, selection: dict) -> str:
+    """
+    Filter dropdown listing only values still reachable under the other filters, with live counts.
+    A selected value that became unreachable stays listed (with 0) so the selection is not lost.
+    """
+    counts = facets.value_counts(facet, selection)
+    options = [""] + list(counts)
+    current = selection.get(facet, "")
+    if current and current not in counts:
+        options.append(current)
+    return col.selectbox(
+        label, options, key=f"{facet}_filter",
+        format_func=lambda v: f"{v} ({counts.get(v, 0)})" if v else "",
+    )
 
-    jpg = EXERCISE_IMG_DIR / f"{exercise}.jpg"
-    png = EXERCISE_IMG_DIR / f"{exercise}.png"
 
-    if jpg.exists():
-        return f"<a href='file:///{jpg.resolve()}' target='_blank'>View JPG</a>"
-    if png.exists():
-        return f"<a href='file:///{png.resolve()}' target='_blank'>View PNG</a>"
-    return "No Image"
+def cascade_options(facets, facet: str, parents: dict) -> list[str]:
+    """Options of one edit-form level given the levels above it (only '' until they are all set)."""
+    if not all(parents.values()):
+        return [""]
+    return [""] + list(facets.value_counts(facet, parents))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Main render function
 # ──────────────────────────────────────────────────────────────────────────────
+@timed
 def render_exercise_database():
     apply_global_css()
     page_header("Exercise Database", icon_path=ICON)
@@ -49,17 +65,10 @@ def render_exercise_database():
         unsafe_allow_html=True
     )
 
-    # Load data
-    if not EXERCISE_CSV.exists():
-        st.error(f"Exercise database CSV not found at: {EXERCISE_CSV}. Please ensure 'exercise_database.csv' is in your project root.")
-        st.stop()
-
-    # FIX: Specify encoding for reading the CSV
-    data = pd.read_csv(EXERCISE_CSV, encoding='windows-1252')
-
-    for col in ['body_part', 'movement_type', 'sub_movement_type', 'position', 'exercise']:
-        if col in data.columns:
-            data[col] = data[col].astype(str).fillna('')
+    # Load data (shared, cached catalog; blanks are already '')
+    catalog = get_catalog()
+    facets  = catalog.facets
+    data    = catalog.view()
 
     # Filters UI
     col1, col2, col3, col4, col5 = st.columns([1,1,1,1,0.5])
@@ -68,29 +77,17 @@ def render_exercise_database():
             st.session_state.pop(key, None)
         st.rerun()
 
-    body_parts_options = [""] + sorted(data['body_part'].unique())
-    movement_types_options = [""] + sorted(data['movement_type'].unique())
-    sub_movement_types_options = [""] + sorted(data['sub_movement_type'].unique())
-    position_options = [""] + sorted(data['position'].unique())
-
-    body_part_filter = col1.selectbox('Body Part', body_parts_options, key='body_part_filter')
-    movement_type_filter = col2.selectbox('Movement Type', movement_types_options, key='movement_type_filter')
-    sub_movement_type_filter = col3.selectbox('Sub Movement Type', sub_movement_types_options, key='sub_movement_type_filter')
-    position_filter = col4.selectbox('Position', position_options, key='position_filter')
-
-    # Apply filters
-    mask = pd.Series(True, index=data.index)
-
-    if body_part_filter:
-        mask &= (data['body_part'] == body_part_filter)
-    if movement_type_filter:
-        mask &= (data['movement_type'] == movement_type_filter)
-    if sub_movement_type_filter:
-        mask &= (data['sub_movement_type'] == sub_movement_type_filter)
-    if position_filter:
-        mask &= (data['position'] == position_filter)
-    
-    filtered = data[mask].copy()
+    # Current filter values (widgets of this rerun are not drawn yet, so read them from state)
+    selection = {f: st.session_state.get(f"{f}_filter", "") for f in FACETS}
+    for col, label, facet in zip(
+        (col1, col2, col3, col4),
+        ('Body Part', 'Movement Type', 'Sub Movement Type', 'Position'),
+        FACETS,
+    ):
+        selection[facet] = facet_selectbox(col, label, facet, facets, selection)
+
+    # Apply filters: one bitwise AND of the precomputed per-value bitmaps
+    filtered = data[facets.mask(selection)].copy()
 
     filtered = filtered.rename(columns={
         'body_part': 'Body Part',
@@ -101,7 +98,9 @@ def render_exercise_database():
         'volume': 'Volume',
         'notes': 'Notes'
     })
-    filtered['Image'] = filtered['Exercise'].apply(get_image_link)
+    images = get_image_manifest()
+    links = {ex: get_image_link(ex, images) for ex in filtered['Exercise'].unique()}
+    filtered['Image'] = filtered['Exercise'].map(links)
 
     st.markdown(
         """
@@ -129,10 +128,23 @@ def render_exercise_database():
         use_container_width=True,
     )
 
-    options = [""] + [
-        f"{r['body_part']} - {r['movement_type']} - {r['sub_movement_type']} - {r['position']} - {r['exercise']}"
-        for _, r in data.iterrows()
-    ]
+    # Pick the row to edit: fuzzy search over name/notes/progressions, or else the filtered rows
+    query = st.text_input(
+        "Search Exercises", key='exercise_search',
+        placeholder="Name, notes or progressions – typos are fine",
+    )
+    if query:
+        paths = catalog.find(query, limit=50)
+        if not paths:
+            st.info(f"No exercises match “{query}”.")
+        options = [""] + [" - ".join(p) for p in paths]
+    else:
+        in_filter = data[facets.mask(selection)]
+        options = [""] + list(dict.fromkeys(
+            in_filter['body_part'].astype(str) + " - " + in_filter['movement_type'].astype(str) + " - "
+            + in_filter['sub_movement_type'].astype(str) + " - " + in_filter['position'].astype(str) + " - "
+            + in_filter['exercise'].astype(str)
+        ))
     selected = st.selectbox("Select Exercise to Edit", options, key='edit_exercise')
 
     if selected:
@@ -151,18 +163,19 @@ def render_exercise_database():
                 st.write(f"Editing Exercise: **{row['exercise']}**")
 
                 with st.form(key='edit_form'):
+                    body_parts_options = [""] + list(facets.value_counts('body_part'))
                     bp_idx = body_parts_options.index(row['body_part']) if row['body_part'] in body_parts_options else 0
                     bp = st.selectbox('Body Part', body_parts_options, index=bp_idx, key="edit_bp")
                     
-                    mt_options_filtered = [""] + sorted(data[data['body_part'] == bp]['movement_type'].unique())
+                    mt_options_filtered = cascade_options(facets, 'movement_type', {'body_part': bp})
                     mt_idx = mt_options_filtered.index(row['movement_type']) if row['movement_type'] in mt_options_filtered else 0
                     mt = st.selectbox('Movement Type', mt_options_filtered, index=mt_idx, key="edit_mt")
 
-                    smt_options_filtered = [""] + sorted(data[(data['body_part'] == bp) & (data['movement_type'] == mt)]['sub_movement_type'].unique())
+                    smt_options_filtered = cascade_options(facets, 'sub_movement_type', {'body_part': bp, 'movement_type': mt})
                     smt_idx = smt_options_filtered.index(row['sub_movement_type']) if row['sub_movement_type'] in smt_options_filtered else 0
                     smt = st.selectbox('Sub Movement Type', smt_options_filtered, index=smt_idx, key="edit_smt")
 
-                    pos_options_filtered = [""] + sorted(data[(data['body_part'] == bp) & (data['movement_type'] == mt) & (data['sub_movement_type'] == smt)]['position'].unique())
+                    pos_options_filtered = cascade_options(facets, 'position', {'body_part': bp, 'movement_type': mt, 'sub_movement_type': smt})
                     pos_idx = pos_options_filtered.index(row['position']) if row['position'] in pos_options_filtered else 0
                     pos = st.selectbox('Position', pos_options_filtered, index=pos_idx, key="edit_pos")
 
@@ -172,33 +185,24 @@ def render_exercise_database():
 
                     uploaded = st.file_uploader("Upload New Image (overwrites existing)", type=['jpg','png'], key=f"img_uploader_{selected}")
                     if uploaded:
-                        ext = uploaded.name.split('.')[-1]
-                        for existing_ext in ('jpg', 'png'):
-                            existing_path = EXERCISE_IMG_DIR / f"{row['exercise']}.{existing_ext}"
-                            if existing_path.exists() and existing_path != (EXERCISE_IMG_DIR / f"{ex}.{ext}"):
-                                os.remove(existing_path)
-                        
-                        path = EXERCISE_IMG_DIR / f"{ex}.{ext}"
-                        EXERCISE_IMG_DIR.mkdir(parents=True, exist_ok=True)
-                        with open(path, 'wb') as f: f.write(uploaded.getbuffer())
+                        ext = uploaded.name.split('.')[-1].lower()
+                        if ext == 'jpeg':
+                            ext = 'jpg'
+                        images.store(ex, uploaded.getvalue(), ext, replaces=row['exercise'])
                         st.success(f"Uploaded {uploaded.name}. Image will update on rerun.")
                         st.rerun()
 
-                    current_image_displayed = False
-                    for ext_type in ('jpg','png'):
-                        ip = EXERCISE_IMG_DIR / f"{row['exercise']}.{ext_type}"
-                        if ip.exists():
-                            b64 = get_base64_image(ip)
-                            st.image(f"data:image/{ext_type};base64,{b64}", width=200, caption="Current Image")
-                            current_image_displayed = True
-                            break
-                    if not current_image_displayed:
+                    current = images.thumbnail(row['exercise'], 200)
+                    if current:
+                        st.markdown(img_tag(current, style="width:200px;", alt=row['exercise']), unsafe_allow_html=True)
+                        st.caption("Current Image")
+                    else:
                         st.info("No existing image found for this exercise.")
 
 
                     save = st.form_submit_button("Save Changes")
                     if save:
-                        df = pd.read_csv(EXERCISE_CSV, encoding='windows-1252') # Also update encoding here
+                        df, csv_encoding = read_catalog_csv(EXERCISE_CSV)
                         
                         mask2 = (
                             (df['body_part'] == selected_body_part) &
@@ -216,7 +220,7 @@ def render_exercise_database():
                             df.loc[mask2, 'exercise'] = ex
                             df.loc[mask2, 'volume'] = vol
                             df.loc[mask2, 'notes'] = notes
-                            df.to_csv(EXERCISE_CSV, index=False, encoding='windows-1252') # And here for saving
+                            write_catalog_csv(df, EXERCISE_CSV, csv_encoding)  # same encoding it was read with
                             st.success("Exercise updated successfully!")
                             st.rerun()
                         else:
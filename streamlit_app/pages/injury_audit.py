@@ -2,12 +2,13 @@
 
 import streamlit as st
 import pandas as pd
-import json
-import os
 from pathlib import Path
 import plotly.express as px # Import Plotly for charting
 
 from streamlit_app._common import apply_global_css, page_header
+from streamlit_app.utils import get_client_db
+from streamlit_app.instrumentation import timed
+from streamlit_app.repository import sync_program_index, fetch_program_body_parts
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Paths & Constants
@@ -17,62 +18,27 @@ from streamlit_app._common import apply_global_css, page_header
 # Path(__file__).parent.parent is 'streamlit_app/'
 ROOT = Path(__file__).parent.parent
 
-PATIENT_PDF_DIR = ROOT / "patient_pdfs"
 ICON_PATH = ROOT / "images" / "chart-bar.png" # Assuming you have a chart-bar.png in your images folder
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Data Loading and Processing for Audit
 # ──────────────────────────────────────────────────────────────────────────────
-@st.cache_data
 def load_program_data_for_audit():
     """
-    Loads program data from JSON files for the injury audit.
-    Extracts the 'body_part' of the first exercise and 'rehab_type' for each program.
+    Loads program data from the programs index for the injury audit.
+    Returns the 'body_part' of the first exercise and the session type for each program.
     """
-    program_records = []
-
-    if not PATIENT_PDF_DIR.exists():
-        st.warning(f"Patient PDF directory not found: {PATIENT_PDF_DIR}. No program data to load.")
+    conn = get_client_db()
+    if conn is None:
+        st.warning("Cannot access client database. No program data to load.")
         return pd.DataFrame(columns=['body_part', 'rehab_type'])
-
-    # Iterate through each client folder in the patient_pdfs directory
-    for client_folder_name in os.listdir(PATIENT_PDF_DIR):
-        client_folder_path = PATIENT_PDF_DIR / client_folder_name
-
-        if client_folder_path.is_dir() and client_folder_name != "archived_clients":
-            # Iterate through JSON files in each client's folder (each represents a program)
-            for program_file_path in client_folder_path.iterdir():
-                if program_file_path.suffix == ".json":
-                    try:
-                        with open(program_file_path, 'r', encoding='utf-8') as f:
-                            program_data = json.load(f)
-
-                        rehab_type = program_data.get("session_type", "Unknown Session Type") # Use session_type
-                        exercises = program_data.get("exercises", [])
-
-                        first_exercise_body_part = "Unknown Body Part"
-                        if exercises and isinstance(exercises, list) and len(exercises) > 0:
-                            first_exercise = exercises[0]
-                            if isinstance(first_exercise, dict):
-                                first_exercise_body_part = first_exercise.get("body_part", "Unknown Body Part")
-                                # Clean up if body_part is empty or None
-                                if not first_exercise_body_part:
-                                    first_exercise_body_part = "Unknown Body Part"
-
-                        program_records.append({
-                            "body_part": first_exercise_body_part,
-                            "rehab_type": rehab_type
-                        })
-                    except json.JSONDecodeError:
-                        st.warning(f"Skipping malformed JSON file: {program_file_path}")
-                    except Exception as e:
-                        st.warning(f"Error processing {program_file_path}: {e}")
-
-    return pd.DataFrame(program_records)
+    sync_program_index(conn)
+    return fetch_program_body_parts(conn)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Main Render Function
 # ──────────────────────────────────────────────────────────────────────────────
+@timed
 def render_injury_audit():
     apply_global_css()
     page_header("Injury Audit", icon_path=ICON_PATH)
@@ -1,14 +1,22 @@
 # streamlit_app/pages/modify_program.py
 
 import streamlit as st
-import pandas as pd
 import json
-import os
 from datetime import date
 from pathlib import Path
 
-from streamlit_app._common import apply_global_css, page_header, get_base64_image
-from streamlit_app.utils import get_client_db, load_data
+from streamlit_app._common import apply_global_css, page_header
+from streamlit_app.utils import get_client_db, get_catalog
+from streamlit_app.instrumentation import timed
+from streamlit_app.repository import (
+    sync_program_index,
+    index_program_file,
+    fetch_program_files_by_client,
+)
+# The exercise rows and preview are shared with New Program
+from streamlit_app.pages.new_program import (
+    PREVIEW_FRAGMENT, collect_exercises, render_exercise_fields, render_preview_section,
+)
 
 # ─── Paths & Constants ─────────────────────────────────────────────────────────
 # ROOT now points to the 'streamlit_app' directory,
@@ -17,7 +25,6 @@ from streamlit_app.utils import get_client_db, load_data
 ROOT             = Path(__file__).parent.parent
 CONTENT_DIR      = ROOT / "images"
 PDF_DIR          = ROOT / "patient_pdfs"
-EXERCISE_IMG_DIR = ROOT / "exercise_images"
 
 
 # ─── Session‐State Init & Clear ────────────────────────────────────────────────
@@ -44,15 +51,10 @@ def clear_program_fields():
 
 # ─── Load / Save Helpers ───────────────────────────────────────────────────────
 def load_existing_patients():
-    patients = {}
-    if PDF_DIR.exists():
-        for folder in os.listdir(PDF_DIR):
-            p = PDF_DIR / folder
-            if p.is_dir() and folder != "archived_clients":
-                js = [f.name for f in p.iterdir() if f.suffix == ".json"]
-                if js:
-                    patients[folder] = js
-    return patients
+    """{client_folder: [program files]} from the programs index."""
+    conn = get_client_db()
+    sync_program_index(conn)
+    return fetch_program_files_by_client(conn)
 
 
 def load_program_callback():
@@ -115,85 +117,12 @@ def save_modified_program_json(client_id: str, exercises_list):
         json.dumps(payload, ensure_ascii=False, indent=4),
         encoding="utf-8"
     )
+    index_program_file(get_client_db(), outdir / fname)
     st.success("Program updates saved!")
 
 
-# ─── Exercise Rendering (unchanged) ────────────────────────────────────────────
-# NOTE: The content of render_exercise_fields and render_preview_section
-# was commented out as '... your existing implementation ...' in your provided code.
-# I am assuming these functions are correctly defined elsewhere in your full file
-# and have not changed their logic.
-
-def render_exercise_fields(df: pd.DataFrame):
-    """Render all of the selectboxes/inputs for each exercise in session_state.exercises"""
-    ex_list = []
-    for i in range(len(st.session_state.exercises)):
-        c1, c2, c3, c4, c5, c6, c7, c8 = st.columns([0.25,1,1,1,1,0.15,0.15,0.15])
-        c1.write(f"{i+1}.")
-        bp   = c2.selectbox(f"Body Part {i+1}", [""] + sorted(df.body_part.unique()), key=f"body_part_{i}")
-        mdf  = df[df.body_part==bp] if bp else df.iloc[0:0]
-        mt   = c3.selectbox(f"Movement Type {i+1}", [""] + sorted(mdf.movement_type.unique()), key=f"movement_type_{i}")
-        smd  = mdf[mdf.movement_type==mt] if mt else mdf.iloc[0:0]
-        smt  = c4.selectbox(f"Sub-Movement {i+1}", [""] + sorted(smd.sub_movement_type.unique()), key=f"sub_movement_type_{i}")
-        pdfd = smd[smd.sub_movement_type==smt] if smt else smd.iloc[0:0]
-        pos  = c5.selectbox(f"Position {i+1}", [""] + sorted(pdfd.position.unique()), key=f"position_{i}")
-
-        if i>0:
-            c6.button("↑", key=f"up_{i}",   on_click=lambda i=i: swap_exercises(i,i-1)) # Added lambda for closure
-        if i < len(st.session_state.exercises)-1:
-            c7.button("↓", key=f"down_{i}", on_click=lambda i=i: swap_exercises(i,i+1)) # Added lambda for closure
-        c8.button("🗑️", key=f"del_{i}", on_click=lambda i=i: delete_exercise(i)) # Added lambda for closure
-
-        e1,e2,e3 = st.columns([0.25,2,2])
-        exn = e2.selectbox(f"Exercise {i+1}", [""] + sorted(pdfd.exercise.unique()), key=f"exercise_{i}")
-        vol = e3.text_input(f"Volume {i+1}", key=f"volume_{i}",
-                                 value=str(pdfd.iloc[0].volume) if (not pdfd.empty and exn) else "")
-
-        n1,n2,n3 = st.columns([0.25,2,2])
-        notes    = n2.text_input(f"Notes {i+1}", key=f"notes_{i}")
-        progs    = n3.text_input(f"Progressions {i+1}", key=f"progressions_{i}")
-
-        if i < len(st.session_state.exercises)-1:
-            st.divider()
-
-        ex_list.append({
-            "body_part": bp,
-            "movement_type": mt,
-            "sub_movement_type": smt,
-            "position": pos,
-            "exercise": exn,
-            "volume": vol,
-            "notes": notes,
-            "progressions": progs,
-        })
-
-    st.button("Add Exercise", on_click=add_exercise)
-    return ex_list
-
-
-def render_preview_section(exs):
-    """A simple in-page mock-PDF preview, no fpdf involved."""
-    with st.expander("Preview Program PDF", expanded=False):
-        logo = CONTENT_DIR / "company_logo3.png"
-        if logo.exists():
-            st.image(str(logo), width=100)
-        st.markdown(f"## {st.session_state['rehab_type']}", unsafe_allow_html=True)
-        st.write(f"**Patient:** {st.session_state['first_name']} {st.session_state['last_name']}")
-        st.write(f"**Date:** {st.session_state['prescription_date']}")
-        for m in sorted({e["movement_type"] for e in exs}):
-            st.markdown(f"### {m}")
-            for e in [x for x in exs if x["movement_type"]==m]:
-                st.write(f"**{e['exercise']}** — {e['body_part']} / {e['position']} / {e['volume']}")
-                img = EXERCISE_IMG_DIR / f"{e['exercise']}.png"
-                if not img.exists():
-                    img = EXERCISE_IMG_DIR / f"{e['exercise']}.jpg"
-                if img.exists():
-                    st.image(str(img), width=100)
-        st.markdown("#### Comments")
-        st.write(st.session_state["extra_comments"])
-
-
 # ─── Main Page ─────────────────────────────────────────────────────────────────
+@timed
 def render_modify_program():
     apply_global_css()
     page_header("Modify Program", icon_path=CONTENT_DIR/"refresh.png")
@@ -244,12 +173,18 @@ def render_modify_program():
     c3.date_input("Prescription Date",  key="prescription_date", value=st.session_state["prescription_date"])
 
     st.write("### Exercises")
-    df  = load_data()
-    exs = render_exercise_fields(df)
+    render_exercise_fields(get_catalog())
 
     st.markdown("## Session Notes")
     st.text_area("Additional comments", key="extra_comments", value=st.session_state["extra_comments"])
 
+    render_modify_program_preview()
+
+
+@st.fragment(key=PREVIEW_FRAGMENT)
+def render_modify_program_preview():
+    """Preview + save. A fragment, rerun by the exercise rows' edits (see new_program)."""
+    exs = collect_exercises()
     render_preview_section(exs)
 
     if st.button("Save Updates", disabled=not (st.session_state["rehab_type"] and any(e.get("exercise") for e in exs))):
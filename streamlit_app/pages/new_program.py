@@ -1,13 +1,16 @@
 # streamlit_app/pages/new_program.py
 
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 from datetime import date
 import json
 
 from streamlit_app._common import apply_global_css, page_header
-from streamlit_app.utils import get_client_db, load_data
+from streamlit_app.assets import img_tag
+from streamlit_app.catalog import Catalog, FacetIndex
+from streamlit_app.utils import get_client_db, get_catalog, get_image_manifest
+from streamlit_app.instrumentation import timed
+from streamlit_app.repository import index_program_file, fetch_roster
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Paths & Constants
@@ -18,7 +21,12 @@ from streamlit_app.utils import get_client_db, load_data
 ROOT             = Path(__file__).parent.parent
 CONTENT_DIR      = ROOT / "images"
 PDF_DIR          = ROOT / "patient_pdfs"
-EXERCISE_IMG_DIR = ROOT / "exercise_images" # Assuming exercise_images is also directly in streamlit_app/
+
+# Per-row session_state keys: f"{field}_{i}" holds field of exercise row i
+EXERCISE_FIELDS = ["body_part","movement_type","sub_movement_type",
+                   "position","exercise","volume","notes","progressions"]
+# st.fragment key of the preview (+ save) section; every page using the rows renders one
+PREVIEW_FRAGMENT = "program_preview"
 
 # ──────────────────────────────────────────────────────────────────────────────
 def initialize_exercise_state():
@@ -27,91 +35,141 @@ def initialize_exercise_state():
 def add_exercise():
     st.session_state.exercises.append(len(st.session_state.exercises))
 
+def row_fragment_key(i):
+    return f"exercise_row_{i}"
+
+def refresh_row(*rows):
+    """Widget callback: rerun only the given exercise rows and the preview, not the page."""
+    st.rerun([row_fragment_key(i) for i in rows] + [PREVIEW_FRAGMENT])
+
 def swap_exercises(i1, i2):
-    keys = ["body_part","movement_type","sub_movement_type",
-            "position","exercise","volume","notes","progressions"]
-    for k in keys:
+    for k in EXERCISE_FIELDS:
         a, b = f"{k}_{i1}", f"{k}_{i2}"
         st.session_state[a], st.session_state[b] = (
             st.session_state.get(b, ""), st.session_state.get(a, "")
         )
+    refresh_row(i1, i2)
 
 def delete_exercise(idx):
-    keys = ["body_part","movement_type","sub_movement_type",
-            "position","exercise","volume","notes","progressions"]
-    for k in keys:
+    for k in EXERCISE_FIELDS:
         # shift everything after idx back one slot
         for j in range(idx, len(st.session_state.exercises)-1):
             st.session_state[f"{k}_{j}"] = st.session_state.get(f"{k}_{j+1}", "")
         # pop the last
         st.session_state.pop(f"{k}_{len(st.session_state.exercises)-1}", None)
     st.session_state.exercises.pop()
-
-def render_exercise_fields(df: pd.DataFrame):
-    """Render all of the selectboxes/inputs for each exercise in session_state.exercises"""
-    ex_list = []
+    st.rerun()  # the row count changed: the whole page reruns
+
+def collect_exercises():
+    """The exercise rows as dicts, read from session_state (current even during a fragment rerun)."""
+    return [{k: st.session_state.get(f"{k}_{i}", "") for k in EXERCISE_FIELDS}
+            for i in range(len(st.session_state.exercises))]
+
+def count_label(facets: FacetIndex, facet: str, selection: dict):
+    """format_func showing each option with its live catalog row count under selection."""
+    counts = facets.value_counts(facet, selection)
+    return lambda v: f"{v} ({counts.get(v, 0)})" if v else ""
+
+def apply_search_hit(i, catalog: Catalog):
+    """Fill exercise row i's cascading fields from the search hit picked in its search box."""
+    hit = st.session_state.get(f"search_hit_{i}")
+    if not hit:
+        return
+    path = hit.split(" - ")
+    for level, value in zip(["body_part","movement_type","sub_movement_type","position","exercise"], path):
+        st.session_state[f"{level}_{i}"] = value
+    st.session_state[f"volume_{i}"] = catalog.tree.path(*path).volume
+    st.session_state[f"search_{i}"] = ""
+    st.session_state[f"search_hit_{i}"] = ""
+    refresh_row(i)
+
+@timed
+def render_exercise_search(container, i, catalog: Catalog):
+    """Search box for exercise row i; choosing a hit fills the row via apply_search_hit."""
+    with container.popover("🔍", help="Search exercises by name, notes or progressions"):
+        query = st.text_input("Search", key=f"search_{i}", placeholder="e.g. dedbug")
+        # only complete paths can be shown by the cascading selectboxes
+        paths = [p for p in catalog.find(query) if all(p)] if query else []
+        if query and not paths:
+            st.caption("No matches")
+        st.selectbox("Matches", [""] + [" - ".join(p) for p in paths], key=f"search_hit_{i}",
+                     on_change=apply_search_hit, args=(i, catalog))
+
+@timed
+def render_exercise_row(i, catalog: Catalog):
+    """The selectboxes/inputs of exercise row i. Runs as its own fragment (see render_exercise_fields):
+    a change here reruns this row and the preview only."""
+    tree, facets = catalog.tree, catalog.facets
+    last = len(st.session_state.exercises) - 1
+    changed = dict(on_change=refresh_row, args=(i,))
+    c1, c2, c3, c4, c5, c6, c7, c8 = st.columns([0.25,1,1,1,1,0.15,0.15,0.15])
+    c1.write(f"{i+1}.")
+    bp   = c2.selectbox(f"Body Part {i+1}", ("",) + tree.options, key=f"body_part_{i}",
+                        format_func=count_label(facets, "body_part", {}), **changed)
+    bpn  = tree.child(bp)
+    mt   = c3.selectbox(f"Movement Type {i+1}", ("",) + bpn.options, key=f"movement_type_{i}",
+                        format_func=count_label(facets, "movement_type", {"body_part": bp}), **changed)
+    mtn  = bpn.child(mt)
+    smt  = c4.selectbox(f"Sub-Movement {i+1}", ("",) + mtn.options, key=f"sub_movement_type_{i}",
+                        format_func=count_label(facets, "sub_movement_type",
+                                                {"body_part": bp, "movement_type": mt}), **changed)
+    smtn = mtn.child(smt)
+    pos  = c5.selectbox(f"Position {i+1}", ("",) + smtn.options, key=f"position_{i}",
+                        format_func=count_label(facets, "position",
+                                                {"body_part": bp, "movement_type": mt, "sub_movement_type": smt}),
+                        **changed)
+    posn = smtn.child(pos)
+
+    if i>0:
+        c6.button("↑", key=f"up_{i}",   on_click=swap_exercises, args=(i,i-1))
+    if i < last:
+        c7.button("↓", key=f"down_{i}", on_click=swap_exercises, args=(i,i+1))
+    c8.button("🗑️", key=f"del_{i}", on_click=delete_exercise, args=(i,))
+
+    e1,e2,e3 = st.columns([0.25,2,2])
+    render_exercise_search(e1, i, catalog)
+    exn = e2.selectbox(f"Exercise {i+1}", ("",) + posn.options, key=f"exercise_{i}", **changed)
+    e3.text_input(f"Volume {i+1}", key=f"volume_{i}",
+                  value=posn.child(exn).volume if exn else "", **changed)
+
+    n1,n2,n3 = st.columns([0.25,2,2])
+    n2.text_input(f"Notes {i+1}", key=f"notes_{i}", **changed)
+    n3.text_input(f"Progressions {i+1}", key=f"progressions_{i}", **changed)
+
+    if i < last:
+        st.divider()
+
+@timed
+def render_exercise_fields(catalog: Catalog):
+    """Render all of the selectboxes/inputs for each exercise in session_state.exercises.
+    Option lists come straight from the precomputed catalog tree, counts from its facet bitmaps.
+    Each row is a fragment keyed row_fragment_key(i), so editing one row reruns that row and the
+    PREVIEW_FRAGMENT instead of the page; adding or deleting a row reruns the page."""
     for i in range(len(st.session_state.exercises)):
-        c1, c2, c3, c4, c5, c6, c7, c8 = st.columns([0.25,1,1,1,1,0.15,0.15,0.15])
-        c1.write(f"{i+1}.")
-        bp   = c2.selectbox(f"Body Part {i+1}", [""] + sorted(df.body_part.unique()), key=f"body_part_{i}")
-        mdf  = df[df.body_part==bp] if bp else df.iloc[0:0]
-        mt   = c3.selectbox(f"Movement Type {i+1}", [""] + sorted(mdf.movement_type.unique()), key=f"movement_type_{i}")
-        smd  = mdf[mdf.movement_type==mt] if mt else mdf.iloc[0:0]
-        smt  = c4.selectbox(f"Sub-Movement {i+1}", [""] + sorted(smd.sub_movement_type.unique()), key=f"sub_movement_type_{i}")
-        pdfd = smd[smd.sub_movement_type==smt] if smt else smd.iloc[0:0]
-        pos  = c5.selectbox(f"Position {i+1}", [""] + sorted(pdfd.position.unique()), key=f"position_{i}")
-
-        if i>0:
-            c6.button("↑", key=f"up_{i}",   on_click=swap_exercises, args=(i,i-1))
-        if i < len(st.session_state.exercises)-1:
-            c7.button("↓", key=f"down_{i}", on_click=swap_exercises, args=(i,i+1))
-        c8.button("🗑️", key=f"del_{i}", on_click=delete_exercise, args=(i,))
-
-        e1,e2,e3 = st.columns([0.25,2,2])
-        exn = e2.selectbox(f"Exercise {i+1}", [""] + sorted(pdfd.exercise.unique()), key=f"exercise_{i}")
-        vol = e3.text_input(f"Volume {i+1}", key=f"volume_{i}",
-                                 value=str(pdfd.iloc[0].volume) if (not pdfd.empty and exn) else "")
-
-        n1,n2,n3 = st.columns([0.25,2,2])
-        notes    = n2.text_input(f"Notes {i+1}", key=f"notes_{i}")
-        progs    = n3.text_input(f"Progressions {i+1}", key=f"progressions_{i}")
-
-        if i < len(st.session_state.exercises)-1:
-            st.divider()
-
-        ex_list.append({
-            "body_part": bp,
-            "movement_type": mt,
-            "sub_movement_type": smt,
-            "position": pos,
-            "exercise": exn,
-            "volume": vol,
-            "notes": notes,
-            "progressions": progs,
-        })
+        st.fragment(render_exercise_row, key=row_fragment_key(i))(i, catalog)
 
     st.button("Add Exercise", on_click=add_exercise)
-    return ex_list
+    return collect_exercises()
 
 # ──────────────────────────────────────────────────────────────────────────────
+@timed
 def render_preview_section(exs):
     """A simple in-page mock-PDF preview, no fpdf involved."""
     with st.expander("Preview Program PDF", expanded=False):
-        logo = CONTENT_DIR / "company_logo3.png"
-        if logo.exists():
-            st.image(str(logo), width=100)
+        logo = img_tag(CONTENT_DIR / "company_logo3.png", style="width:100px;")
+        if logo:
+            st.markdown(logo, unsafe_allow_html=True)
         st.markdown(f"## {st.session_state['rehab_type']}", unsafe_allow_html=True)
         st.write(f"**Patient:** {st.session_state['first_name']} {st.session_state['last_name']}")
         st.write(f"**Date:** {st.session_state['prescription_date']}")
+        images = get_image_manifest()
         for m in sorted({e["movement_type"] for e in exs}):
             st.markdown(f"### {m}")
             for e in [x for x in exs if x["movement_type"]==m]:
                 st.write(f"**{e['exercise']}** — {e['body_part']} / {e['position']} / {e['volume']}")
-                img = EXERCISE_IMG_DIR / f"{e['exercise']}.png"
-                if not img.exists():
-                    img = EXERCISE_IMG_DIR / f"{e['exercise']}.jpg"
-                if img.exists():
-                    st.image(str(img), width=100)
+                thumb = images.thumbnail(e["exercise"], 100)
+                if thumb:
+                    st.markdown(img_tag(thumb, style="width:100px;", alt=e["exercise"]), unsafe_allow_html=True)
         st.markdown("#### Comments")
         st.write(st.session_state["extra_comments"])
 
@@ -125,25 +183,26 @@ def save_to_json(cid, exs):
         "lastname":            st.session_state["last_name"],
         "rehab_type":          st.session_state["rehab_type"],
         "prescription_date": str(st.session_state["prescription_date"]),
+        "session_type":        st.session_state["session_type"],
         "exercises":           exs,
         "extra_comments":      st.session_state["extra_comments"],
     }
     fname = f"{payload['lastname']}_{payload['firstname']}_{payload['rehab_type']}_{payload['prescription_date']}.json"
     with open(path/fname, "w", encoding='utf-8') as f:
         json.dump(payload, f, ensure_ascii=False, indent=4)
+    index_program_file(get_client_db(), path/fname)
 
 # ──────────────────────────────────────────────────────────────────────────────
+@timed
 def render_new_program():
     apply_global_css()
     page_header("New Program", icon_path=CONTENT_DIR/"plus-circle.png")
 
     initialize_exercise_state()
-    data = load_data()
+    catalog = get_catalog()
     conn = get_client_db()
 
-    athletes = conn.execute(
-        "SELECT id, first_name, last_name FROM clients WHERE account_type='Athlete' AND status='active'"
-    ).fetchall()
+    athletes = fetch_roster(conn)  # active athletes by name, straight from idx_clients_roster
     opts = [f"{a[1]} {a[2]} (ID: {a[0]})" for a in athletes]
 
     c1,c2,c3 = st.columns([2,2,1])
@@ -160,12 +219,17 @@ def render_new_program():
     c3.date_input("Prescription Date", date.today(), key="prescription_date")
 
     st.write("### Exercises")
-    exs = render_exercise_fields(data)
+    render_exercise_fields(catalog)
 
     st.markdown("## Session Notes")
     st.text_area("Additional comments", key="extra_comments")
 
-    # only show preview + JSON-save—no more PDF generation at all
+    render_new_program_preview(cid)
+
+@st.fragment(key=PREVIEW_FRAGMENT)
+def render_new_program_preview(cid):
+    """Preview + JSON-save (no PDF generation). A fragment, rerun by the exercise rows' edits."""
+    exs = collect_exercises()
     if cid and st.session_state["rehab_type"] and any(e["exercise"] for e in exs):
         render_preview_section(exs)
         if st.button("Save Session Only"):
@@ -8,20 +8,32 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
-from streamlit_app.utils import (
-    get_client_db,
+from streamlit_app.utils import get_client_db
+from streamlit_app import instrumentation, profiling
+from streamlit_app.instrumentation import timed
+from streamlit_app.repository import (
+    CLIENT_DB_PATH,
+    backup,
+    write,
     generate_client_id,
     generate_username,
     fetch_all_clients_basic,
-    fetch_all_groups,
-    fetch_user_groups,
-    assign_user_to_groups,
+    get_group_directory,
+    get_membership,
+    invalidate_membership,
+    insert_client_step,
+    update_client_step,
+    assign_groups_step,
     insert_group_row,
     update_group_row,
     delete_group_row,
-    delete_client,            # if implemented in utils; otherwise deletion is inline
+    delete_client_step,
+    delete_client_programs_step,
 )
-from streamlit_app._common import apply_global_css, page_header, get_base64_image
+from streamlit_app.roster_import import (
+    ROSTER_COLUMNS, read_roster, plan_import, import_step, create_client_folders,
+)
+from streamlit_app._common import apply_global_css, page_header, get_base64_image, group_tree_select, is_admin
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Paths & Icons
@@ -42,9 +54,7 @@ def create_database_backup():
     """
     Creates a timestamped backup of client_database.db.
     """
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-    db_path = BASE_DIR / 'client_database.db'
-    if not db_path.exists():
+    if not CLIENT_DB_PATH.exists():
         st.error("Cannot create backup: client_database.db not found.")
         return None, None
 
@@ -52,29 +62,83 @@ def create_database_backup():
     backup_filename = f"client_database_{timestamp}.db"
     backup_path = BACKUP_DIR / backup_filename
     try:
-        shutil.copy2(db_path, backup_path)
+        backup(backup_path)
         st.success(f"Database backup created: {backup_filename}")
         return backup_path, backup_filename
     except Exception as e:
         st.error(f"Error creating backup: {e}")
         return None, None
 
-def ensure_username_column(conn: sqlite3.Connection):
+def render_query_stats():
     """
-    Ensure that the 'username' column exists in clients table. If missing, ALTER TABLE to add it.
+    Per-statement latency histograms and the recent slow queries of this server process
+    (see instrumentation.py), for admins.
     """
-    cur = conn.cursor()
-    try:
-        cur.execute("PRAGMA table_info(clients)")
-        cols = [row[1] for row in cur.fetchall()]
-        if 'username' not in cols:
-            # Add username column
-            cur.execute("ALTER TABLE clients ADD COLUMN username TEXT")
-            conn.commit()
-    except Exception:
-        # If table doesn't exist yet or other issues, ignore here
-        pass
+    stats = instrumentation.statement_stats()
+    if not stats:
+        st.caption("No statements traced yet: record some reruns (Performance panel in the sidebar) "
+                   "or set CK_SLOW_QUERY_MS.")
+        return
+    st.dataframe(
+        pd.DataFrame([{
+            "Statement": s.sql[:200], "Calls": s.calls, "Total ms": round(s.total_ms, 1),
+            "Mean ms": round(s.total_ms / s.calls, 2), "p50 ms": round(s.percentile(0.5), 2),
+            "p95 ms": round(s.percentile(0.95), 2), "Max ms": round(s.max_ms, 2), "Histogram": s.buckets,
+        } for s in stats]),
+        column_config={"Histogram": st.column_config.BarChartColumn(
+            "Histogram", help="Calls per latency bucket, up to "
+                              + ", ".join(f"{b:g}" for b in instrumentation.HISTOGRAM_BOUNDS_MS) + " ms and over")},
+        hide_index=True, use_container_width=True,
+    )
+    slow = instrumentation.recent_slow_queries()
+    threshold = instrumentation.SLOW_QUERY_MS or instrumentation.DEFAULT_SLOW_QUERY_MS
+    st.write(f"#### Slow queries (over {threshold:g} ms)")
+    if not slow:
+        st.caption("None so far.")
+    for q in slow[:20]:
+        with st.expander(f"{q['ms']:,.1f} ms · {q['page'] or q['caller'] or q['function']} · {q['sql'][:80]}"):
+            st.code(q["sql"], language="sql")
+            st.write(f"**Parameters:** `{q['params']}`  \n**Called from:** `{q['caller'] or q['function']}`"
+                     f"  \n**In:** `{q['function']}`  \n**At:** {q['at']}")
+            st.code("\n".join(q["plan"]) or "(no plan)", language=None)
+    st.caption(f"Logged to {instrumentation.SLOW_QUERY_LOG}")
+    if st.button("Reset statistics", key="reset_query_stats_btn"):
+        instrumentation.reset_statement_stats()
+        st.rerun()
 
+def render_profiles():
+    """Saved rerun profiles (see profiling.py): pick one for its top-N summary and the raw .prof."""
+    profiles = profiling.list_profiles()
+    if not profiles:
+        st.caption("No profiles yet. Add ?profile=<page> to the app URL (e.g. ?profile=client_status), "
+                   "or switch on 'Profile next rerun' in the sidebar Performance panel.")
+        return
+    st.dataframe(
+        pd.DataFrame([{"Profile": p.name, "Page": p.page, "User": p.user, "At": p.at,
+                       "Wall ms": p.wall_ms, "Peak MiB": p.peak_mib} for p in profiles]),
+        hide_index=True, use_container_width=True,
+    )
+    by_name = {p.name: p for p in profiles}
+    name = st.selectbox("Show profile", list(by_name), key="profile_select")
+    prof = by_name[name]
+    st.write(f"**{prof.page}** · {prof.at} · {prof.wall_ms:,.0f} ms · peak {prof.peak_mib:,.1f} MiB traced")
+    st.write("#### Top functions (cumulative time)")
+    st.dataframe(pd.DataFrame(prof.functions), hide_index=True, use_container_width=True)
+    st.write("#### Top allocations still held at the end of the rerun")
+    if prof.allocations:
+        st.dataframe(pd.DataFrame(prof.allocations), hide_index=True, use_container_width=True)
+    else:
+        st.caption("None.")
+    c1, c2 = st.columns(2)
+    if prof.prof_path.exists():
+        c1.download_button("Download .prof", data=prof.prof_path.read_bytes(), file_name=prof.prof_path.name,
+                           mime="application/octet-stream", key="download_profile_btn")
+    if c2.button("Delete profile", key="delete_profile_btn"):
+        profiling.delete_profile(prof.name)
+        st.session_state.pop("profile_select", None)
+        st.rerun()
+
+@timed
 def render_settings():
     apply_global_css()
     page_header("Settings", icon_path=SETTINGS_ICON)
@@ -84,10 +148,6 @@ def render_settings():
     if conn is None:
         st.error("Cannot access client database.")
         return
-    cursor = conn.cursor()
-
-    # Ensure username column exists before using
-    ensure_username_column(conn)
 
     # ─── 1) Add New User Section ────────────────────────────────────────────────
     st.write("## 1) Add New User")
@@ -195,25 +255,10 @@ def render_settings():
         key="new_password"
     )
 
-    # Row 3: Assign Groups multi-select
-    df_groups = fetch_all_groups(conn)  # DataFrame with columns ["id","group_parent","club","group_name","group_sub"]
-    group_display_map = {}
-    group_options = []
-    for _, row in df_groups.iterrows():
-        gid = row["id"]
-        parts = []
-        if row["group_parent"]:
-            parts.append(row["group_parent"])
-        if row["club"]:
-            parts.append(row["club"])
-        if row["group_name"]:
-            parts.append(row["group_name"])
-        if row["group_sub"]:
-            parts.append(row["group_sub"])
-        label = " / ".join(parts) if parts else f"(ID:{gid})"
-        display = f"{label} (ID: {gid})"
-        group_display_map[display] = gid
-        group_options.append(display)
+    # Row 3: Assign Groups multi-select (labels, members and counts come from one shared directory)
+    directory = get_group_directory(conn)
+    group_display_map = directory.ids
+    group_options = directory.options
 
     if group_options:
         selected_groups = st.multiselect(
@@ -242,28 +287,24 @@ def render_settings():
                 else:
                     try:
                         new_id = generate_client_id(conn)
-                        # Insert into clients
-                        cursor.execute("""
-                            INSERT INTO clients(
-                                id, account_type, first_name, last_name,
-                                username, gender, mobile, email, password, status
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            new_id,
-                            account_type,
-                            fn.strip(),
-                            ln.strip(),
-                            username_val.strip(),
-                            gender if gender else None,
-                            mobile.strip() if mobile and mobile.strip() else None,
-                            email.strip() if email and email.strip() else None,
-                            password if password else None,
-                            "active"
-                        ))
-                        conn.commit()
-                        # Assign to selected groups
+                        # Insert the client and its group assignments as one transaction
                         sel_ids = [group_display_map[disp] for disp in selected_groups]
-                        assign_user_to_groups(conn, new_id, sel_ids)
+                        write(
+                            conn,
+                            insert_client_step(
+                                new_id,
+                                account_type,
+                                fn.strip(),
+                                ln.strip(),
+                                username_val.strip(),
+                                gender if gender else None,
+                                mobile.strip() if mobile and mobile.strip() else None,
+                                email.strip() if email and email.strip() else None,
+                                password if password else None,
+                            ),
+                            assign_groups_step(new_id, sel_ids),
+                        ).result()
+                        invalidate_membership()
                         # Create directories
                         os.makedirs(PDF_DIR / f"{ln.strip()}_{fn.strip()}_{new_id}", exist_ok=True)
                         os.makedirs(PATIENT_STATUS_DIR / f"{ln.strip()}_{fn.strip()}_{new_id}", exist_ok=True)
@@ -276,6 +317,64 @@ def render_settings():
                     except Exception as e:
                         st.error(f"Unexpected error adding user: {e}")
 
+    # Bulk import: a whole roster in one transaction
+    with st.expander("Bulk import users from a roster file (CSV / XLSX)"):
+        st.caption(
+            "Columns: first_name, last_name (required); account_type, gender, username, mobile, email, "
+            "password, status; group_parent, club, group_name, group_sub to put the user in a group "
+            "(created if it does not exist). Usernames are generated when left blank."
+        )
+        st.download_button(
+            "Download template",
+            data=",".join(ROSTER_COLUMNS) + "\n",
+            file_name="roster_template.csv",
+            mime="text/csv",
+            key="roster_template_btn"
+        )
+        done = st.session_state.pop("roster_import_done", None)
+        if done:
+            st.success(done)
+        # A new key per import empties the uploader, so the same file cannot be imported twice
+        roster_file = st.file_uploader("Roster file", type=["csv", "xlsx"],
+                                       key=f"roster_upload_{st.session_state.get('roster_upload_gen', 0)}")
+        if roster_file is not None:
+            try:
+                roster = read_roster(roster_file.getvalue(), roster_file.name)
+            except ImportError:
+                st.error("Reading .xlsx files needs the openpyxl package; save the roster as CSV instead.")
+                roster = None
+            except Exception as e:
+                st.error(f"Could not read {roster_file.name}: {e}")
+                roster = None
+            if roster is not None:
+                plan = plan_import(conn, roster)
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Users to import", len(plan.clients))
+                m2.metric("New groups", len(plan.new_groups))
+                m3.metric("Already imported", len(plan.existing))
+                m4.metric("Rows skipped", len(plan.errors))
+                if plan.errors:
+                    st.dataframe(pd.DataFrame(plan.errors, columns=["Line", "Problem"]),
+                                 use_container_width=True, hide_index=True, height=200)
+                if plan.clients:
+                    st.dataframe(plan.preview(), use_container_width=True, hide_index=True, height=250)
+                    if st.button(f"Import {len(plan.clients)} users", key="roster_import_btn"):
+                        try:
+                            # Re-plan against the current database, then write everything at once
+                            plan = plan_import(conn, roster)
+                            imported = write(conn, import_step(plan)).result()[0]
+                            invalidate_membership()
+                            create_client_folders(plan, PDF_DIR, PATIENT_STATUS_DIR)
+                        except Exception as e:
+                            st.error(f"Import failed: {e}")
+                        else:
+                            st.session_state["roster_import_done"] = (
+                                f"Imported {imported} users"
+                                + (f" and {len(plan.new_groups)} new groups." if plan.new_groups else ".")
+                            )
+                            st.session_state["roster_upload_gen"] = st.session_state.get("roster_upload_gen", 0) + 1
+                            st.rerun()
+
     # ─── 2) Manage Users List & Edit ─────────────────────────────────────────────
     st.markdown("---")
     st.write("## 2) Manage Users")
@@ -290,6 +389,10 @@ def render_settings():
     # Drop password column before display
     if "Password" in df_clients.columns:
         df_clients = df_clients.drop(columns=["Password"])
+    # Narrow the list to everyone in a parent, club, group or sub-group
+    users_node = group_tree_select("Filter users by group", directory.tree, key="users_group_node")
+    if users_node is not None:
+        df_clients = df_clients[df_clients["ID"].isin(get_membership(conn).members_of(users_node.group_ids))]
     # Limit to 15 rows height, allow scrolling
     st.dataframe(df_clients, use_container_width=True, height=400)
 
@@ -325,29 +428,10 @@ def render_settings():
 
             # Row 3: Assign Groups multi-select
             st.write("Assign Groups:")
-            df_groups2 = fetch_all_groups(conn)
-            group_display_map2 = {}
-            group_options2 = []
-            for _, grow in df_groups2.iterrows():
-                gid = grow["id"]
-                parts = []
-                if grow["group_parent"]:
-                    parts.append(grow["group_parent"])
-                if grow["club"]:
-                    parts.append(grow["club"])
-                if grow["group_name"]:
-                    parts.append(grow["group_name"])
-                if grow["group_sub"]:
-                    parts.append(grow["group_sub"])
-                label = " / ".join(parts) if parts else f"(ID:{gid})"
-                display = f"{label} (ID: {gid})"
-                group_display_map2[display] = gid
-                group_options2.append(display)
-            try:
-                current_group_ids = fetch_user_groups(conn, uid)
-            except Exception:
-                current_group_ids = []
-            default_sel = [disp for disp, gid in group_display_map2.items() if gid in current_group_ids]
+            group_display_map2 = directory.ids
+            group_options2 = directory.options
+            current_group_ids = get_membership(conn).groups_of(uid)
+            default_sel = [directory.labels[gid] for gid in current_group_ids if gid in directory.labels]
             sel_groups_edit = st.multiselect(
                 "Select Groups",
                 options=group_options2,
@@ -366,25 +450,23 @@ def render_settings():
                 else:
                     try:
                         new_status = "active" if estatus else "deactivated"
-                        cursor.execute("""
-                            UPDATE clients
-                            SET first_name=?, last_name=?, username=?, gender=?, account_type=?, mobile=?, email=?, status=?
-                            WHERE id=?
-                        """, (
-                            efn.strip(),
-                            eln.strip(),
-                            eusername.strip(),
-                            egender if egender else None,
-                            eat,
-                            emobile.strip() if emobile and emobile.strip() else None,
-                            eemail.strip() if eemail and eemail.strip() else None,
-                            new_status,
-                            uid
-                        ))
-                        conn.commit()
-                        # Update group assignments
+                        # Profile and group reassignment commit together or not at all
                         selected_ids2 = [group_display_map2[x] for x in sel_groups_edit]
-                        assign_user_to_groups(conn, uid, selected_ids2)
+                        write(
+                            conn,
+                            update_client_step(uid, {
+                                "first_name": efn.strip(),
+                                "last_name": eln.strip(),
+                                "username": eusername.strip(),
+                                "gender": egender if egender else None,
+                                "account_type": eat,
+                                "mobile": emobile.strip() if emobile and emobile.strip() else None,
+                                "email": eemail.strip() if eemail and eemail.strip() else None,
+                                "status": new_status,
+                            }),
+                            assign_groups_step(uid, selected_ids2),
+                        ).result()
+                        invalidate_membership()
                         st.success(f"User {efn.strip()} {eln.strip()} updated successfully!")
                         st.rerun()
                     except Exception as e:
@@ -406,9 +488,13 @@ def render_settings():
                                     shutil.rmtree(d)
                                 except Exception:
                                     pass
-                        # Delete user row
-                        cursor.execute("DELETE FROM clients WHERE id=?", (uid,))
-                        conn.commit()
+                        # Drop the user's program index rows and the user row together
+                        write(
+                            conn,
+                            delete_client_programs_step(f"{uln}_{ufn}_{uid}"),
+                            delete_client_step(uid),
+                        ).result()
+                        invalidate_membership()
                         st.success(f"User {ufn} {uln} (ID: {uid}) deleted.")
                         # Clear selection and rerun
                         st.session_state.pop("edit_user_select", None)
@@ -456,71 +542,29 @@ def render_settings():
     # ─── 4) Manage Groups Section ───────────────────────────────────────────────
     st.markdown("---")
     st.write("## 4) Manage Groups")
-    df_groups_all = fetch_all_groups(conn)
+    directory = get_group_directory(conn)  # re-read: a group may have been added just above
+    df_groups_all = directory.groups
+    groups_node = group_tree_select("Show groups under", directory.tree, key="groups_group_node")
+    if groups_node is not None:
+        df_groups_all = df_groups_all[df_groups_all["id"].isin(groups_node.group_ids)]
     if df_groups_all.empty:
         st.info("No groups defined yet.")
     else:
-        rows = []
-        for _, grow in df_groups_all.iterrows():
-            gid = grow["id"]
-            gp = grow["group_parent"] or ""
-            club = grow["club"] or ""
-            gname = grow["group_name"] or ""
-            gsub = grow["group_sub"] or ""
-            # Fetch assigned Coaches
-            cursor.execute("""
-                SELECT first_name || ' ' || last_name
-                FROM clients JOIN user_group_assignments uga
-                  ON clients.id = uga.user_id
-                WHERE uga.group_id = ? AND account_type='Coach'
-            """, (gid,))
-            coaches = [r[0] for r in cursor.fetchall()]
-            # Fetch assigned Athletes
-            cursor.execute("""
-                SELECT first_name || ' ' || last_name
-                FROM clients JOIN user_group_assignments uga
-                  ON clients.id = uga.user_id
-                WHERE uga.group_id = ? AND account_type='Athlete'
-            """, (gid,))
-            athletes = [r[0] for r in cursor.fetchall()]
-            rows.append({
-                "ID": gid,
-                "Group Parent": gp,
-                "Club": club,
-                "Group Name": gname,
-                "Group Sub": gsub,
-                "Coaches": ", ".join(coaches) if coaches else "",
-                "Athletes": ", ".join(athletes) if athletes else "",
-            })
-        df_display = pd.DataFrame(rows, columns=[
-            "ID","Group Parent","Club","Group Name","Group Sub","Coaches","Athletes"
-        ])
+        df_display = df_groups_all.rename(columns={
+            "id": "ID", "group_parent": "Group Parent", "club": "Club", "group_name": "Group Name",
+            "group_sub": "Group Sub", "coaches": "Coaches", "athletes": "Athletes",
+            "coach_count": "# Coaches", "athlete_count": "# Athletes",
+        }).fillna("")
         # Limit height to allow scrolling
         st.dataframe(df_display, use_container_width=True, height=350)
 
     # Edit/Delete Existing Group
     st.write("### Edit Group")
-    edit_map = {}
-    edit_opts = []
-    for _, grow in df_groups_all.iterrows():
-        gid = grow["id"]
-        parts = []
-        if grow["group_parent"]:
-            parts.append(grow["group_parent"])
-        if grow["club"]:
-            parts.append(grow["club"])
-        if grow["group_name"]:
-            parts.append(grow["group_name"])
-        if grow["group_sub"]:
-            parts.append(grow["group_sub"])
-        label = " / ".join(parts) if parts else f"(ID:{gid})"
-        display = f"{label} (ID: {gid})"
-        edit_map[display] = gid
-        edit_opts.append(display)
-    sel_edit = st.selectbox("Select group to edit", [""] + edit_opts, key="edit_group_select")
+    edit_map = directory.ids
+    sel_edit = st.selectbox("Select group to edit", [""] + directory.options, key="edit_group_select")
     if sel_edit:
         sel_gid = edit_map.get(sel_edit)
-        selected_row = df_groups_all[df_groups_all["id"] == sel_gid].iloc[0]
+        selected_row = directory.row(sel_gid)
         ec1, ec2, ec3, ec4 = st.columns(4)
         current_gp = selected_row["group_parent"] or ""
         if current_gp in GROUP_PARENT_OPTIONS:
@@ -587,6 +631,15 @@ def render_settings():
                 )
             st.success(f"Backup available for download: {backup_file_name}")
 
+    # ─── 6) Performance (admins only) ───────────────────────────────────────────
+    if is_admin():
+        st.markdown("---")
+        st.write("## 6) Performance")
+        st.write("### Query statistics")
+        render_query_stats()
+        st.write("### Rerun profiles")
+        render_profiles()
+
 # ──────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     render_settings()
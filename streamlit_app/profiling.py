@@ -0,0 +1,153 @@
+# streamlit_app/profiling.py
+"""
+On-demand profile of one rerun: a cProfile trace plus a tracemalloc snapshot diff.
+
+capture() wraps the rerun. It saves the raw cProfile stats as <name>.prof, which opens in
+pstats, snakeviz and similar tools, under PROFILES_DIR. Next to it goes <name>.json, a summary
+with the top functions by cumulative time and the top allocation sites still alive at the end
+of the rerun. The summary is built once, at capture time, so listing profiles stays cheap.
+
+Only one capture runs at a time in a process. tracemalloc traces the whole process, so
+allocations made by other sessions during the rerun show up in its diff. Profiles are meant
+for investigating a reported slow page, not for continuous use.
+
+Headless (no Streamlit): requesting a capture (query parameter or admin toggle) and the
+Settings listing are in _common.py and pages/settings.py.
+"""
+
+import contextlib
+import cProfile
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from streamlit_app.repository.paths import BASE_DIR, PERF_DIR
+
+PROFILES_DIR = PERF_DIR / "profiles"
+# Entries kept in each summary's function and allocation lists
+PROFILE_TOP_N = 25
+# Saved profiles kept; older ones are deleted when a new one is saved
+MAX_PROFILES = 50
+
+_capture_lock = threading.Lock()
+
+
+@dataclass
+class ProfileSummary:
+    name: str            # file stem of the .prof / .json pair
+    page: str
+    user: str
+    at: str
+    wall_ms: float
+    peak_mib: float      # tracemalloc peak during the rerun
+    functions: list[dict] = field(default_factory=list)    # top by cumulative time
+    allocations: list[dict] = field(default_factory=list)  # top by bytes still allocated
+
+    @property
+    def prof_path(self) -> Path:
+        return PROFILES_DIR / f"{self.name}.prof"
+
+
+def _short(path: str) -> str:
+    """path relative to the project or to site-packages / the stdlib, for readable summaries."""
+    for prefix in (str(BASE_DIR), *sorted(sys.path, key=len, reverse=True)):
+        if prefix and path.startswith(prefix + "/"):
+            return path[len(prefix) + 1:]
+    return path
+
+
+def _top_functions(profiler: cProfile.Profile, n: int) -> list[dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:n]
+    return [{
+        "function": f"{_short(file)}:{line}({func})" if line else func,
+        "calls": nc,
+        "tottime_ms": round(tt * 1000, 2),
+        "cumtime_ms": round(ct * 1000, 2),
+    } for (file, line, func), (_, nc, tt, ct, _) in rows]
+
+
+def _top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, n: int) -> list[dict]:
+    diffs = after.compare_to(before, "lineno")
+    return [{
+        "where": f"{_short(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+        "size_kib": round(d.size_diff / 1024, 1),
+        "count": d.count_diff,
+    } for d in diffs[:n] if d.size_diff > 0]
+
+
+@contextlib.contextmanager
+def capture(page: str, user: str = "", top_n: int = PROFILE_TOP_N):
+    """
+    Profile the block; yields the ProfileSummary to be (filled in and saved once the block ends,
+    even if it raises), or None when another capture is already running.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        yield None
+        return
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    stamp = datetime.now()
+    summary = ProfileSummary(
+        name=f"{stamp:%Y%m%d_%H%M%S}_{re.sub(r'[^a-z0-9]+', '_', page.lower()).strip('_') or 'page'}",
+        page=page, user=user, at=stamp.isoformat(timespec="seconds"), wall_ms=0.0, peak_mib=0.0,
+    )
+    profiler = cProfile.Profile()
+    t0 = time.perf_counter()
+    profiler.enable()
+    try:
+        yield summary
+    finally:
+        profiler.disable()
+        summary.wall_ms = round((time.perf_counter() - t0) * 1000, 1)
+        try:
+            after = tracemalloc.take_snapshot()
+            summary.peak_mib = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            if started_tracing:
+                tracemalloc.stop()
+            summary.functions = _top_functions(profiler, top_n)
+            summary.allocations = _top_allocations(before, after, top_n)
+            _save(summary, profiler)
+        finally:
+            _capture_lock.release()
+
+
+def _save(summary: ProfileSummary, profiler: cProfile.Profile):
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(summary.prof_path))
+    (PROFILES_DIR / f"{summary.name}.json").write_text(json.dumps(asdict(summary), indent=1), encoding="utf-8")
+    for old in list_profiles()[MAX_PROFILES:]:
+        delete_profile(old.name)
+
+
+def list_profiles() -> list[ProfileSummary]:
+    """Saved profiles, newest first."""
+    if not PROFILES_DIR.exists():
+        return []
+    out = []
+    for path in sorted(PROFILES_DIR.glob("*.json"), reverse=True):
+        try:
+            out.append(ProfileSummary(**json.loads(path.read_text(encoding="utf-8"))))
+        except (OSError, ValueError, TypeError):
+            continue
+    return out
+
+
+def load_profile(name: str) -> Optional[ProfileSummary]:
+    return next((p for p in list_profiles() if p.name == name), None)
+
+
+def delete_profile(name: str):
+    for suffix in (".prof", ".json"):
+        (PROFILES_DIR / f"{name}{suffix}").unlink(missing_ok=True)
@@ -0,0 +1,45 @@
+# streamlit_app/repository/__init__.py
+"""
+Headless data access for the app: clients, groups, programs, statuses and the exercise catalog.
+
+Nothing here imports Streamlit, so the same functions serve the pages, the coach portal, the
+command-line tools and the benchmarks. Reads take a connection (store.connection() gives this
+thread's pooled one); writes are built from steps and committed by the database's writer thread
+via store.write(). Row results are typed: Client, RosterEntry and Group are NamedTuples (so they
+still unpack like the plain tuples they replace), ClientStatus and StatusEvent are dataclasses.
+Table-shaped results that pages display directly (programs, groups with members) stay DataFrames.
+
+utils.py adds the Streamlit side: error messages and st.stop() around these calls.
+"""
+
+from streamlit_app.repository.paths import (
+    BASE_DIR, CATALOG_CACHE_DIR, CLIENT_DB_PATH, EXERCISE_DB_PATH, EXERCISE_IMG_DIR,
+    PATIENT_PDF_DIR, PATIENT_STATUS_DIR, PERF_DIR,
+)
+from streamlit_app.repository.store import (
+    DB_POOL_SIZE, backup, connection, connection_manager, database_key, initialize_schema, write,
+)
+from streamlit_app.repository.groups import (
+    Group, GroupDirectory, GroupTreeNode, Membership,
+    assign_groups_step, assign_user_to_groups, build_group_tree, delete_group_row, delete_group_step,
+    fetch_all_groups, fetch_groups_with_members, fetch_subtree_group_ids, fetch_user_groups,
+    fetch_visible_groups, get_group_directory, get_membership, group_label, group_path,
+    insert_group_row, insert_group_step, invalidate_membership, subtree_bounds, update_group_row,
+    update_group_step,
+)
+from streamlit_app.repository.clients import (
+    CLIENT_UPDATE_COLUMNS, Client, RosterEntry,
+    count_active_clients, delete_client, delete_client_step, fetch_all_clients_basic,
+    fetch_athletes_basic, fetch_coaches_basic, fetch_roster, generate_client_id, generate_username,
+    insert_client_step, update_client_step,
+)
+from streamlit_app.repository.programs import (
+    PROGRAM_COLUMNS, PROGRAM_INDEX_MAX_AGE, PROGRAM_INDEX_SKIP_DIRS, CalendarEntry,
+    count_programs, delete_client_programs, delete_client_programs_step, fetch_program_body_parts,
+    fetch_program_calendar, fetch_program_files_by_client, fetch_programs, index_program_file, reconcile_program_index, sync_program_index,
+)
+from streamlit_app.repository.statuses import (
+    DEFAULT_STATUS, ClientStatus, StatusEvent,
+    delete_status_event, fetch_status_board, import_status_json, save_client_status,
+)
+from streamlit_app.repository.exercises import catalog_version, shared_catalog, shared_image_manifest
@@ -0,0 +1,175 @@
+# streamlit_app/repository/clients.py
+"""Clients (athletes, coaches and admins): lookups, rosters and the client write steps."""
+
+import json
+import random
+import sqlite3
+from typing import Mapping, NamedTuple, Optional
+
+from streamlit_app.repository.groups import get_membership, invalidate_membership, subtree_bounds
+from streamlit_app.repository.store import write
+from streamlit_app.writer import Step
+
+
+class Client(NamedTuple):
+    """One clients row, in table column order."""
+    id: str
+    account_type: str
+    first_name: str
+    last_name: str
+    username: Optional[str]
+    gender: Optional[str]
+    mobile: Optional[str]
+    email: Optional[str]
+    password: Optional[str]
+    status: str
+
+
+class RosterEntry(NamedTuple):
+    """A client as listed in rosters and pickers."""
+    id: str
+    first_name: str
+    last_name: str
+
+
+def generate_client_id(conn: sqlite3.Connection) -> str:
+    """
+    Generate a random 8-digit ID not already in clients table.
+    """
+    cur = conn.cursor()
+    while True:
+        cid = str(random.randint(10_000_000, 99_999_999))
+        cur.execute("SELECT 1 FROM clients WHERE id=?", (cid,))
+        if not cur.fetchone():
+            return cid
+
+
+def generate_username(first_name: str, last_name: str) -> str:
+    """
+    Generate a username from first_name + first 2 letters of last_name.
+    Example: "Owen" + "McLean" -> "Owenmc"
+    Returns lowercase. Caller can override if desired.
+    """
+    if not first_name:
+        base = ""
+    else:
+        base = first_name.strip()
+    tail = ""
+    if last_name and len(last_name.strip()) >= 2:
+        tail = last_name.strip()[:2]
+    elif last_name:
+        tail = last_name.strip()
+    username = (base + tail).lower()
+    # Optionally, one could check uniqueness here, but typically we set and then conflict is handled upstream.
+    return username
+
+
+def count_active_clients(conn: sqlite3.Connection) -> int:
+    """Number of active clients (dashboard KPI); answered from idx_clients_status alone."""
+    return conn.execute("SELECT COUNT(*) FROM clients WHERE status='active'").fetchone()[0]
+
+
+# Column list shared by the fetch_*_basic functions
+_CLIENT_BASIC_SQL = """
+    SELECT id, account_type, first_name, last_name,
+           username, gender, mobile, email, password, status
+    FROM clients
+"""
+
+
+def fetch_all_clients_basic(conn: sqlite3.Connection) -> list[Client]:
+    """
+    Fetch all clients with basic info, as Client rows.
+    """
+    return list(map(Client._make, conn.execute(_CLIENT_BASIC_SQL).fetchall()))
+
+
+def fetch_coaches_basic(conn: sqlite3.Connection) -> list[Client]:
+    """
+    Fetch all coaches (account_type='Coach') with basic info.
+    Returns Client rows, like fetch_all_clients_basic.
+    """
+    return list(map(Client._make, conn.execute(_CLIENT_BASIC_SQL + " WHERE account_type='Coach'").fetchall()))
+
+
+def fetch_athletes_basic(conn: sqlite3.Connection) -> list[Client]:
+    """
+    Fetch all athletes (account_type='Athlete') with basic info.
+    """
+    return list(map(Client._make, conn.execute(_CLIENT_BASIC_SQL + " WHERE account_type='Athlete'").fetchall()))
+
+
+def fetch_roster(conn: sqlite3.Connection, group_ids=None,
+                 account_type: str = "Athlete", active_only: bool = True,
+                 subtree: Optional[str] = None) -> list[RosterEntry]:
+    """
+    RosterEntry (id, first_name, last_name) of the clients of account_type, ordered by last then first name.
+    group_ids (one id or an iterable) limits it to members of those groups; the member ids come
+    from the membership map and are joined in a single query.
+    subtree (a group path, see group_path) limits it to members of any group under that node,
+    found by an index range on group_hierarchy.path in the same query.
+    """
+    where = ["c.account_type=?"]
+    params = [account_type]
+    if active_only:
+        where.append("c.status='active'")
+    join = ""
+    if group_ids is not None:
+        join = "JOIN json_each(?) m ON m.value = c.id"
+        params.insert(0, json.dumps(get_membership(conn).members_of(group_ids)))
+    elif subtree is not None:
+        where.append("""c.id IN (SELECT uga.user_id
+                                   FROM group_hierarchy gh
+                                   JOIN user_group_assignments uga ON uga.group_id = gh.id
+                                  WHERE gh.path >= ? AND gh.path < ?)""")
+        params += subtree_bounds(subtree)
+    cur = conn.execute(f"""
+        SELECT c.id, c.first_name, c.last_name
+          FROM clients c {join}
+         WHERE {' AND '.join(where)}
+         ORDER BY c.last_name, c.first_name
+    """, params)
+    return list(map(RosterEntry._make, cur.fetchall()))
+
+
+def insert_client_step(client_id: str, account_type: str, first_name: str, last_name: str,
+                       username: str, gender=None, mobile=None, email=None, password=None,
+                       status: str = "active") -> Step:
+    """Write step: insert one clients row."""
+    row = (client_id, account_type, first_name, last_name, username, gender, mobile, email, password, status)
+    return lambda cur: cur.execute("""
+        INSERT INTO clients(
+            id, account_type, first_name, last_name,
+            username, gender, mobile, email, password, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, row)
+
+
+# clients columns an update step may set
+CLIENT_UPDATE_COLUMNS = ("account_type", "first_name", "last_name", "username", "gender",
+                         "mobile", "email", "password", "status")
+
+
+def update_client_step(client_id: str, fields: Mapping[str, object]) -> Step:
+    """Write step: set the given clients columns (keys of CLIENT_UPDATE_COLUMNS) of one client."""
+    unknown = set(fields) - set(CLIENT_UPDATE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Not updatable client columns: {sorted(unknown)}")
+    cols = list(fields)
+    sql = f"UPDATE clients SET {', '.join(f'{c}=?' for c in cols)} WHERE id=?"
+    values = [fields[c] for c in cols] + [client_id]
+    return lambda cur: cur.execute(sql, values)
+
+
+def delete_client_step(user_id: str) -> Step:
+    """Write step: delete a client; group assignments and status rows cascade."""
+    return lambda cur: cur.execute("DELETE FROM clients WHERE id=?", (user_id,))
+
+
+def delete_client(conn: sqlite3.Connection, user_id: str):
+    """
+    Delete a client by ID. Cascades in user_group_assignments if foreign keys ON.
+    Also may wish to delete related patient_status dir / PDFs externally in Settings page.
+    """
+    write(conn, delete_client_step(user_id)).result()
+    invalidate_membership()
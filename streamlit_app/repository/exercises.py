@@ -0,0 +1,67 @@
+# streamlit_app/repository/exercises.py
+"""
+The exercise catalog and the exercise image manifest, each shared by the whole process.
+
+The catalog is rebuilt only when exercise_database.csv's mtime changes (and re-parsed only when
+its content changes, see catalog.py); the image manifest is refreshed with one stat per call.
+"""
+
+import threading
+from typing import Optional
+
+from streamlit_app.catalog import Catalog, build_catalog, load_catalog
+from streamlit_app.images import ImageManifest
+from streamlit_app.repository.paths import CATALOG_CACHE_DIR, EXERCISE_DB_PATH, EXERCISE_IMG_DIR
+
+
+def catalog_version() -> int:
+    """
+    Cheap change marker for exercise_database.csv (its mtime in ns; 0 if missing).
+    """
+    try:
+        return EXERCISE_DB_PATH.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+_lock = threading.Lock()
+_catalog: Optional[Catalog] = None
+_image_manifest: Optional[ImageManifest] = None
+
+
+def shared_catalog() -> Catalog:
+    """
+    The exercise catalog shared by every caller in the process (nothing is copied per call).
+    Text is decoded once (utf-8, then windows-1252), blanks are '' and the hierarchy columns are
+    categoricals. The parsed catalog is kept in a Parquet sidecar, so the CSV is only re-parsed
+    when its content changes, and a new Catalog is built only when the CSV's mtime changes.
+    Raises FileNotFoundError if the CSV is missing.
+    """
+    global _catalog
+    version = catalog_version()
+    cached = _catalog
+    if cached is not None and cached.version == version:
+        return cached
+    if not EXERCISE_DB_PATH.exists():
+        raise FileNotFoundError(f"Exercise database CSV not found at: {EXERCISE_DB_PATH}")
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = build_catalog(load_catalog(EXERCISE_DB_PATH, CATALOG_CACHE_DIR), version)
+        return _catalog
+
+
+def shared_image_manifest() -> ImageManifest:
+    """
+    The exercise image manifest shared by every caller in the process, checked for changes (one
+    stat of exercise_images) on each call. Look images up with .get(exercise) rather than
+    stat'ing paths, display them via .thumbnail(exercise, width), and save uploads with .store()
+    so the manifest and thumbnails stay current without a rescan.
+    """
+    global _image_manifest
+    if _image_manifest is None:
+        with _lock:
+            if _image_manifest is None:
+                _image_manifest = ImageManifest(EXERCISE_IMG_DIR, CATALOG_CACHE_DIR / 'images.json',
+                                                CATALOG_CACHE_DIR / 'thumbnails')
+    _image_manifest.refresh()
+    return _image_manifest
@@ -0,0 +1,363 @@
+# streamlit_app/repository/groups.py
+"""
+Groups (group_hierarchy), their tree, and who belongs to which (user_group_assignments).
+
+The membership map and the group directory are kept in memory for the whole process and
+reloaded only when roster_version (bumped by triggers on every group, assignment or member-name
+write, from any connection or process) shows they are stale.
+"""
+
+import sqlite3
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, NamedTuple, Optional
+
+import pandas as pd
+
+from streamlit_app.migrations import GROUP_PATH_SEP
+from streamlit_app.repository.store import database_key, write
+from streamlit_app.writer import Step
+
+
+class Group(NamedTuple):
+    """One group_hierarchy row."""
+    id: int
+    group_parent: Optional[str]
+    club: Optional[str]
+    group_name: str
+    group_sub: Optional[str]
+
+
+def fetch_all_groups(conn: sqlite3.Connection) -> list[Group]:
+    """
+    Every group, ordered by group_parent, club, group_name, group_sub.
+    """
+    cur = conn.execute("""
+        SELECT id, group_parent, club, group_name, group_sub
+        FROM group_hierarchy
+        ORDER BY group_parent, club, group_name, group_sub
+    """)
+    return list(map(Group._make, cur.fetchall()))
+
+
+def insert_group_step(group_parent: str, club: str, group_name: str, group_sub: str) -> Step:
+    """Write step: insert one group_hierarchy row; the step returns its new id."""
+    def step(cur: sqlite3.Cursor) -> int:
+        cur.execute("""
+            INSERT INTO group_hierarchy(group_parent, club, group_name, group_sub)
+            VALUES (?, ?, ?, ?)
+        """, (
+            group_parent if group_parent else None,
+            club if club else None,
+            group_name,
+            group_sub if group_sub else None
+        ))
+        return cur.lastrowid
+    return step
+
+
+def update_group_step(gid: int, group_parent: str, club: str, group_name: str, group_sub: str) -> Step:
+    """Write step: update an existing group_hierarchy row by id."""
+    def step(cur: sqlite3.Cursor):
+        cur.execute("""
+            UPDATE group_hierarchy
+               SET group_parent=?, club=?, group_name=?, group_sub=?
+             WHERE id=?
+        """, (
+            group_parent if group_parent else None,
+            club if club else None,
+            group_name,
+            group_sub if group_sub else None,
+            gid
+        ))
+    return step
+
+
+def delete_group_step(gid: int) -> Step:
+    """Write step: delete a group_hierarchy row (its assignments cascade)."""
+    return lambda cur: cur.execute("DELETE FROM group_hierarchy WHERE id=?", (gid,))
+
+
+def insert_group_row(conn: sqlite3.Connection, group_parent: str, club: str, group_name: str, group_sub: str):
+    """
+    Insert one row into group_hierarchy.
+    """
+    write(conn, insert_group_step(group_parent, club, group_name, group_sub)).result()
+    invalidate_membership()
+
+
+def update_group_row(conn: sqlite3.Connection, gid: int, group_parent: str, club: str, group_name: str, group_sub: str):
+    """
+    Update an existing group_hierarchy row by id.
+    """
+    write(conn, update_group_step(gid, group_parent, club, group_name, group_sub)).result()
+    invalidate_membership()
+
+
+def delete_group_row(conn: sqlite3.Connection, gid: int):
+    """
+    Delete a group_hierarchy row; cascades on user_group_assignments if foreign keys enabled.
+    """
+    write(conn, delete_group_step(gid)).result()
+    invalidate_membership()
+
+
+def fetch_user_groups(conn: sqlite3.Connection, user_id: str) -> list[int]:
+    """
+    Given a user_id, return list of group_hierarchy.id that the user is assigned to.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT group_id FROM user_group_assignments WHERE user_id=?
+    """, (user_id,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def assign_groups_step(user_id: str, group_ids: list[int]) -> Step:
+    """Write step: make group_ids exactly the groups of user_id."""
+    def step(cur: sqlite3.Cursor):
+        cur.execute("DELETE FROM user_group_assignments WHERE user_id=?", (user_id,))
+        cur.executemany("INSERT OR IGNORE INTO user_group_assignments(user_id, group_id) VALUES (?, ?)",
+                        [(user_id, gid) for gid in group_ids])
+    return step
+
+
+def assign_user_to_groups(conn: sqlite3.Connection, user_id: str, group_ids: list[int]):
+    """
+    Assign a user to exactly the given list of group_ids.
+    Clears previous assignments first.
+    """
+    write(conn, assign_groups_step(user_id, group_ids)).result()
+    invalidate_membership()
+
+
+@dataclass(frozen=True)
+class Membership:
+    """
+    Snapshot of user_group_assignments.
+    members -- group id -> sorted tuple of member user ids
+    groups  -- user id -> sorted tuple of group ids
+    version -- roster_version it was built at
+    """
+    members: Mapping[int, tuple[str, ...]]
+    groups: Mapping[str, tuple[int, ...]]
+    version: int
+
+    def members_of(self, group_ids) -> list[str]:
+        """Sorted union of the members of one group id or an iterable of group ids."""
+        if isinstance(group_ids, int):
+            return list(self.members.get(group_ids, ()))
+        ids = set()
+        for gid in group_ids:
+            ids.update(self.members.get(gid, ()))
+        return sorted(ids)
+
+    def groups_of(self, user_id: str) -> tuple[int, ...]:
+        return self.groups.get(user_id, ())
+
+
+# The membership map and group directory of each database (store.database_key), shared by every
+# session of this process; a missing entry means "reload on next use"
+_membership: dict[str, Membership] = {}
+_group_directory: dict[str, "GroupDirectory"] = {}
+
+
+def invalidate_membership():
+    """Drop the cached membership maps and group directories; the next use reloads them."""
+    _membership.clear()
+    _group_directory.clear()
+
+
+def _roster_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT version FROM roster_version WHERE id=1").fetchone()
+    return row[0] if row else 0
+
+
+def get_membership(conn: sqlite3.Connection) -> Membership:
+    """
+    The group membership map, loaded with one query and reused until a group or assignment
+    write invalidates it here, or roster_version shows a write from elsewhere.
+    """
+    key = database_key(conn)
+    version = _roster_version(conn)
+    cached = _membership.get(key)
+    if cached is not None and cached.version == version:
+        return cached
+    members, groups = {}, {}
+    for gid, uid in conn.execute(
+        "SELECT group_id, user_id FROM user_group_assignments ORDER BY group_id, user_id"
+    ):
+        members.setdefault(gid, []).append(uid)
+        groups.setdefault(uid, []).append(gid)
+    membership = _membership[key] = Membership(
+        members=MappingProxyType({g: tuple(u) for g, u in members.items()}),
+        groups=MappingProxyType({u: tuple(sorted(g)) for u, g in groups.items()}),
+        version=version,
+    )
+    return membership
+
+
+def fetch_visible_groups(conn: sqlite3.Connection, user_id: str) -> list[Group]:
+    """
+    The groups a coach (or any user) is assigned to, in fetch_all_groups' order.
+    """
+    cur = conn.execute("""
+        SELECT gh.id, gh.group_parent, gh.club, gh.group_name, gh.group_sub
+          FROM group_hierarchy gh
+          JOIN user_group_assignments uga ON uga.group_id = gh.id
+         WHERE uga.user_id = ?
+         ORDER BY gh.group_parent, gh.club, gh.group_name, gh.group_sub
+    """, (user_id,))
+    return list(map(Group._make, cur.fetchall()))
+
+
+def fetch_groups_with_members(conn: sqlite3.Connection) -> pd.DataFrame:
+    """
+    Returns a DataFrame listing each group row plus comma-separated lists of assigned coaches and athletes.
+    Columns: ['id','group_parent','club','group_name','group_sub','coaches','athletes','coach_count','athlete_count']
+    """
+    cur = conn.cursor()
+    # Use GROUP_CONCAT to gather names
+    # Members are aggregated per group_id first (idx_uga_group_user), then attached to the groups
+    # walked in display order (idx_group_hierarchy_order), so neither side needs a table scan or sort
+    query = """
+        SELECT
+            gh.id,
+            gh.group_parent,
+            gh.club,
+            gh.group_name,
+            gh.group_sub,
+            m.coaches,
+            m.athletes,
+            COALESCE(m.coach_count, 0) AS coach_count,
+            COALESCE(m.athlete_count, 0) AS athlete_count
+        FROM group_hierarchy gh
+        LEFT JOIN (
+            SELECT
+                uga.group_id,
+                GROUP_CONCAT(CASE WHEN c.account_type='Coach' THEN c.first_name || ' ' || c.last_name END, ', ') AS coaches,
+                GROUP_CONCAT(CASE WHEN c.account_type='Athlete' THEN c.first_name || ' ' || c.last_name END, ', ') AS athletes,
+                COUNT(CASE WHEN c.account_type='Coach' THEN 1 END) AS coach_count,
+                COUNT(CASE WHEN c.account_type='Athlete' THEN 1 END) AS athlete_count
+            FROM user_group_assignments uga
+            JOIN clients c ON uga.user_id = c.id
+            GROUP BY uga.group_id
+        ) m ON m.group_id = gh.id
+        ORDER BY gh.group_parent, gh.club, gh.group_name, gh.group_sub
+    """
+    cur.execute(query)
+    rows = cur.fetchall()
+    df = pd.DataFrame(rows, columns=[
+        "id", "group_parent", "club", "group_name", "group_sub", "coaches", "athletes",
+        "coach_count", "athlete_count"
+    ])
+    # Replace None/NULL in coaches/athletes with empty string
+    df["coaches"] = df["coaches"].fillna("").astype(str)
+    df["athletes"] = df["athletes"].fillna("").astype(str)
+    return df
+
+
+def group_path(group_parent=None, club=None, group_name=None, group_sub=None) -> str:
+    """
+    Materialized path of a group (or of a node above groups, given only its leading levels);
+    the same value the migration-6 triggers store in group_hierarchy.path.
+    """
+    parts = [p for p in (group_parent, club, group_name, group_sub) if p]
+    return GROUP_PATH_SEP + "".join(p + GROUP_PATH_SEP for p in parts)
+
+
+def subtree_bounds(path: str) -> tuple[str, str]:
+    """[low, high) range of group_hierarchy.path holding path and everything under it."""
+    return path, path[:-1] + chr(ord(GROUP_PATH_SEP) + 1)
+
+
+def fetch_subtree_group_ids(conn: sqlite3.Connection, path: str) -> list[int]:
+    """Ids of every group at or under the node `path`, from idx_group_hierarchy_path alone."""
+    cur = conn.execute("SELECT id FROM group_hierarchy WHERE path >= ? AND path < ? ORDER BY path, id",
+                       subtree_bounds(path))
+    return [row[0] for row in cur.fetchall()]
+
+
+@dataclass(frozen=True)
+class GroupTreeNode:
+    """
+    One node of the group tree: a level (parent, club, group, sub) that groups hang under.
+    path      -- materialized path of the node (group_path of its levels)
+    name      -- the node's own level value
+    depth     -- 0 for top-level nodes
+    group_ids -- every group at or under this node
+    """
+    path: str
+    name: str
+    depth: int
+    group_ids: tuple[int, ...]
+
+
+def build_group_tree(groups: Iterable[Group]) -> list[GroupTreeNode]:
+    """
+    Tree of the given groups (Group rows, or any rows with the same attributes, such as
+    DataFrame.itertuples()), as nodes in display (depth-first) order. Each non-blank level of a
+    group is a node, so a filter on any node covers its subtree.
+    """
+    ids: dict[tuple, list[int]] = {}
+    for g in groups:
+        parts = tuple(p for p in (g.group_parent, g.club, g.group_name, g.group_sub) if isinstance(p, str) and p)
+        for depth in range(1, len(parts) + 1):
+            ids.setdefault(parts[:depth], []).append(int(g.id))
+    return [GroupTreeNode(group_path(*parts), parts[-1], len(parts) - 1, tuple(gids))
+            for parts, gids in sorted(ids.items(), key=lambda item: group_path(*item[0]))]
+
+
+def group_label(row) -> str:
+    """'Parent / Club / Name / Sub (ID: n)' for a group_hierarchy row, skipping blank parts."""
+    gid = row["id"]
+    parts = [p for p in (row["group_parent"], row["club"], row["group_name"], row["group_sub"]) if p]
+    label = " / ".join(parts) if parts else f"(ID:{gid})"
+    return f"{label} (ID: {gid})"
+
+
+@dataclass(frozen=True)
+class GroupDirectory:
+    """
+    Every group with its display label, members and counts, as shown in Settings.
+    groups  -- fetch_groups_with_members() frame (read-only by convention), in display order
+    labels  -- group id -> group_label(), in display order
+    ids     -- group_label() -> group id
+    tree    -- build_group_tree() of the groups
+    version -- roster_version it was built at
+    """
+    groups: pd.DataFrame
+    labels: Mapping[int, str]
+    ids: Mapping[str, int]
+    tree: tuple[GroupTreeNode, ...]
+    version: int
+
+    @property
+    def options(self) -> list[str]:
+        """Group labels in display order, for selectboxes and multiselects."""
+        return list(self.labels.values())
+
+    def row(self, gid: int) -> pd.Series:
+        return self.groups[self.groups["id"] == gid].iloc[0]
+
+
+def get_group_directory(conn: sqlite3.Connection) -> GroupDirectory:
+    """
+    The group directory, built with one aggregated query and reused until a group, assignment or
+    member-name write invalidates it (see get_membership for how staleness is detected).
+    """
+    key = database_key(conn)
+    version = _roster_version(conn)
+    cached = _group_directory.get(key)
+    if cached is not None and cached.version == version:
+        return cached
+    df = fetch_groups_with_members(conn)
+    labels = {int(r["id"]): group_label(r) for _, r in df.iterrows()}
+    directory = _group_directory[key] = GroupDirectory(
+        groups=df,
+        labels=MappingProxyType(labels),
+        ids=MappingProxyType({label: gid for gid, label in labels.items()}),
+        tree=tuple(build_group_tree(df.itertuples(index=False))),
+        version=version,
+    )
+    return directory
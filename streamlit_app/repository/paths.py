@@ -0,0 +1,14 @@
+# streamlit_app/repository/paths.py
+"""Locations of the app's data, relative to the streamlit_app package."""
+
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent  # streamlit_app/
+BASE_DIR = APP_DIR.parent                          # project root (parent of streamlit_app)
+CLIENT_DB_PATH = BASE_DIR / 'client_database.db'
+EXERCISE_DB_PATH = BASE_DIR / 'exercise_database.csv'
+CATALOG_CACHE_DIR = BASE_DIR / '.catalog_cache'
+PATIENT_PDF_DIR = APP_DIR / 'patient_pdfs'
+PATIENT_STATUS_DIR = APP_DIR / 'patient_status'
+EXERCISE_IMG_DIR = APP_DIR / 'exercise_images'
+PERF_DIR = BASE_DIR / 'perf'                       # instrumentation logs and profiles
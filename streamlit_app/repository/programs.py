@@ -0,0 +1,269 @@
+# streamlit_app/repository/programs.py
+"""
+The programs index: one row per program JSON file under patient_pdfs, kept in step with the
+files by index_program_file() on save and a periodic mtime-based reconcile for outside changes.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+from streamlit_app.repository.paths import PATIENT_PDF_DIR
+from streamlit_app.repository.store import database_key, write
+from streamlit_app.writer import Step
+
+# Folders inside patient_pdfs that are not client folders
+PROGRAM_INDEX_SKIP_DIRS = {"archived_clients"}
+# Minimum seconds between two filesystem reconcile passes of the program index
+PROGRAM_INDEX_MAX_AGE = 30
+# Columns of fetch_programs() frames
+PROGRAM_COLUMNS = [
+    "file_path", "client_folder", "client_id", "first_name", "last_name",
+    "session_type", "session_name", "prescription_date",
+    "first_body_part", "exercise_summary", "exercise_count",
+]
+
+
+class CalendarEntry(NamedTuple):
+    """A program as shown on the dashboard calendar."""
+    prescription_date: str
+    first_name: str
+    last_name: str
+    session_name: str
+
+
+def _summarize_exercises(exs) -> str:
+    """
+    Format a program's exercises as one "movement_type: ex1, ex2" line per movement type.
+    """
+    movement_dict = {}
+    for e in exs:
+        if not isinstance(e, dict):
+            continue
+        mt = e.get('movement_type', '')
+        movement_dict.setdefault(mt, []).append(e.get('exercise', ''))
+    text = ""
+    for mt, lst in movement_dict.items():
+        text += f"{mt}: " + ", ".join(lst) + "\n"
+    return text
+
+
+def _program_index_row(path: Path, pdf_dir: Path, mtime: int) -> tuple:
+    """
+    Parse one program JSON file into a row for the programs table.
+    Raises ValueError / OSError if the file cannot be read.
+    """
+    data = json.loads(path.read_text(encoding='utf-8'))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} does not contain a JSON object")
+
+    folder = path.parent.name
+    exercises = data.get("exercises", [])
+    if not isinstance(exercises, list):
+        exercises = []
+    first_body_part = ""
+    if exercises and isinstance(exercises[0], dict):
+        first_body_part = exercises[0].get("body_part", "") or ""
+
+    raw_date = str(data.get("prescription_date", "") or "")
+    try:
+        prescription_date = date.fromisoformat(raw_date[:10]).isoformat()
+    except ValueError:
+        prescription_date = raw_date or None
+
+    return (
+        path.relative_to(pdf_dir).as_posix(),
+        folder,
+        folder.split("_")[-1],
+        data.get("firstname"),
+        data.get("lastname"),
+        data.get("session_type"),
+        data.get("rehab_type"),
+        prescription_date,
+        first_body_part,
+        _summarize_exercises(exercises),
+        len(exercises),
+        mtime,
+    )
+
+
+def _upsert_program_row(cur: sqlite3.Cursor, row: tuple):
+    cur.execute("""
+        INSERT OR REPLACE INTO programs(
+            file_path, client_folder, client_id, first_name, last_name,
+            session_type, session_name, prescription_date,
+            first_body_part, exercise_summary, exercise_count, mtime
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, row)
+
+
+def index_program_file(conn: sqlite3.Connection, path: Path, pdf_dir: Path = PATIENT_PDF_DIR):
+    """
+    Add or refresh a single program JSON file in the programs index.
+    Called right after a program is saved so pages see it without waiting for a reconcile pass.
+    """
+    path = Path(path)
+    row = _program_index_row(path, Path(pdf_dir), path.stat().st_mtime_ns)
+    write(conn, lambda cur: _upsert_program_row(cur, row)).result()
+
+
+def reconcile_program_index(conn: sqlite3.Connection, pdf_dir: Path = PATIENT_PDF_DIR) -> int:
+    """
+    Bring the programs index in line with the JSON files on disk.
+    Only files whose mtime differs from the indexed one are parsed; rows for deleted files are removed.
+    Returns the number of rows added, refreshed or removed.
+    """
+    pdf_dir = Path(pdf_dir)
+    indexed = dict(conn.execute("SELECT file_path, mtime FROM programs").fetchall())
+
+    seen = set()
+    rows = []
+    if pdf_dir.exists():
+        for folder in os.scandir(pdf_dir):
+            if not folder.is_dir() or folder.name in PROGRAM_INDEX_SKIP_DIRS:
+                continue
+            for entry in os.scandir(folder.path):
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                rel = f"{folder.name}/{entry.name}"
+                seen.add(rel)
+                mtime = entry.stat().st_mtime_ns
+                if indexed.get(rel) == mtime:
+                    continue
+                try:
+                    rows.append(_program_index_row(Path(entry.path), pdf_dir, mtime))
+                except (OSError, ValueError):
+                    # Malformed or unreadable file: drop any row indexed from an earlier version of
+                    # it, and keep it out of the index until it changes again
+                    seen.discard(rel)
+                    continue
+
+    stale = [(rel,) for rel in indexed if rel not in seen]
+    if rows or stale:
+        write(conn, _reconcile_step(rows, stale)).result()
+    return len(rows) + len(stale)
+
+
+def _reconcile_step(rows: list[tuple], stale: list[tuple]) -> Step:
+    """Write step: upsert the re-parsed program rows and drop the rows of deleted files."""
+    def step(cur: sqlite3.Cursor):
+        for row in rows:
+            _upsert_program_row(cur, row)
+        cur.executemany("DELETE FROM programs WHERE file_path=?", stale)
+    return step
+
+
+# (store.database_key, pdf_dir) -> time.monotonic() of its last reconcile pass
+_last_program_reconcile: dict[tuple[str, str], float] = {}
+
+
+def sync_program_index(conn: sqlite3.Connection, pdf_dir: Path = PATIENT_PDF_DIR,
+                       max_age: float = PROGRAM_INDEX_MAX_AGE):
+    """
+    Run reconcile_program_index for this database and pdf_dir at most once every `max_age` seconds.
+    Saves made through the app update the index directly; this only picks up outside changes.
+    """
+    key = (database_key(conn), str(Path(pdf_dir).resolve()))
+    now = time.monotonic()
+    last = _last_program_reconcile.get(key)
+    if last is not None and now - last < max_age:
+        return
+    reconcile_program_index(conn, pdf_dir)
+    _last_program_reconcile[key] = now
+
+
+def delete_client_programs_step(client_folder: str) -> Step:
+    """Write step: drop all indexed programs of a client folder."""
+    return lambda cur: cur.execute("DELETE FROM programs WHERE client_folder=?", (client_folder,))
+
+
+def delete_client_programs(conn: sqlite3.Connection, client_folder: str):
+    """
+    Drop all indexed programs of a client folder (used when the folder itself is removed).
+    """
+    write(conn, delete_client_programs_step(client_folder)).result()
+
+
+def count_programs(conn: sqlite3.Connection) -> int:
+    """
+    Total number of indexed programs.
+    """
+    return conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0]
+
+
+def fetch_program_calendar(conn: sqlite3.Connection) -> list[CalendarEntry]:
+    """
+    Every indexed program's date, client name and session name, for the dashboard calendar.
+    """
+    cur = conn.execute("""
+        SELECT prescription_date, first_name, last_name, session_name
+          FROM programs
+    """)
+    return list(map(CalendarEntry._make, cur.fetchall()))
+
+
+def fetch_program_files_by_client(conn: sqlite3.Connection) -> dict[str, list[str]]:
+    """
+    Returns {client_folder: [program file names]} for every client folder with at least one program.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT client_folder, file_path FROM programs ORDER BY client_folder, file_path")
+    patients = {}
+    for folder, rel in cur.fetchall():
+        patients.setdefault(folder, []).append(rel.rsplit("/", 1)[-1])
+    return patients
+
+
+def fetch_program_body_parts(conn: sqlite3.Connection) -> pd.DataFrame:
+    """
+    The injury audit's view of the programs index: one row per program with the body part of its
+    first exercise and its session type ('Unknown ...' where missing).
+    Columns: body_part, rehab_type.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT COALESCE(NULLIF(first_body_part, ''), 'Unknown Body Part'),
+               COALESCE(session_type, 'Unknown Session Type')
+          FROM programs
+    """)
+    return pd.DataFrame(cur.fetchall(), columns=['body_part', 'rehab_type'])
+
+
+def fetch_programs(conn: sqlite3.Connection,
+                   client_folder: str = None,
+                   session_type: str = None,
+                   start_date: date = None,
+                   end_date: date = None) -> pd.DataFrame:
+    """
+    Query the programs index, optionally filtered by client folder, session type and date range.
+    Returns a DataFrame ordered by prescription_date descending with columns:
+    file_path, client_folder, client_id, first_name, last_name, session_type, session_name,
+    prescription_date, first_body_part, exercise_summary, exercise_count.
+    """
+    columns = PROGRAM_COLUMNS
+    where, params = [], []
+    if client_folder:
+        where.append("client_folder=?")
+        params.append(client_folder)
+    if session_type:
+        where.append("session_type=?")
+        params.append(session_type)
+    if start_date:
+        where.append("prescription_date>=?")
+        params.append(str(start_date))
+    if end_date:
+        where.append("prescription_date<=?")
+        params.append(str(end_date))
+    query = "SELECT " + ", ".join(columns) + " FROM programs"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY prescription_date DESC"
+    cur = conn.cursor()
+    cur.execute(query, params)
+    return pd.DataFrame(cur.fetchall(), columns=columns)
@@ -0,0 +1,158 @@
+# streamlit_app/repository/statuses.py
+"""Client statuses: the status_events history, current_status, and the legacy status.json import."""
+
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from streamlit_app.repository.paths import PATIENT_STATUS_DIR
+from streamlit_app.repository.store import write
+
+# Status shown for clients that have no status history yet
+DEFAULT_STATUS = "Full Training"
+
+
+@dataclass
+class StatusEvent:
+    """One history entry; id is None for the placeholder of a client without history."""
+    id: Optional[int]
+    status: str
+    date: str
+    comment: str = ""
+
+
+@dataclass
+class ClientStatus:
+    """A client's current status and full history (oldest first), as shown on the status boards."""
+    current_status: str
+    restrictions: str
+    last_updated: str
+    history: list[StatusEvent] = field(default_factory=list)
+
+
+def import_status_json(conn: sqlite3.Connection, status_dir: Path = PATIENT_STATUS_DIR) -> int:
+    """
+    Import legacy patient_status/<last>_<first>_<id>/status.json files into status_events / current_status.
+    Clients that are unknown to the clients table, or already have status events, are skipped,
+    so running it again is harmless. Returns the number of clients imported.
+    """
+    status_dir = Path(status_dir)
+    if not status_dir.exists():
+        return 0
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM clients")
+    known = {row[0] for row in cur.fetchall()}
+    cur.execute("SELECT DISTINCT client_id FROM status_events")
+    done = {row[0] for row in cur.fetchall()}
+
+    imported = 0
+    for sf in sorted(status_dir.glob("*/status.json")):
+        try:
+            data = json.loads(sf.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        cid = str(data.get("client_id") or sf.parent.name.split("_")[-1])
+        if cid not in known or cid in done:
+            continue
+        current = data.get("current_status", DEFAULT_STATUS)
+        restrictions = data.get("restrictions", "") or ""
+        last_updated = data.get("last_updated") or date.today().isoformat()
+        history = data.get("history") or [{"status": current, "date": last_updated, "comment": restrictions}]
+        cur.executemany(
+            "INSERT INTO status_events(client_id, status, date, comment) VALUES (?, ?, ?, ?)",
+            [(cid, h.get("status", current), h.get("date", last_updated), h.get("comment", "") or "")
+             for h in history]
+        )
+        # status.json kept current_status separately from history; it wins over the last event
+        cur.execute("""
+            INSERT OR REPLACE INTO current_status(client_id, status, restrictions, last_updated)
+            VALUES (?, ?, ?, ?)
+        """, (cid, current, restrictions, last_updated))
+        done.add(cid)
+        imported += 1
+    conn.commit()
+    return imported
+
+
+def fetch_status_board(conn: sqlite3.Connection, client_ids: list[str]) -> dict[str, ClientStatus]:
+    """
+    Load current status and full history for a whole squad in one query.
+    Returns {client_id: ClientStatus} with history in insertion order.
+    Clients without any status get DEFAULT_STATUS, today's date and a single unsaved
+    history entry (id None), the same defaults the old status.json pages used.
+    """
+    today_str = date.today().isoformat()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT ids.value, cs.status, cs.restrictions, cs.last_updated,
+               e.id, e.status, e.date, e.comment
+          FROM json_each(?) AS ids
+          LEFT JOIN current_status cs ON cs.client_id = ids.value
+          LEFT JOIN status_events e ON e.client_id = ids.value
+         ORDER BY ids.key, e.id
+    """, (json.dumps([str(cid) for cid in client_ids]),))
+
+    board = {}
+    for cid, status, restrictions, last_updated, eid, estatus, edate, ecomment in cur.fetchall():
+        entry = board.get(cid)
+        if entry is None:
+            entry = board[cid] = ClientStatus(
+                current_status=status or DEFAULT_STATUS,
+                restrictions=restrictions or "",
+                last_updated=last_updated or today_str,
+            )
+        if eid is not None:
+            entry.history.append(StatusEvent(eid, estatus, edate, ecomment or ""))
+    for entry in board.values():
+        if not entry.history:
+            entry.history = [StatusEvent(None, entry.current_status, today_str, entry.restrictions)]
+    return board
+
+
+def save_client_status(conn: sqlite3.Connection, client_id: str, status: str, status_date: str,
+                       restrictions: str, history_edits: list[tuple] = ()):
+    """
+    Persist a status save from the Client Status page in one transaction.
+    A change of status is a single status_events insert (the trigger refreshes current_status);
+    saving the same status updates the current_status row and the latest event with it, so the
+    history and the board agree.
+    history_edits is a list of (event_id, date, comment) for history rows edited in place.
+    """
+    def step(cur: sqlite3.Cursor):
+        if history_edits:
+            cur.executemany("UPDATE status_events SET date=?, comment=? WHERE id=?",
+                            [(d, c, eid) for eid, d, c in history_edits])
+        cur.execute("SELECT status FROM current_status WHERE client_id=?", (client_id,))
+        row = cur.fetchone()
+        if row is None or row[0] != status:
+            cur.execute(
+                "INSERT INTO status_events(client_id, status, date, comment) VALUES (?, ?, ?, ?)",
+                (client_id, status, status_date, restrictions)
+            )
+        else:
+            cur.execute(
+                "UPDATE current_status SET restrictions=?, last_updated=? WHERE client_id=?",
+                (restrictions, status_date, client_id)
+            )
+            cur.execute("""
+                UPDATE status_events SET comment=?, date=?
+                 WHERE id = (SELECT MAX(id) FROM status_events WHERE client_id=?)
+            """, (restrictions, status_date, client_id))
+    write(conn, step).result()
+
+
+def delete_status_event(conn: sqlite3.Connection, event_id: int, history_edits: list[tuple] = ()):
+    """
+    Remove one status history entry; current_status falls back to the previous entry.
+    history_edits, as in save_client_status, are applied in the same transaction first so the
+    client's other unsaved in-place edits are kept.
+    """
+    def step(cur: sqlite3.Cursor):
+        edits = [(d, c, eid) for eid, d, c in history_edits if eid != event_id]
+        if edits:
+            cur.executemany("UPDATE status_events SET date=?, comment=? WHERE id=?", edits)
+        cur.execute("DELETE FROM status_events WHERE id=?", (event_id,))
+    write(conn, step).result()
@@ -0,0 +1,124 @@
+# streamlit_app/repository/store.py
+"""
+How the client database is reached: one ConnectionManager (per-thread pooled connections, see
+db.py) and one DbWriter (single writer thread, see writer.py) per database file, created on
+first use and shared by the whole process.
+
+Readers call connection(). Writers call write(conn, *steps), which hands the steps to the writer
+of whichever database conn is attached to, so every repository function works the same against
+the app database, a benchmark copy or a scratch file.
+"""
+
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional
+
+from streamlit_app.db import ConnectionManager, connect
+from streamlit_app.migrations import STATUS_EVENTS_MIGRATION, apply_migrations
+from streamlit_app.writer import DbWriter, Step
+from streamlit_app.repository.paths import CLIENT_DB_PATH, PATIENT_STATUS_DIR
+
+# Most SQLite connections open at once per database (one per concurrently running script run)
+DB_POOL_SIZE = 8
+
+_lock = threading.Lock()
+_managers: dict[str, ConnectionManager] = {}  # resolved database path -> pool
+_writers: dict[str, DbWriter] = {}            # resolved database path -> writer thread
+
+
+def initialize_schema(conn: sqlite3.Connection, status_dir: Optional[Path] = PATIENT_STATUS_DIR):
+    """
+    Brings the database schema up to date by applying any pending numbered migrations
+    (see migrations.py; the version is kept in PRAGMA user_version). Called when a database is
+    first opened; on an up-to-date database this is a single PRAGMA read.
+    When status_events is created, the legacy status.json files under status_dir are imported
+    into it; pass None for a database that has no status folder of its own.
+    """
+    applied = apply_migrations(conn)
+
+    # One-shot import of the legacy per-client status.json files when status_events is created
+    if STATUS_EVENTS_MIGRATION in applied and status_dir is not None:
+        from streamlit_app.repository.statuses import import_status_json  # imports store itself
+        import_status_json(conn, status_dir)
+
+
+def connection_manager(path: Path = CLIENT_DB_PATH) -> ConnectionManager:
+    """The process-wide connection pool for the database at path (migrated on creation)."""
+    key = str(Path(path).resolve())
+    manager = _managers.get(key)
+    if manager is None:
+        with _lock:
+            manager = _managers.get(key)
+            if manager is None:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                manager = _managers[key] = ConnectionManager(path, pool_size=DB_POOL_SIZE, init=initialize_schema)
+    return manager
+
+
+def connection(path: Path = CLIENT_DB_PATH) -> sqlite3.Connection:
+    """This thread's connection to the database at path."""
+    return connection_manager(path).connection()
+
+
+def _writer(path: str) -> DbWriter:
+    key = str(Path(path).resolve())
+    writer = _writers.get(key)
+    if writer is None:
+        with _lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = DbWriter(lambda: connect(key))
+    return writer
+
+
+def _apply_inline(conn: sqlite3.Connection, steps: tuple) -> Future:
+    future: Future = Future()
+    try:
+        with conn:  # commits, or rolls back on error
+            cur = conn.cursor()
+            results = [step(cur) for step in steps]
+    except Exception as e:
+        future.set_exception(e)
+    else:
+        future.set_result(results)
+    return future
+
+
+def database_file(conn: sqlite3.Connection) -> str:
+    """Path of the database file conn is attached to; '' for an in-memory database."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def database_key(conn: sqlite3.Connection) -> str:
+    """Key for per-database caches: the file path, or one key per connection when in memory."""
+    return database_file(conn) or f":memory:{id(conn)}"
+
+
+def write(conn: sqlite3.Connection, *steps: Step) -> Future:
+    """
+    Queue write steps to be applied together, as one atomic unit, to the database conn is
+    attached to. Call .result() on the returned Future to wait for the commit (and re-raise any
+    error). In-memory databases have no file a writer thread could open, so their steps run
+    right away on conn itself.
+    """
+    path = database_file(conn)
+    if not path:
+        return _apply_inline(conn, steps)
+    return _writer(path).submit(*steps)
+
+
+def backup(dest: Path, path: Path = CLIENT_DB_PATH):
+    """
+    Consistent copy of the database at path to dest, taken with SQLite's online backup API.
+    Unlike copying the file, this includes commits still in the WAL and is safe while other
+    sessions are writing.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    target = sqlite3.connect(str(dest))
+    try:
+        connection(path).backup(target)
+    finally:
+        target.close()
@@ -0,0 +1,282 @@
+# streamlit_app/roster_import.py
+"""
+Bulk import of clients (and the groups they belong to) from a roster file (CSV or XLSX).
+
+Headless (no Streamlit): used by the Settings page and from the command line
+
+    python -m streamlit_app.roster_import roster.csv [--db PATH] [--dry-run]
+
+Planning happens in memory: existing ids, usernames, emails and groups are read with one query
+each, new 8-digit ids are drawn against that set, and username collisions are resolved the
+way generate_username() users expect (owenmc, owenmc2, ...). Rows for a client that already
+exists (same first name, last name and group) are left out, so importing a file twice adds
+nothing the second time. The whole import is then a single write step: executemany for clients
+and group assignments in one transaction, so 5,000 athletes commit in well under a second.
+Client folders are created afterwards in parallel.
+
+Roster columns (header case, spaces and dashes are ignored):
+    first_name, last_name                     required
+    account_type, gender, username, mobile,   optional (account_type defaults to Athlete,
+    email, password, status                   status to active; username is generated)
+    group_parent, club, group_name, group_sub optional: the group the client joins; a group
+                                              that does not exist yet is created
+"""
+
+import io
+import random
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+ACCOUNT_TYPES = ("Athlete", "Coach", "Admin")
+GENDERS = ("Male", "Female", "Other")
+STATUSES = ("active", "deactivated")
+ROSTER_COLUMNS = ("first_name", "last_name", "account_type", "gender", "username", "mobile",
+                  "email", "password", "status", "group_parent", "club", "group_name", "group_sub")
+# Other headers people export rosters with
+COLUMN_ALIASES = {"first": "first_name", "firstname": "first_name", "given_name": "first_name",
+                  "last": "last_name", "lastname": "last_name", "surname": "last_name",
+                  "family_name": "last_name", "type": "account_type", "role": "account_type",
+                  "phone": "mobile", "group": "group_name", "squad": "group_name",
+                  "parent": "group_parent", "sub_group": "group_sub"}
+
+GroupKey = tuple  # (group_parent, club, group_name, group_sub), None for blank parts
+
+
+def username_base(first_name: str, last_name: str) -> str:
+    """Same rule as repository.generate_username: first name + first 2 letters of last name, lowercased."""
+    return (first_name.strip() + last_name.strip()[:2]).lower()
+
+
+def read_roster(source: Union[str, Path, bytes, io.IOBase], filename: Optional[str] = None) -> pd.DataFrame:
+    """
+    Roster rows as strings ('' for blanks) with normalised column names.
+    source is a path or the file contents; filename decides CSV vs XLSX when source is not a path.
+    """
+    name = (filename or (str(source) if isinstance(source, (str, Path)) else "")).lower()
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    if name.endswith((".xlsx", ".xlsm", ".xls")):
+        df = pd.read_excel(source, dtype=str)  # needs openpyxl
+    else:
+        df = pd.read_csv(source, dtype=str, skipinitialspace=True, encoding="utf-8-sig")
+    cols = {}
+    for col in df.columns:
+        key = str(col).strip().lower().replace(" ", "_").replace("-", "_")
+        cols[col] = COLUMN_ALIASES.get(key, key)
+    df = df.rename(columns=cols)
+    df = df[[c for c in df.columns if c in ROSTER_COLUMNS]]
+    return df.fillna("").apply(lambda s: s.str.strip())
+
+
+@dataclass
+class ImportPlan:
+    """What an import will write; build with plan_import(), apply with import_step()."""
+    clients: list[tuple] = field(default_factory=list)       # clients rows, in INSERT column order
+    assignments: list[tuple] = field(default_factory=list)   # (client id, GroupKey)
+    new_groups: list[GroupKey] = field(default_factory=list)
+    group_ids: dict = field(default_factory=dict)            # existing GroupKey -> id
+    errors: list[tuple[int, str]] = field(default_factory=list)  # (roster line, message)
+    existing: list[int] = field(default_factory=list)        # roster lines of clients already there
+
+    @property
+    def folders(self) -> list[str]:
+        """Client folder names ('Last_First_id') to create under patient_pdfs and patient_status."""
+        return [f"{c[3]}_{c[2]}_{c[0]}" for c in self.clients]
+
+    def preview(self) -> pd.DataFrame:
+        return pd.DataFrame([c[:6] + (c[7],) for c in self.clients],
+                            columns=["ID", "Account Type", "First Name", "Last Name", "Username", "Gender", "Email"])
+
+
+def _blank(value: str) -> Optional[str]:
+    return value or None
+
+
+def _field(row: dict, col: str) -> str:
+    return row.get(col, "")
+
+
+def _client_key(first: str, last: str, group: Optional[GroupKey]) -> tuple:
+    """Identity of a roster row for duplicate detection: names (case-insensitive) and group."""
+    return first.lower(), last.lower(), group
+
+
+def _existing_client_keys(conn: sqlite3.Connection) -> set:
+    """_client_key of every client in each of its groups, or with group None if it has none."""
+    cur = conn.execute("""
+        SELECT c.first_name, c.last_name, gh.group_parent, gh.club, gh.group_name, gh.group_sub
+          FROM clients c
+          LEFT JOIN user_group_assignments uga ON uga.user_id = c.id
+          LEFT JOIN group_hierarchy gh ON gh.id = uga.group_id
+    """)
+    return {_client_key(first or "", last or "", tuple(group) if group[2] is not None else None)
+            for first, last, *group in cur}
+
+
+def plan_import(conn: sqlite3.Connection, roster: pd.DataFrame, seed: Optional[int] = None) -> ImportPlan:
+    """
+    Validate the roster against the database and allocate ids and usernames, without writing.
+    Invalid rows are left out and reported in plan.errors (line numbers count the header as 1);
+    rows for clients that already exist are left out and listed in plan.existing.
+    """
+    rng = random.Random(seed)
+    taken_ids = {r[0] for r in conn.execute("SELECT id FROM clients")}
+    taken_usernames = {r[0].lower() for r in conn.execute("SELECT username FROM clients WHERE username IS NOT NULL")}
+    taken_emails = {r[0].lower() for r in conn.execute("SELECT email FROM clients WHERE email IS NOT NULL")}
+    known_clients = _existing_client_keys(conn)
+    plan = ImportPlan(group_ids={tuple(r[1:]): r[0] for r in conn.execute(
+        "SELECT id, group_parent, club, group_name, group_sub FROM group_hierarchy")})
+    missing = {"first_name", "last_name"} - set(roster.columns)
+    if missing:
+        plan.errors.append((1, f"missing column(s): {', '.join(sorted(missing))}"))
+        return plan
+
+    new_groups = {}
+    for line, row in enumerate(roster.to_dict("records"), start=2):
+        first, last = _field(row, "first_name"), _field(row, "last_name")
+        if not first or not last:
+            plan.errors.append((line, "first_name and last_name are required"))
+            continue
+        group = None
+        if _field(row, "group_name"):
+            group = tuple(_blank(_field(row, c)) for c in ("group_parent", "club", "group_name", "group_sub"))
+        elif any(_field(row, c) for c in ("group_parent", "club", "group_sub")):
+            plan.errors.append((line, "group_name is required when a group is given"))
+            continue
+        key = _client_key(first, last, group)
+        if key in known_clients:
+            plan.existing.append(line)
+            continue
+        account_type = _field(row, "account_type").capitalize() or "Athlete"
+        if account_type not in ACCOUNT_TYPES:
+            plan.errors.append((line, f"unknown account_type {_field(row, 'account_type')!r}"))
+            continue
+        gender = _field(row, "gender").capitalize()
+        if gender and gender not in GENDERS:
+            plan.errors.append((line, f"unknown gender {_field(row, 'gender')!r}"))
+            continue
+        status = _field(row, "status").lower() or "active"
+        if status not in STATUSES:
+            plan.errors.append((line, f"unknown status {_field(row, 'status')!r}"))
+            continue
+        email = _field(row, "email")
+        if email and email.lower() in taken_emails:
+            plan.errors.append((line, f"email {email} is already in use"))
+            continue
+
+        username = _field(row, "username")
+        if username:
+            if username.lower() in taken_usernames:
+                plan.errors.append((line, f"username {username} is already in use"))
+                continue
+        else:
+            base = username = username_base(first, last)
+            n = 1
+            while username in taken_usernames:
+                n += 1
+                username = f"{base}{n}"
+
+        if group is not None and group not in plan.group_ids:
+            new_groups.setdefault(group, None)
+
+        cid = str(rng.randint(10_000_000, 99_999_999))
+        while cid in taken_ids:
+            cid = str(rng.randint(10_000_000, 99_999_999))
+        taken_ids.add(cid)
+        known_clients.add(key)
+        taken_usernames.add(username.lower())
+        if email:
+            taken_emails.add(email.lower())
+        plan.clients.append((cid, account_type, first, last, username, gender or None,
+                             _blank(_field(row, "mobile")), _blank(email), _blank(_field(row, "password")), status))
+        if group is not None:
+            plan.assignments.append((cid, group))
+    plan.new_groups = list(new_groups)
+    return plan
+
+
+def import_step(plan: ImportPlan):
+    """
+    Write step (see writer.py) applying plan in the writer's transaction: creates its new groups,
+    then inserts every client and assignment with executemany. Returns the number of clients.
+    """
+    def step(cur: sqlite3.Cursor) -> int:
+        group_ids = dict(plan.group_ids)
+        for key in plan.new_groups:  # a handful per import; lastrowid needs one INSERT each
+            cur.execute("INSERT INTO group_hierarchy(group_parent, club, group_name, group_sub) "
+                        "VALUES (?, ?, ?, ?)", key)
+            group_ids[key] = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO clients(
+                id, account_type, first_name, last_name,
+                username, gender, mobile, email, password, status
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, plan.clients)
+        cur.executemany("INSERT OR IGNORE INTO user_group_assignments(user_id, group_id) VALUES (?, ?)",
+                        [(cid, group_ids[key]) for cid, key in plan.assignments])
+        return len(plan.clients)
+    return step
+
+
+def create_client_folders(plan: ImportPlan, *parents: Path, workers: int = 16) -> int:
+    """Create each planned client's folder under every parent dir, in parallel; returns the count."""
+    for parent in parents:
+        parent.mkdir(parents=True, exist_ok=True)
+    paths = [parent / name for parent in parents for name in plan.folders]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda p: p.mkdir(exist_ok=True), paths))
+    return len(paths)
+
+
+def main(argv=None) -> int:
+    import argparse
+    import time
+    from functools import partial
+
+    from streamlit_app.db import ConnectionManager
+    from streamlit_app.repository import CLIENT_DB_PATH, PATIENT_PDF_DIR, PATIENT_STATUS_DIR, initialize_schema
+
+    ap = argparse.ArgumentParser(description="Import clients and groups from a roster CSV/XLSX.")
+    ap.add_argument("roster", type=Path)
+    ap.add_argument("--db", type=Path, default=CLIENT_DB_PATH,
+                    help="database to import into; client folders and the legacy status history "
+                         "are only touched for the app database")
+    ap.add_argument("--dry-run", action="store_true", help="validate and report without writing")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    # Another database (a copy, a scratch file) must not pick up the app's status.json files
+    app_db = args.db.resolve() == CLIENT_DB_PATH.resolve()
+    manager = ConnectionManager(args.db, init=partial(initialize_schema,
+                                                      status_dir=PATIENT_STATUS_DIR if app_db else None))
+    conn = manager.dedicated()
+    plan = plan_import(conn, read_roster(args.roster))
+    for line, message in plan.errors:
+        print(f"line {line}: {message}")
+    print(f"{len(plan.clients)} clients, {len(plan.new_groups)} new groups, "
+          f"{len(plan.existing)} already imported, {len(plan.errors)} rows skipped")
+    if args.dry_run or not plan.clients:
+        return 1 if plan.errors else 0
+
+    conn.isolation_level = None
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        import_step(plan)(cur)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    if app_db:
+        create_client_folders(plan, PATIENT_PDF_DIR, PATIENT_STATUS_DIR)
+    print(f"Imported in {time.perf_counter() - t0:.2f}s")
+    return 1 if plan.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# streamlit_app/writer.py
+"""
+Single writer thread for the client database, with group commit.
+
+SQLite allows one writer at a time anyway, so instead of every session opening its own write
+transaction (and queueing on the file lock behind busy_timeout), writes are handed to one
+thread as a list of steps: callables that take a cursor. submit() returns a Future at once.
+
+The writer takes whatever has queued up, up to max_batch submissions, and runs all of it in a
+single BEGIN IMMEDIATE ... COMMIT: one commit (one WAL sync) for the whole batch. Each submission
+runs inside its own SAVEPOINT, so its steps are atomic together and a failing submission is
+rolled back on its own (its Future gets the exception) without affecting the rest of the batch.
+Futures resolve only after the COMMIT, so a caller that waits on one can read its own write.
+"""
+
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+# A unit of a write: gets the writer's cursor, may return a value (e.g. lastrowid)
+Step = Callable[[sqlite3.Cursor], Any]
+
+_STOP = object()
+
+
+class DbWriter:
+    """
+    Owns one connection (from connect()) and applies submitted steps on its own thread.
+
+    max_batch -- most submissions committed together in one transaction
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_batch: int = 64,
+                 name: str = "db-writer"):
+        self.max_batch = max_batch
+        self._connect = connect
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._stats = {"submissions": 0, "transactions": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, *steps: Step) -> Future:
+        """
+        Queue steps to run, in order, as one atomic unit. The Future's result is the list of
+        the steps' return values; if any step raises, none of them take effect and the Future
+        carries that exception.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("submit() from inside a write step would deadlock the writer")
+        if not self._thread.is_alive():
+            raise RuntimeError("database writer has stopped")
+        future: Future = Future()
+        self._queue.put((steps, future))
+        return future
+
+    def close(self, timeout: float = 5.0):
+        """Finish what is queued, then stop the thread."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    # ── writer thread ────────────────────────────────────────────────────────
+    def _run(self):
+        conn = self._connect()
+        conn.isolation_level = None  # explicit BEGIN/COMMIT only
+        cur = conn.cursor()
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                steps, future = item
+                if future.set_running_or_notify_cancel():
+                    batch.append((steps, future))
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit(cur, batch)
+        conn.close()
+
+    def _commit(self, cur: sqlite3.Cursor, batch: list):
+        outcomes = []
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for steps, _ in batch:
+                cur.execute("SAVEPOINT submission")
+                try:
+                    results = [step(cur) for step in steps]
+                except Exception as e:
+                    cur.execute("ROLLBACK TO submission")
+                    cur.execute("RELEASE submission")
+                    outcomes.append((False, e))
+                else:
+                    cur.execute("RELEASE submission")
+                    outcomes.append((True, results))
+            cur.execute("COMMIT")
+        except Exception as e:  # BEGIN or COMMIT itself failed: nothing in the batch was written
+            if cur.connection.in_transaction:
+                cur.execute("ROLLBACK")
+            outcomes = [(False, e)] * len(batch)
+        self._stats["submissions"] += len(batch)
+        self._stats["transactions"] += 1
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                self._stats["failed"] += 1
+                future.set_exception(value)